@@ -1,3 +1,15 @@
 from .transaction import Transaction
+from .transaction_index import TransactionIndex
 from .block import Block
-from .blockchain import Blockchain
\ No newline at end of file
+from .block_store import BlockStore
+from .chain_stream import read_blocks, write_blocks
+from .block_tree import BlockTree, BlockNode, block_work
+from .columnar import ColumnarTransactions
+from .blockchain import Blockchain
+from .key_registry import KeyRegistry
+from .ledger import Ledger
+from .mempool import Mempool, FifoPolicy, FeePolicy, pack_template
+from .miner import Miner
+from .verifier import BatchVerifier
+from .merkle import merkle_root, merkle_proof, verify_merkle_proof
+from .node import Node
@@ -1,6 +1,9 @@
 import cryptography
 from typing import List
 import time
+from . import encoding
+from .columnar import ColumnarTransactions
+from .merkle import MerkleProof, merkle_proof, merkle_root, verify_merkle_proof
 from .transaction import Transaction
 
 class Block:
@@ -10,9 +13,14 @@ class Block:
     Each block contains a list of transactions, a reference to the previous block's hash,
     and is associated with a cryptographic provider for hashing and verification. The block
     includes metadata such as a timestamp, a nonce for proof-of-work, and its own computed hash.
+    The block's hash commits to the transactions through the Merkle root of their hashes, so
+    the header can be hashed and checked without the transactions' signatures. This allows to
+    prune the signatures of old blocks while their hash commitments still verify.
     """
 
-    def __init__(self, index: int, previous_hash: str, transactions: List[Transaction], crypto_provider: cryptography.CryptoProvider, timestamp=None):
+    __slots__ = ('index', 'previous_hash', 'transactions', 'crypto_provider', 'timestamp', 'merkle_root', 'nonce', 'hash', 'pruned')
+
+    def __init__(self, index: int, previous_hash: str, transactions: List[Transaction], crypto_provider: cryptography.CryptoProvider, timestamp=None, merkle_root: bytes = None):
         """
         Initialize a new block.
 
@@ -22,40 +30,209 @@ class Block:
             transactions (List[Transaction]): A list of transactions included in the block.
             crypto_provider (CryptoProvider): The cryptographic provider used for hashing and verification.
             timestamp (float, optional): The timestamp of block creation. Defaults to the current time.
+            merkle_root (bytes, optional): The Merkle root of the transactions. Defaults to the root computed from the transactions.
         """
         self.index = index
         self.previous_hash = previous_hash
         self.transactions = transactions
         self.crypto_provider = crypto_provider
         self.timestamp = timestamp or time.time()
+        self.merkle_root = merkle_root if merkle_root is not None else self.compute_merkle_root()
         self.nonce = 0
         self.hash = None
+        self.pruned = False
 
     def compute_hash(self) -> bytes:
         """
-        Compute the cryptographic hash of the block's contents (block's index, previous hash, transactions, timestamp, and nonce)
+        Compute the cryptographic hash of the block's header (block's index, previous hash, Merkle root of the transactions,
+        timestamp, and nonce) in the canonical binary format.
 
         Returns:
-            bytes: The computed hash of the block as a hexadecimal string.
+            bytes: The computed hash of the block.
         """
-        block = f'{self.index}{self.previous_hash}{self.transactions}{self.timestamp}{self.nonce}'.encode()
-        return self.crypto_provider.hash(block)
+        return self.crypto_provider.hash(self.hash_prefix() + encoding.NONCE.pack(self.nonce))
 
-    def is_valid(self) -> bool:
+    def hash_prefix(self) -> bytes:
         """
-        Verify the validity of the block. Checks that all transactions in the block are valid and that the block's hash matches
-        the computed hash based on its current contents.
+        Serialize the part of the block's header that precedes the nonce (format version, block's index, previous hash,
+        Merkle root and timestamp) in the canonical binary format. Its size does not depend on the transactions and it stays the
+        same for every nonce tried while mining.
 
         Returns:
-            bool: True if the block is valid; False otherwise.
+            bytes: The serialized block header without the nonce.
+        """
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        out += encoding.INDEX.pack(self.index)
+        encoding.write_bytes(out, self.previous_hash)
+        encoding.write_bytes(out, self.merkle_root)
+        out += encoding.TIMESTAMP.pack(self.timestamp)
+        return bytes(out)
+
+    def compute_merkle_root(self) -> bytes:
+        """
+        Compute the Merkle root of the hashes of the block's transactions.
+
+        Returns:
+            bytes: The Merkle root of the block's transactions.
+        """
+        return merkle_root([transaction.compute_hash() for transaction in self.transactions], self.crypto_provider.hash)
+
+    def inclusion_proof(self, position: int) -> MerkleProof:
+        """
+        Build the proof that the transaction at the given position is included in the block.
+
+        Args:
+            position (int): The position of the transaction in the block.
+
+        Returns:
+            MerkleProof: The sibling hashes from the transaction's hash up to the Merkle root (O(log n) entries).
+        """
+        return merkle_proof([transaction.compute_hash() for transaction in self.transactions], position, self.crypto_provider.hash)
+
+    def verify_inclusion(self, transaction_hash: bytes, proof: MerkleProof) -> bool:
+        """
+        Check an inclusion proof against the block's Merkle root. Only needs the block's header, not its transactions.
+
+        Args:
+            transaction_hash (bytes): The hash of the transaction (see `Transaction.compute_hash`).
+            proof (MerkleProof): The inclusion proof built by `inclusion_proof`.
+
+        Returns:
+            bool: True if the transaction is included in the block; False otherwise.
+        """
+        return verify_merkle_proof(transaction_hash, proof, self.merkle_root, self.crypto_provider.hash)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the block in the canonical binary format: the hashed header followed by the nonce, the stored hash (empty if
+        the block has not been hashed yet), the flags (whether the block is pruned) and the transactions. Used for storage and
+        size measurements.
+
+        Returns:
+            bytes: The serialized block.
+        """
+        out = bytearray(self.hash_prefix())
+        out += encoding.NONCE.pack(self.nonce)
+        encoding.write_bytes(out, self.hash)
+        out += encoding.FLAGS.pack(encoding.FLAG_PRUNED if self.pruned else 0)
+        out += encoding.LENGTH.pack(len(self.transactions))
+        for transaction in self.transactions:
+            encoding.write_bytes(out, transaction.to_bytes())
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, crypto_provider: cryptography.CryptoProvider) -> 'Block':
+        """
+        Deserialize a block from the canonical binary format. The previous hash is restored as bytes.
+
+        Args:
+            data (bytes): The serialized block. Any buffer (e.g. a memoryview) is read without copying it first.
+            crypto_provider (CryptoProvider): The cryptographic provider used for hashing and verification.
+
+        Returns:
+            Block: The deserialized block.
+
+        Raises:
+            ValueError: If the data is not a single block in a supported format version.
+        """
+        view = memoryview(data)
+        offset = encoding.read_version(view, 0)
+        index, offset = encoding.read_struct(view, offset, encoding.INDEX)
+        previous_hash, offset = encoding.read_bytes(view, offset)
+        stored_merkle_root, offset = encoding.read_bytes(view, offset)
+        timestamp, offset = encoding.read_struct(view, offset, encoding.TIMESTAMP)
+        nonce, offset = encoding.read_struct(view, offset, encoding.NONCE)
+        block_hash, offset = encoding.read_bytes(view, offset)
+        flags, offset = encoding.read_struct(view, offset, encoding.FLAGS)
+        count, offset = encoding.read_struct(view, offset, encoding.LENGTH)
+        transactions = []
+        for _ in range(count):
+            transaction_bytes, offset = encoding.read_bytes(view, offset)
+            transaction, end = Transaction._read(transaction_bytes, 0, crypto_provider)
+            if end != len(transaction_bytes):
+                raise ValueError("Unexpected trailing bytes after transaction")
+            transactions.append(transaction)
+        if offset != len(view):
+            raise ValueError("Unexpected trailing bytes after block")
+        block = cls(index, bytes(previous_hash), transactions, crypto_provider, timestamp, bytes(stored_merkle_root))
+        block.nonce = nonce
+        block.hash = bytes(block_hash) if len(block_hash) else None
+        block.pruned = bool(flags & encoding.FLAG_PRUNED)
+        return block
+
+    @property
+    def weight(self) -> int:
+        """
+        The total size of the block's transactions in serialized bytes (see `Transaction.to_bytes`), which is limited by the
+        blockchain's block weight.
         """
+        return sum(len(transaction.to_bytes()) for transaction in self.transactions)
 
-        if (
-            not all(transaction.is_valid() for transaction in self.transactions) or
-            self.hash != self.compute_hash()
-        ):
+    def compact(self):
+        """
+        Pack the block's transactions into columnar buffers (see `ColumnarTransactions`) to reduce the block's memory
+        footprint. The transactions of a compacted block can no longer be modified in place.
+        """
+        if not isinstance(self.transactions, ColumnarTransactions):
+            self.transactions = ColumnarTransactions(self.transactions, self.crypto_provider)
+
+    def prune(self, public_keys: bool = False):
+        """
+        Drop the signatures of the block's transactions, keeping only their hashes (see `Transaction.prune`), and flag the
+        block as pruned. The block's Merkle root and hash still verify, but its signatures can no longer be verified.
+
+        Args:
+            public_keys (bool, optional): Whether to drop the public keys carried by the transactions as well. Defaults to False.
+        """
+        transactions = list(self.transactions)
+        for transaction in transactions:
+            transaction.prune(public_keys)
+        if isinstance(self.transactions, ColumnarTransactions):
+            transactions = ColumnarTransactions(transactions, self.crypto_provider)
+        self.transactions = transactions
+        self.pruned = True
+
+    def is_valid(self, verifier: 'BatchVerifier' = None, key_registry: 'KeyRegistry' = None) -> bool:
+        """
+        Verify the validity of the block. Checks that all transactions in the block are valid, that the Merkle root matches
+        the current transactions and that the block's hash matches the computed hash of its header. The signatures of a
+        pruned block cannot be verified, and its pruned flag is not covered by its hash, so a pruned block is never valid
+        on its own; only the blockchain that pruned it trusts it (see `Blockchain.is_valid`).
+
+        Args:
+            verifier (BatchVerifier, optional): Verifies the transaction signatures in parallel. Defaults to verifying them one by one.
+            key_registry (KeyRegistry, optional): The registry to look up the public keys of senders in that are not carried by the transactions.
+
+        Returns:
+            bool: True if the block is valid; False otherwise.
+        """
+        if self.pruned or not self.has_valid_hashes():
             return False
-        return True
+        if verifier is not None:
+            return verifier.verify(self.transactions, key_registry) is None
+        return all(transaction.is_valid(key_registry) for transaction in self.transactions)
+
+    def has_valid_hashes(self) -> bool:
+        """
+        Check the block's hash commitments without verifying any signature: the Merkle root has to match the current
+        transactions and the block's hash has to match the computed hash of its header.
+
+        Returns:
+            bool: True if both the Merkle root and the block's hash are correct; False otherwise.
+        """
+        return self.merkle_root == self.compute_merkle_root() and self.hash == self.compute_hash()
+
+    def meets_difficulty(self, difficulty: int) -> bool:
+        """
+        Check the block's proof-of-work: its stored hash has to start with the required number of zero bytes.
+
+        Args:
+            difficulty (int): The number of leading zero bytes required in the block's hash.
+
+        Returns:
+            bool: True if the block's hash meets the difficulty; False otherwise.
+        """
+        return self.hash is not None and self.hash.startswith(b'\x00' * difficulty)
 
     def __str__(self) -> str: # pragma: no cover
         return (
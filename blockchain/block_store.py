@@ -0,0 +1,338 @@
+import cryptography
+import collections
+import mmap
+import os
+import struct
+import threading
+from typing import Iterator, List, Optional, Union
+from .block import Block
+
+# Index record of a block: offset and length of the serialized block in the segment file
+INDEX_RECORD = struct.Struct('>QQ')
+
+# State of the store as of its last write: number of blocks, segment file size, size of the current block versions,
+# height up to which the blocks were pruned by the blockchain and end of the most recently replaced block version
+META_RECORD = struct.Struct('>QQQQQ')
+
+SEGMENT_FILE = 'blocks.dat'
+INDEX_FILE = 'blocks.idx'
+META_FILE = 'blocks.meta'
+STATE_FILE = 'state.dat'
+
+# Suffix of the files written by a compaction before they replace the current ones
+COMPACTION_SUFFIX = '.compact'
+
+class BlockStore:
+    """
+    Disk-backed, append-only store of the blocks of a chain.
+
+    Blocks are serialized in the canonical binary format and appended to a segment file. A separate index file holds one
+    fixed-size record (offset and length in the segment file) per height and is memory-mapped. The sizes of the store are
+    kept in a small meta file, so opening the store only maps the index and reads the tip's record; the index is only
+    scanned if the meta file does not match it after an interrupted write. Blocks are deserialized lazily from the memory-mapped segment file when they are accessed, and the most
+    recently accessed blocks are kept in a small cache. The store can be used in place of the list of blocks of a Blockchain,
+    and can be read from one thread (e.g. a background verification) while another one appends to it.
+
+    A block can be replaced (e.g. by its pruned version), which appends the new version and points the index record to it.
+    The space of replaced versions is reclaimed by `compact`. The blocks above a height can be dropped by `truncate`, e.g.
+    when the chain switches to a competing branch.
+
+    The store also keeps one snapshot of state derived from the blocks (see `save_state`), e.g. the ledger of a blockchain,
+    so that it does not have to be rebuilt from all blocks when the store is opened again.
+    """
+
+    def __init__(self, path: str, crypto_provider: cryptography.CryptoProvider, cache_size: int = 64):
+        """
+        Open the store in the given directory, creating it if it does not exist yet.
+
+        Args:
+            path (str): The directory containing the segment and index files.
+            crypto_provider (CryptoProvider): The cryptographic provider of the stored blocks.
+            cache_size (int, optional): The number of recently accessed blocks kept in memory. Defaults to 64.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.crypto_provider = crypto_provider
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._open()
+
+    def _open(self):
+        segment_path = os.path.join(self.path, SEGMENT_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+
+        # Finish a compaction that was interrupted after replacing the segment file, or discard one interrupted before
+        if os.path.exists(index_path + COMPACTION_SUFFIX):
+            if os.path.exists(segment_path + COMPACTION_SUFFIX):
+                os.remove(segment_path + COMPACTION_SUFFIX)
+                os.remove(index_path + COMPACTION_SUFFIX)
+            else:
+                os.replace(index_path + COMPACTION_SUFFIX, index_path)
+
+        self._segment = open(segment_path, 'a+b')
+        meta_path = os.path.join(self.path, META_FILE)
+        self._meta = open(meta_path, 'r+b' if os.path.exists(meta_path) else 'w+b')
+        # The index is opened for updates in place, as replacing a block rewrites its record
+        self._index = open(index_path, 'r+b' if os.path.exists(index_path) else 'w+b')
+        self._segment_map = None
+        self._index_map = None
+
+        # Ignore index records of a write that did not reach the segment file, and partially written records
+        segment_size = os.fstat(self._segment.fileno()).st_size
+        self._count = os.fstat(self._index.fileno()).st_size // INDEX_RECORD.size
+        self._remap_index()
+        while self._count > 0:
+            offset, length = self._record(self._count - 1)
+            if offset + length <= segment_size:
+                break
+            self._count -= 1
+        self._index.truncate(self._count * INDEX_RECORD.size)
+        self._remap_index()
+        meta = self._meta.read(META_RECORD.size)
+        meta = META_RECORD.unpack(meta) if len(meta) == META_RECORD.size else (0, 0, 0, 0, 0)
+        self._pruned_height = min(meta[3], max(self._count - 1, 0))
+        if meta[:2] == (self._count, segment_size):
+            self._segment_size, self._live_size, self._replaced_end = meta[1], meta[2], meta[4]
+        else:
+            # Recover the sizes after an interrupted write, which takes one pass over the index
+            records = [self._record(height) for height in range(self._count)]
+            self._segment_size = max((offset + length for offset, length in records), default=0)
+            self._live_size = sum(length for _, length in records)
+            # Any version may have been a replacement, so truncating keeps the segment file up to its end until the next replacement
+            self._replaced_end = self._segment_size
+            self._write_meta()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def live_bytes(self) -> int:
+        """
+        The size of the current versions of all blocks in the segment file.
+        """
+        return self._live_size
+
+    @property
+    def wasted_bytes(self) -> int:
+        """
+        The size of the replaced block versions in the segment file, which `compact` reclaims.
+        """
+        return self._segment_size - self._live_size
+
+    @property
+    def pruned_height(self) -> int:
+        """
+        The height up to which the blockchain has pruned the stored blocks itself, after validating them (see
+        `Blockchain.prune`). Kept across reopening, as the pruned flag of a block is not covered by its hash.
+        """
+        return self._pruned_height
+
+    @pruned_height.setter
+    def pruned_height(self, height: int):
+        with self._lock:
+            self._pruned_height = height
+            self._write_meta()
+
+    def __iter__(self) -> Iterator[Block]:
+        for height in range(self._count):
+            yield self[height]
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Block, List[Block]]:
+        if isinstance(key, slice):
+            return [self[height] for height in range(*key.indices(self._count))]
+        height = key + self._count if key < 0 else key
+        if not 0 <= height < self._count:
+            raise IndexError("Block height out of range")
+        with self._lock:
+            block = self._cache.get(height)
+            if block is None:
+                block = self._load(height)
+                self._cache[height] = block
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(height)
+            return block
+
+    def append(self, block: Block):
+        """
+        Append a block to the end of the store. The block is written to the segment file before its index record, so that
+        an interrupted write never leaves an index record pointing to missing data.
+
+        Args:
+            block (Block): The block at height `len(store)`.
+        """
+        with self._lock:
+            self._write(self._count, block)
+            self._remap_index(self._count + 1)
+            self._count += 1
+            self._write_meta()
+
+    def replace(self, height: int, block: Block):
+        """
+        Replace the block at the given height, e.g. by its pruned version. The new version is appended to the segment file
+        before the index record is pointed to it, so an interrupted write keeps the old version.
+
+        Args:
+            height (int): The height of the block to replace.
+            block (Block): The new version of the block.
+        """
+        with self._lock:
+            if not 0 <= height < self._count:
+                raise IndexError("Block height out of range")
+            self._live_size -= self._record(height)[1]
+            self._write(height, block)
+            self._replaced_end = self._segment_size
+            self._write_meta()
+
+    def truncate(self, length: int):
+        """
+        Drop all blocks from the given height on. The index is truncated first, so an interrupted truncation leaves index
+        records pointing to existing data only. Only the records of the dropped blocks are read: the kept blocks were written
+        before them, except for versions that replaced them later, so the segment file is cut at the first dropped block or
+        after the most recently replaced version, whichever comes last.
+
+        Args:
+            length (int): The number of blocks to keep.
+        """
+        with self._lock:
+            if not 0 <= length <= self._count:
+                raise IndexError("Block height out of range")
+            if length == self._count:
+                return
+            dropped = [self._record(height) for height in range(length, self._count)]
+            self._live_size -= sum(record_length for _, record_length in dropped)
+            self._segment_size = max(min(offset for offset, _ in dropped), self._replaced_end if length > 0 else 0)
+            self._replaced_end = min(self._replaced_end, self._segment_size)
+            self._remap_index(0)
+            self._index.truncate(length * INDEX_RECORD.size)
+            self._index.flush()
+            self._count = length
+            self._remap_index()
+            if self._segment_map is not None:
+                self._segment_map.close()
+                self._segment_map = None
+            self._segment.truncate(self._segment_size)
+            self._segment.flush()
+            self._pruned_height = min(self._pruned_height, max(length - 1, 0))
+            self._write_meta()
+            for height in [height for height in self._cache if height >= length]:
+                del self._cache[height]
+
+    def compact(self):
+        """
+        Rewrite the segment file with only the current version of every block, reclaiming the space of replaced versions.
+        The compacted files are written next to the current ones and then replace them, the segment file first, so that an
+        interrupted compaction is either finished or discarded when the store is opened again.
+        """
+        with self._lock:
+            if self.wasted_bytes == 0:
+                return
+            segment_path = os.path.join(self.path, SEGMENT_FILE)
+            index_path = os.path.join(self.path, INDEX_FILE)
+            offset = 0
+            with open(segment_path + COMPACTION_SUFFIX, 'wb') as segment, open(index_path + COMPACTION_SUFFIX, 'wb') as index:
+                with memoryview(self._map_segment()) as view:
+                    for height in range(self._count):
+                        record_offset, length = self._record(height)
+                        segment.write(view[record_offset:record_offset + length])
+                        index.write(INDEX_RECORD.pack(offset, length))
+                        offset += length
+                segment.flush()
+                os.fsync(segment.fileno())
+                index.flush()
+                os.fsync(index.fileno())
+            self._close_files()
+            os.replace(segment_path + COMPACTION_SUFFIX, segment_path)
+            os.replace(index_path + COMPACTION_SUFFIX, index_path)
+            self._open()
+
+    def save_state(self, data: bytes):
+        """
+        Store a snapshot of state derived from the blocks, replacing the previous one. The snapshot is written next to the
+        current one and then replaces it, so an interrupted write keeps the previous snapshot.
+
+        Args:
+            data (bytes): The serialized state.
+        """
+        state_path = os.path.join(self.path, STATE_FILE)
+        with open(state_path + COMPACTION_SUFFIX, 'wb') as state:
+            state.write(data)
+            state.flush()
+            os.fsync(state.fileno())
+        os.replace(state_path + COMPACTION_SUFFIX, state_path)
+
+    def load_state(self) -> Optional[bytes]:
+        """
+        Load the snapshot stored by `save_state`.
+
+        Returns:
+            Optional[bytes]: The serialized state, or None if no snapshot has been stored.
+        """
+        try:
+            with open(os.path.join(self.path, STATE_FILE), 'rb') as state:
+                return state.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self):
+        self._meta.seek(0)
+        self._meta.write(META_RECORD.pack(self._count, self._segment_size, self._live_size, self._pruned_height, self._replaced_end))
+        self._meta.flush()
+
+    def _write(self, height: int, block: Block):
+        data = block.to_bytes()
+        self._segment.seek(self._segment_size)
+        self._segment.truncate()
+        self._segment.write(data)
+        self._segment.flush()
+        self._index.seek(height * INDEX_RECORD.size)
+        self._index.write(INDEX_RECORD.pack(self._segment_size, len(data)))
+        self._index.flush()
+        self._segment_size += len(data)
+        self._live_size += len(data)
+        self._cache[height] = block
+        self._cache.move_to_end(height)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        """
+        Close the segment and index files.
+        """
+        self._cache.clear()
+        self._close_files()
+
+    def _close_files(self):
+        for mapping in (self._segment_map, self._index_map):
+            if mapping is not None:
+                mapping.close()
+        self._segment_map = self._index_map = None
+        self._segment.close()
+        self._index.close()
+        self._meta.close()
+
+    def _load(self, height: int) -> Block:
+        offset, length = self._record(height)
+        with memoryview(self._map_segment(offset + length)) as view:
+            return Block.from_bytes(view[offset:offset + length], self.crypto_provider)
+
+    def _map_segment(self, size: int = None) -> mmap.mmap:
+        size = self._segment_size if size is None else size
+        if self._segment_map is None or len(self._segment_map) < size:
+            if self._segment_map is not None:
+                self._segment_map.close()
+            self._segment_map = mmap.mmap(self._segment.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._segment_map
+
+    def _record(self, height: int):
+        return INDEX_RECORD.unpack_from(self._index_map, height * INDEX_RECORD.size)
+
+    def _remap_index(self, count: int = None):
+        count = self._count if count is None else count
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        if count > 0:
+            self._index_map = mmap.mmap(self._index.fileno(), count * INDEX_RECORD.size, access=mmap.ACCESS_READ)
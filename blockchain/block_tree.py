@@ -0,0 +1,222 @@
+from typing import Dict, List, Optional
+from . import encoding
+from .block import Block
+
+def block_work(difficulty: int) -> int:
+    """
+    The expected number of hashes needed to find a block of the given difficulty, used as the block's work.
+    """
+    return 2 ** (8 * difficulty)
+
+class BlockNode:
+    """
+    Entry of a block in the block tree. Only the blocks outside the active chain are kept in the tree itself; the blocks of
+    the active chain are looked up in the chain by their height.
+    """
+
+    __slots__ = ('hash', 'previous_hash', 'height', 'work', 'block')
+
+    def __init__(self, block_hash: bytes, previous_hash: bytes, height: int, work: int, block: Block = None):
+        """
+        Initialize a new node.
+
+        Args:
+            block_hash (bytes): The hash of the block.
+            previous_hash (bytes): The hash of the parent block.
+            height (int): The height of the block.
+            work (int): The cumulative work of the branch ending in the block.
+            block (Block, optional): The block itself, if it is not part of the active chain. Defaults to None.
+        """
+        self.hash = block_hash
+        self.previous_hash = previous_hash
+        self.height = height
+        self.work = work
+        self.block = block
+
+class BlockTree:
+    """
+    Index of all known blocks by their hash, including competing branches.
+
+    Every node keeps the cumulative work of the branch ending in it, so the fork choice is a comparison of two numbers:
+    the tip is the block with the most cumulative work, and the first one seen among equal work. The common ancestor of two
+    branches is found by walking back from both tips, which only touches the blocks after the fork. As the work grows along
+    every branch, the tip is always one of the leaves (the ends of the branches), which are kept in the order they became
+    leaves, so removing a branch only compares the few branch ends instead of all blocks.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty block tree.
+        """
+        self._nodes: Dict[bytes, BlockNode] = {}
+        self._children: Dict[bytes, List[bytes]] = {}
+        self._leaves: Dict[bytes, None] = {}
+        self.tip: Optional[BlockNode] = None
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the nodes of the active chain in the canonical binary format: the hash, previous hash, height and
+        cumulative work (as a big-endian integer of any length) of every node. The blocks of competing branches are not serialized.
+
+        Returns:
+            bytes: The serialized tree.
+        """
+        nodes = [node for node in self._nodes.values() if node.block is None]
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        out += encoding.LENGTH.pack(len(nodes))
+        for node in nodes:
+            encoding.write_bytes(out, node.hash)
+            encoding.write_bytes(out, node.previous_hash)
+            out += encoding.INDEX.pack(node.height)
+            encoding.write_bytes(out, node.work.to_bytes((node.work.bit_length() + 7) // 8, 'big'))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BlockTree':
+        """
+        Deserialize a block tree from the canonical binary format. Previous hashes are restored as bytes.
+
+        Args:
+            data (bytes): The serialized tree.
+
+        Returns:
+            BlockTree: The deserialized tree.
+
+        Raises:
+            ValueError: If the data is not a single tree in a supported format version.
+        """
+        view = memoryview(data)
+        tree = cls()
+        offset = encoding.read_version(view, 0)
+        count, offset = encoding.read_struct(view, offset, encoding.LENGTH)
+        for _ in range(count):
+            block_hash, offset = encoding.read_bytes(view, offset)
+            previous_hash, offset = encoding.read_bytes(view, offset)
+            height, offset = encoding.read_struct(view, offset, encoding.INDEX)
+            work, offset = encoding.read_bytes(view, offset)
+            node = BlockNode(bytes(block_hash), bytes(previous_hash), height, int.from_bytes(work, 'big'))
+            tree._nodes[node.hash] = node
+            if node.previous_hash in tree._nodes:
+                tree._children.setdefault(node.previous_hash, []).append(node.hash)
+                tree._leaves.pop(node.previous_hash, None)
+            tree._leaves[node.hash] = None
+            if tree.tip is None or node.work > tree.tip.work:
+                tree.tip = node
+        if offset != len(view):
+            raise ValueError("Unexpected trailing bytes after block tree")
+        return tree
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, block_hash: bytes) -> bool:
+        return block_hash in self._nodes
+
+    def get(self, block_hash: bytes) -> Optional[BlockNode]:
+        """
+        Look up the node of a block.
+
+        Args:
+            block_hash (bytes): The hash of the block.
+
+        Returns:
+            Optional[BlockNode]: The node, or None if the block is unknown.
+        """
+        return self._nodes.get(block_hash)
+
+    def add(self, block: Block, work: int, keep_block: bool = True) -> BlockNode:
+        """
+        Add a block whose parent is already known (or the genesis block) and move the tip to it if its branch has more
+        cumulative work than the current tip.
+
+        Args:
+            block (Block): The block to add.
+            work (int): The work of the block itself (see `block_work`).
+            keep_block (bool, optional): Whether to keep the block in its node, i.e. it is not part of the active chain. Defaults to True.
+
+        Returns:
+            BlockNode: The node of the block.
+
+        Raises:
+            ValueError: If the block is already known or its parent is unknown.
+        """
+        if block.hash in self._nodes:
+            raise ValueError("Block is already known")
+        parent = self._nodes.get(block.previous_hash)
+        if parent is None and self._nodes:
+            raise ValueError("Parent block is unknown")
+        node = BlockNode(block.hash, block.previous_hash, block.index, (parent.work if parent else 0) + work, block if keep_block else None)
+        self._nodes[node.hash] = node
+        if parent is not None:
+            self._children.setdefault(parent.hash, []).append(node.hash)
+            self._leaves.pop(parent.hash, None)
+        self._leaves[node.hash] = None
+        if self.tip is None or node.work > self.tip.work:
+            self.tip = node
+        return node
+
+    def remove(self, block_hash: bytes):
+        """
+        Remove a block and all its descendants, e.g. because it turned out to be invalid. If the tip was removed, the tip is
+        chosen again among the remaining leaves: the one with the most work, and the first one that became a leaf among equal
+        work. The parent of the removed block becomes a leaf if it has no other children.
+
+        Args:
+            block_hash (bytes): The hash of the block to remove.
+        """
+        node = self._nodes[block_hash]
+        siblings = self._children.get(node.previous_hash)
+        if siblings is not None and block_hash in siblings:
+            siblings.remove(block_hash)
+            if not siblings:
+                del self._children[node.previous_hash]
+                self._leaves[node.previous_hash] = None
+        tip_removed = False
+        stack = [block_hash]
+        while stack:
+            removed_hash = stack.pop()
+            del self._nodes[removed_hash]
+            self._leaves.pop(removed_hash, None)
+            tip_removed = tip_removed or removed_hash == self.tip.hash
+            stack.extend(self._children.pop(removed_hash, []))
+        if tip_removed:
+            self.tip = max((self._nodes[leaf_hash] for leaf_hash in self._leaves), key=lambda candidate: candidate.work, default=None)
+
+    def fork_point(self, hash1: bytes, hash2: bytes) -> BlockNode:
+        """
+        Find the most recent common ancestor of two blocks.
+
+        Args:
+            hash1 (bytes): The hash of the first block.
+            hash2 (bytes): The hash of the second block.
+
+        Returns:
+            BlockNode: The node of the common ancestor (one of the blocks itself if it is an ancestor of the other).
+        """
+        node1, node2 = self._nodes[hash1], self._nodes[hash2]
+        while node1.height > node2.height:
+            node1 = self._nodes[node1.previous_hash]
+        while node2.height > node1.height:
+            node2 = self._nodes[node2.previous_hash]
+        while node1 is not node2:
+            node1 = self._nodes[node1.previous_hash]
+            node2 = self._nodes[node2.previous_hash]
+        return node1
+
+    def branch(self, ancestor_hash: bytes, tip_hash: bytes) -> List[BlockNode]:
+        """
+        Get the nodes from the block after an ancestor up to a tip.
+
+        Args:
+            ancestor_hash (bytes): The hash of the ancestor, which is not included.
+            tip_hash (bytes): The hash of the tip, which is included.
+
+        Returns:
+            List[BlockNode]: The nodes in increasing height.
+        """
+        nodes = []
+        node = self._nodes[tip_hash]
+        while node.hash != ancestor_hash:
+            nodes.append(node)
+            node = self._nodes[node.previous_hash]
+        return nodes[::-1]
@@ -1,6 +1,27 @@
 import cryptography
+import collections
+import concurrent.futures
+import queue
+import threading
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from . import encoding
 from .block import Block
+from .block_store import BlockStore
+from .block_tree import BlockNode, BlockTree, block_work
+from .chain_stream import read_blocks, write_blocks
+from .key_registry import KeyRegistry
+from .ledger import Ledger
+from .mempool import Mempool, PACKING_OBJECTIVES
+from .miner import Miner
 from .transaction import Transaction
+from .transaction_index import TransactionIndex
+from .verifier import BatchVerifier
+
+# Number of consecutive blocks whose signatures are verified as one batch by `Blockchain.is_valid`
+VALIDATION_WINDOW = 64
+
+# Number of blocks after which the state of a blockchain in a block store is snapshotted (see `Blockchain.save_state`)
+STATE_SNAPSHOT_INTERVAL = 1024
 
 class Blockchain:
     """
@@ -8,10 +29,21 @@ class Blockchain:
 
     The blockchain maintains a chain of blocks, manages pending transactions, and enables
     the mining process. It includes methods for validating the chain and retrieving balances
-    for specific addresses.
+    for specific addresses. It remembers up to which height the chain has already been
+    validated, so that later validations only need to check newly appended blocks. Balances
+    and sequence numbers are kept in a ledger that is updated whenever a block is appended, and the
+    location of every mined transaction in a transaction index. The full public keys
+    revealed by the senders of transactions are kept once in a key registry. The blocks are
+    either kept in memory or in a disk-backed block store. Given a trusted checkpoint, the
+    signatures of the blocks up to it are assumed to be valid, which speeds up syncing a long
+    chain; they can be verified later, also in the background. The signatures of blocks that
+    are buried deep enough can be pruned to save memory and storage. Blocks received from
+    elsewhere are indexed by their hash in a block tree together with competing branches, and
+    the chain follows the branch with the most cumulative work. Switching to another branch
+    only undoes and applies the blocks after the fork.
     """
 
-    def __init__(self, block_size: int, difficulty: int, crypto_provider: cryptography.CryptoProvider):
+    def __init__(self, block_size: int, difficulty: int, crypto_provider: cryptography.CryptoProvider, mining_workers: int = 1, verification_workers: int = 1, mempool: Mempool = None, block_store: BlockStore = None, columnar_blocks: bool = False, assume_valid: bytes = None, backfill: bool = False, prune_depth: int = None, prune_public_keys: bool = False, block_weight: int = None, packing: str = 'count', genesis_block: Block = None):
         """
         Initialize a new blockchain.
 
@@ -19,13 +51,71 @@ class Blockchain:
             block_size (int): The maximum number of transactions per block.
             difficulty (int): The difficulty level for the proof-of-work algorithm, determining the number of leading zeros required in the hash.
             crypto_provider (CryptoProvider): The cryptographic provider used for hashing and verification.
+            mining_workers (int, optional): The number of worker processes used for the proof-of-work. Defaults to 1 (serial mining).
+            verification_workers (int, optional): The number of worker threads verifying signatures in `is_valid`. Defaults to 1 (serial verification).
+            mempool (Mempool, optional): The pool of pending transactions, e.g. with a capacity limit or a fee-based policy. Defaults to an unlimited FIFO mempool.
+            block_store (BlockStore, optional): The disk-backed store holding the blocks. If it already contains blocks, the
+                blockchain continues from its tip; the ledger and the key registry are rebuilt on first use and the blocks are validated again by
+                the first call of `is_valid`. Defaults to keeping the blocks in memory.
+            columnar_blocks (bool, optional): Whether to pack the transactions of mined blocks into columnar buffers to save memory. Defaults to False.
+            assume_valid (bytes, optional): The hash of a trusted checkpoint block. `is_valid` does not verify the signatures of the
+                checkpoint and its ancestors, only their hashes, links and proof-of-work. Defaults to verifying every signature.
+            backfill (bool, optional): Whether to verify the signatures skipped because of the checkpoint in a background thread
+                (see `start_backfill`) as soon as `is_valid` has skipped some. Defaults to False.
+            prune_depth (int, optional): The number of blocks on top of a block after which its signatures are pruned (see `prune`).
+                Defaults to never pruning.
+            prune_public_keys (bool, optional): Whether to prune the public keys carried by the transactions as well. They are then
+                only kept in the key registry, so this is not possible for a blockchain stored in a block store, whose key registry
+                is rebuilt from the stored blocks. Defaults to False.
+
+            block_weight (int, optional): The maximum total size of the transactions per block in serialized bytes (see `Block.weight`).
+                If set, mined blocks are filled from a block template (see `Mempool.pop_template`) instead of the mempool's policy,
+                and `is_valid` rejects heavier blocks. Defaults to no limit.
+            packing (str, optional): What the block template maximizes within the block weight: 'count' for the number of
+                transactions or 'fees' for their total fee. Defaults to 'count'.
+            genesis_block (Block, optional): The genesis block to start an empty chain with, e.g. the one of another node of
+                the same network. Defaults to creating a new genesis block.
+
+        Raises:
+            ValueError: If public keys should be pruned from a blockchain stored in a block store, or the packing is not supported.
         """
+        if prune_public_keys and block_store is not None:
+            raise ValueError("Public keys cannot be pruned from a blockchain stored in a block store")
+        if packing not in PACKING_OBJECTIVES:
+            raise ValueError(f"Unsupported packing objective {packing}")
         self.block_size = block_size
+        self.block_weight = block_weight
+        self.packing = packing
         self.difficulty = difficulty
         self.crypto_provider = crypto_provider
-        self.chain = []
-        self.pending_transactions = []
-        self._create_genesis_block()
+        self.columnar_blocks = columnar_blocks
+        self.chain = block_store if block_store is not None else []
+        self.mempool = mempool if mempool is not None else Mempool()
+        self.miner = Miner(mining_workers, crypto_provider.instrumentation)
+        self.verifier = BatchVerifier(verification_workers)
+        self.validated_height = 0
+        self.assumed_valid_height = 0
+        self.history_valid = None
+        self.backfill_thread = None
+        self._checkpoint_height = None
+        self.assume_valid = assume_valid
+        self.backfill = backfill
+        self.prune_depth = prune_depth
+        self.prune_public_keys = prune_public_keys
+        # Height up to which this blockchain pruned the blocks itself; only these pruned blocks are trusted
+        self._pruned_height = block_store.pruned_height if block_store is not None else 0
+        self._ledger = None
+        self._key_registry = None
+        self._block_tree = None
+        self._transaction_index = None
+        self._snapshot_height = 0
+        if len(self.chain) == 0:
+            if genesis_block is not None:
+                self.chain.append(genesis_block)
+            else:
+                self._create_genesis_block()
+        # Blocks loaded from the block store are only pruned once they have been validated
+        self._loaded_height = len(self.chain) - 1
 
     def _create_genesis_block(self):
         """
@@ -36,70 +126,829 @@ class Blockchain:
         genesis_block.hash = genesis_block.compute_hash()
         self.chain.append(genesis_block)
 
-    def add_transaction(self, transaction: Transaction):
+    @property
+    def assume_valid(self) -> Optional[bytes]:
+        """
+        The hash of the trusted checkpoint block whose signatures and those of its ancestors `is_valid` does not verify.
+        Setting another checkpoint looks it up again and re-checks the blocks validated with signatures skipped because of the
+        previous one.
+        """
+        return self._assume_valid
+
+    @assume_valid.setter
+    def assume_valid(self, block_hash: Optional[bytes]):
+        self._assume_valid = block_hash
+        self._checkpoint_height = None
+        if self.assumed_valid_height > 0:
+            self.validated_height = 0
+            self.assumed_valid_height = 0
+            self.history_valid = None
+
+    @property
+    def ledger(self) -> Ledger:
+        """
+        The ledger holding the balances of all addresses. Built from the blocks of the chain on first access.
+        """
+        if self._ledger is None:
+            self._load_state()
+        return self._ledger
+
+    @property
+    def key_registry(self) -> KeyRegistry:
+        """
+        The registry of the public keys revealed on the chain. Built from the blocks of the chain on first access.
+        """
+        if self._key_registry is None:
+            self._load_state()
+        return self._key_registry
+
+    @property
+    def block_tree(self) -> BlockTree:
+        """
+        The index of all known blocks by their hash, including competing branches. Built from the blocks of the chain on first access.
+        """
+        if self._block_tree is None:
+            self._load_state()
+        return self._block_tree
+
+    @property
+    def transaction_index(self) -> TransactionIndex:
+        """
+        The index of the locations of all mined transactions. Built from the blocks of the chain on first access.
+        """
+        if self._transaction_index is None:
+            self._load_state()
+        return self._transaction_index
+
+    def _load_state(self):
+        """
+        Build the ledger, the key registry, the block tree and the transaction index in one pass over the blocks of the chain.
+        If the block store holds a snapshot of them (see `save_state`), only the blocks after the snapshot are applied.
+        """
+        snapshot = self._load_snapshot()
+        if snapshot is not None:
+            ledger, key_registry, block_tree, transaction_index = snapshot
+            start = ledger.height + 1
+        else:
+            ledger = Ledger()
+            key_registry = KeyRegistry(self.crypto_provider)
+            block_tree = BlockTree()
+            transaction_index = TransactionIndex()
+            block_tree.add(self.chain[0], block_work(self.difficulty), keep_block=False)
+            start = 1
+        for height in range(start, len(self.chain)):
+            block = self.chain[height]
+            ledger.apply_block(block)
+            key_registry.register_block(block)
+            block_tree.add(block, block_work(self.difficulty), keep_block=False)
+            transaction_index.add_block(block)
+        self._ledger = ledger
+        self._key_registry = key_registry
+        self._block_tree = block_tree
+        self._transaction_index = transaction_index
+
+    def _load_snapshot(self) -> Optional[Tuple[Ledger, KeyRegistry, BlockTree, TransactionIndex]]:
+        """
+        Load the state snapshot of the block store, if there is one and it belongs to a prefix of the chain. A snapshot of
+        another format version, of dropped blocks or that is malformed is ignored, so the state is rebuilt from the blocks.
+        """
+        if not isinstance(self.chain, BlockStore):
+            return None
+        data = self.chain.load_state()
+        if data is None:
+            return None
+        try:
+            view = memoryview(data)
+            offset = encoding.read_version(view, 0)
+            height, offset = encoding.read_struct(view, offset, encoding.INDEX)
+            tip_hash, offset = encoding.read_bytes(view, offset)
+            if height >= len(self.chain) or self.chain[height].hash != tip_hash:
+                return None
+            parts = []
+            for _ in range(4):
+                part, offset = encoding.read_bytes(view, offset)
+                parts.append(part)
+            if offset != len(view):
+                raise ValueError("Unexpected trailing bytes after state snapshot")
+            ledger = Ledger.from_bytes(parts[0])
+            key_registry = KeyRegistry.from_bytes(parts[1], self.crypto_provider)
+            block_tree = BlockTree.from_bytes(parts[2])
+            transaction_index = TransactionIndex.from_bytes(parts[3])
+        except ValueError:
+            return None
+        if ledger.height != height or block_tree.tip is None or block_tree.tip.hash != tip_hash:
+            return None
+        self._snapshot_height = height
+        return ledger, key_registry, block_tree, transaction_index
+
+    def save_state(self):
         """
-        Add a new transaction to the list of pending transactions.
+        Snapshot the ledger, the key registry, the block tree (without competing branches) and the transaction index into
+        the block store, so that opening the store again only applies the blocks appended after the snapshot instead of
+        the whole chain. Called automatically every `STATE_SNAPSHOT_INTERVAL` blocks.
+
+        Raises:
+            ValueError: If the blockchain is not stored in a block store.
+        """
+        if not isinstance(self.chain, BlockStore):
+            raise ValueError("Only the state of a blockchain in a block store can be saved")
+        height = len(self.chain) - 1
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        out += encoding.INDEX.pack(height)
+        encoding.write_bytes(out, self.chain[height].hash)
+        for state in (self.ledger, self.key_registry, self.block_tree, self.transaction_index):
+            encoding.write_bytes(out, state.to_bytes())
+        self.chain.save_state(bytes(out))
+        self._snapshot_height = height
+
+    def _save_state_if_due(self):
+        if isinstance(self.chain, BlockStore) and len(self.chain) - 1 - self._snapshot_height >= STATE_SNAPSHOT_INTERVAL:
+            self.save_state()
+
+    @property
+    def pending_transactions(self) -> List[Transaction]:
+        """
+        The transactions waiting in the mempool, in the order they were admitted.
+        """
+        return list(self.mempool)
+
+    def add_transaction(self, transaction: Transaction) -> bool:
+        """
+        Add a new transaction to the mempool of pending transactions. The transaction is only admitted if it is signed
+        with a valid signature and not already pending. If the sender's public key has not been revealed on the chain yet,
+        the transaction has to carry it. Transactions whose sequence number has already been used by a mined transaction of
+        the sender, such as replays of mined transactions, are rejected.
 
         Args:
             transaction (Transaction): The transaction to be added to the blockchain.
+
+        Returns:
+            bool: True if the transaction was admitted to the mempool; False otherwise.
+        """
+        if transaction.sequence < self.ledger.next_sequence(transaction.sender):
+            return False
+        return self.mempool.add(transaction, self.key_registry)
+
+    def find_transaction(self, digest: bytes) -> Optional[Tuple[int, int]]:
         """
-        self.pending_transactions.append(transaction)
+        Look up where a transaction was mined.
+
+        Args:
+            digest (bytes): The hash of the transaction (see `Transaction.compute_hash`).
+
+        Returns:
+            Optional[Tuple[int, int]]: The height of the block and the transaction's position in it, or None if it was not mined.
+        """
+        return self.transaction_index.get(digest)
 
     def mine_pending_transactions(self):
         """
-        Mine the pending transactions and add a new block to the blockchain. Mines transactions up to the block size limit,
-        computes the proof-of-work to meet the difficulty level, and adds the new block to the chain. Resets pending transactions
-        after the block is mined.
+        Mine the pending transactions and add a new block to the blockchain. Takes transactions up to the block size limit
+        from the mempool in the order of its policy or, if a block weight is set, the block template that packs the most
+        transactions (or fees) into it, computes the proof-of-work to meet the difficulty level, and adds the
+        new block to the chain. The transactions of every sender are ordered by their sequence numbers; transactions whose
+        predecessors are not part of the block go back to the mempool, and ones whose sequence number has already been
+        used are dropped (see `_order_by_sequence`). Public keys that are already in the key registry, or revealed by an earlier transaction of
+        the block, are removed from the transactions so that every key is stored on the chain only once. The statistics of the proof-of-work (attempts,
+        time-to-solution and hashrate) are available afterwards via `miner.stats` and are reported to the crypto provider's instrumentation, if any.
 
         Returns:
             str: Message indicating if there were no transactions to mine.
         """
-        if not self.pending_transactions:
+        block = self.build_block()
+        if block is None:
             return "No transactions to mine."
-        block = Block(len(self.chain), self.chain[-1].compute_hash(), self.pending_transactions[:self.block_size], self.crypto_provider)
-        while not block.compute_hash().startswith(b'\x00' * self.difficulty):
-            block.nonce += 1
-        block.hash = block.compute_hash()
+        self.miner.mine(block, self.difficulty)
+        self.add_mined_block(block)
+
+    def build_block(self) -> Optional[Block]:
+        """
+        Take the pending transactions for a new block on top of the chain, like `mine_pending_transactions`, without
+        computing its proof-of-work. The block can be mined elsewhere, e.g. in another thread with `miner.mine`, and added
+        with `add_mined_block`.
+
+        Returns:
+            Optional[Block]: The block without proof-of-work, or None if there were no transactions to mine.
+        """
+        if self.block_weight is not None:
+            transactions = self.mempool.pop_template(self.block_weight, self.block_size, self.packing)
+        else:
+            transactions = self.mempool.pop(self.block_size)
+        transactions = self._order_by_sequence(transactions)
+        if not transactions:
+            return None
+        revealed = set()
+        for transaction in transactions:
+            if transaction.public_key is not None:
+                if transaction.sender in self.key_registry or transaction.sender in revealed:
+                    transaction.public_key = None
+                else:
+                    revealed.add(transaction.sender)
+        return Block(len(self.chain), self.chain[-1].hash, transactions, self.crypto_provider)
+
+    def add_mined_block(self, block: Block) -> bool:
+        """
+        Add a block created by `build_block` once its proof-of-work has been computed. If the chain has changed in the
+        meantime, the block is added like a received one (see `add_block`) and its transactions that are not on the chain
+        go back to the mempool.
+
+        Args:
+            block (Block): The mined block.
+
+        Returns:
+            bool: True if the block was appended to the chain; False if it ended up on a competing branch or was rejected.
+        """
+        if block.previous_hash != self.chain[-1].hash:
+            self.add_block(block)
+            if self.chain[-1].hash == block.hash:
+                return True
+            revealed = {transaction.sender: transaction.public_key for transaction in block.transactions if transaction.public_key is not None}
+            for transaction in block.transactions:
+                self.add_transaction(self._with_public_key(transaction, revealed))
+            return False
+        if self.columnar_blocks:
+            block.compact()
+        self.ledger.apply_block(block)
+        self.key_registry.register_block(block)
+        self.block_tree.add(block, block_work(self.difficulty), keep_block=False)
+        self.transaction_index.add_block(block)
+        self.chain.append(block)
+        self.prune()
+        self._save_state_if_due()
+        return True
+
+    def _order_by_sequence(self, transactions: List[Transaction]) -> List[Transaction]:
+        """
+        Keep the transactions that continue their sender's sequence numbers without gaps, reordering them by their sequence
+        numbers within the positions of their sender. Transactions following a gap are returned to their position in the mempool (see `Mempool.requeue`), and ones
+        whose sequence number has already been used (on the chain or by another of the transactions) are dropped.
+        """
+        by_sender: Dict[str, List[Transaction]] = {}
+        for transaction in transactions:
+            by_sender.setdefault(transaction.sender, []).append(transaction)
+        ready: Dict[str, List[Transaction]] = {}
+        held_back = []
+        for sender, sender_transactions in by_sender.items():
+            sequence = self.ledger.next_sequence(sender)
+            for transaction in sorted(sender_transactions, key=lambda transaction: transaction.sequence):
+                if transaction.sequence == sequence:
+                    ready.setdefault(sender, []).append(transaction)
+                    sequence += 1
+                elif transaction.sequence > sequence:
+                    held_back.append(transaction)
+        # Held back transactions keep their position in the mempool and are not verified again
+        self.mempool.requeue(held_back, self.key_registry)
+        queues = {sender: iter(sender_transactions) for sender, sender_transactions in ready.items()}
+        counts = {sender: len(sender_transactions) for sender, sender_transactions in ready.items()}
+        ordered = []
+        for transaction in transactions:
+            if counts.get(transaction.sender, 0) > 0:
+                counts[transaction.sender] -= 1
+                ordered.append(next(queues[transaction.sender]))
+        return ordered
+
+    def get_block(self, block_hash: bytes) -> Optional[Block]:
+        """
+        Look up a block of the chain or of a competing branch by its hash.
+
+        Args:
+            block_hash (bytes): The hash of the block.
+
+        Returns:
+            Optional[Block]: The block, or None if it is unknown.
+        """
+        node = self.block_tree.get(block_hash)
+        if node is None:
+            return None
+        return node.block if node.block is not None else self.chain[node.height]
+
+    def add_block(self, block: Block) -> bool:
+        """
+        Add a block received from elsewhere, e.g. mined by another node. The block has to extend a known block and pass the
+        checks that do not depend on the rest of its branch (hashes, proof-of-work and block weight). It is added to the block
+        tree, and if its branch now has more cumulative work than the chain, the chain is reorganized onto it: the blocks after
+        the fork are rolled back in the ledger and the key registry, the blocks of the new branch are verified and applied,
+        and the transactions of the rolled back blocks that are not part of the new branch are returned to the mempool. If a
+        block of the new branch turns out to be invalid, it is dropped together with its descendants and the chain switches
+        back. Branches forking below the pruned blocks are rejected, since the pruned blocks could not be restored.
+
+        Args:
+            block (Block): The block to add.
+
+        Returns:
+            bool: True if the block was added to the chain or kept as part of a competing branch; False otherwise.
+        """
+        parent = self.block_tree.get(block.previous_hash)
+        if (
+            block.hash in self.block_tree or
+            parent is None or
+            block.index != parent.height + 1 or
+            not block.has_valid_hashes() or
+            not block.meets_difficulty(self.difficulty) or
+            (self.block_weight is not None and block.weight > self.block_weight)
+        ):
+            return False
+        self.block_tree.add(block, block_work(self.difficulty))
+        while self.block_tree.tip.work > self.block_tree.get(self.chain[-1].hash).work:
+            self._reorganize(self.block_tree.tip)
+        return block.hash in self.block_tree
+
+    def _reorganize(self, tip: BlockNode):
+        """
+        Switch the chain to the branch ending in the given tip. Drops the first invalid block of the branch (and its
+        descendants) from the block tree and restores the previous chain if the branch turns out to be invalid.
+        """
+        fork = self.block_tree.fork_point(self.chain[-1].hash, tip.hash)
+        branch = self.block_tree.branch(fork.hash, tip.hash)
+        if fork.height < self._pruned_height:
+            self.block_tree.remove(branch[0].hash)
+            return
+        disconnected = self._disconnect(fork.height)
+        revealed = {
+            transaction.sender: transaction.public_key
+            for node in disconnected for transaction in node.block.transactions if transaction.public_key is not None
+        }
+        for node in branch:
+            if not self._connect(node):
+                self.block_tree.remove(node.hash)
+                self._disconnect(fork.height)
+                for old_node in disconnected:
+                    self._connect(old_node)
+                return
+        included = set()
+        for node in branch:
+            for transaction in self.chain[node.height].transactions:
+                included.add(transaction.compute_hash())
+                self.mempool.remove(transaction)
+        for node in disconnected:
+            for transaction in node.block.transactions:
+                if transaction.compute_hash() not in included:
+                    self.add_transaction(self._with_public_key(transaction, revealed))
+        self.prune()
+
+    def _disconnect(self, height: int) -> List[BlockNode]:
+        """
+        Roll the chain back to the given height, keeping the removed blocks in their nodes of the block tree. Returns the
+        nodes of the removed blocks in increasing height.
+        """
+        nodes = []
+        for block_height in range(height + 1, len(self.chain)):
+            node = self.block_tree.get(self.chain[block_height].hash)
+            node.block = self.chain[block_height]
+            nodes.append(node)
+        self.ledger.rollback(height)
+        self.key_registry.rollback(height)
+        self.transaction_index.rollback(height)
+        if isinstance(self.chain, BlockStore):
+            self.chain.truncate(height + 1)
+        else:
+            del self.chain[height + 1:]
+        self.validated_height = min(self.validated_height, height)
+        self.assumed_valid_height = min(self.assumed_valid_height, height)
+        self._loaded_height = min(self._loaded_height, height)
+        self._snapshot_height = min(self._snapshot_height, height)
+        if self._checkpoint_height is not None and self._checkpoint_height > height:
+            self._checkpoint_height = None
+        return nodes
+
+    def _connect(self, node: BlockNode) -> bool:
+        """
+        Verify the block of a node against the tip of the chain and append it. The block's public keys are registered
+        before its signatures are verified, and unregistered again if the block is invalid.
+        """
+        block = node.block
+        self.key_registry.register_block(block)
+        if (
+            not self._are_public_keys_revealed(block) or
+            not self._are_sequences_valid(block) or
+            self.verifier.verify(block.transactions, self.key_registry) is not None
+        ):
+            self.key_registry.rollback(block.index - 1)
+            return False
+        if self.columnar_blocks:
+            block.compact()
+        self.ledger.apply_block(block)
+        self.transaction_index.add_block(block)
         self.chain.append(block)
-        self.pending_transactions = self.pending_transactions[self.block_size:]
+        node.block = None
+        if self.validated_height == block.index - 1:
+            self.validated_height = block.index
+        self._save_state_if_due()
+        return True
 
-    def is_valid(self) -> bool:
+    def _with_public_key(self, transaction: Transaction, revealed: Dict[str, bytes]) -> Transaction:
+        """
+        Get a copy of a rolled back transaction carrying its sender's public key, if the key was only revealed by a rolled
+        back block and is therefore no longer in the key registry.
+        """
+        if transaction.public_key is not None or transaction.sender in self.key_registry or transaction.sender not in revealed:
+            return transaction
+        copy = Transaction.from_bytes(transaction.to_bytes(), self.crypto_provider)
+        copy.public_key = revealed[transaction.sender]
+        return copy
+
+    def prune(self):
+        """
+        Prune the signatures (and, if configured, the carried public keys) of all blocks that have at least `prune_depth`
+        blocks on top of them (see `Block.prune`). Blocks loaded from the block store are only pruned once `is_valid` has
+        verified them. In a block store, the pruned blocks replace the original ones, and the store is compacted once the
+        replaced versions take up more space than the current ones. Called automatically after mining.
+        """
+        if self.prune_depth is None:
+            return
+        for height in range(self._pruned_height + 1, len(self.chain) - self.prune_depth):
+            if self.validated_height < height <= self._loaded_height:
+                break
+            block = self.chain[height]
+            if not block.pruned:
+                block.prune(self.prune_public_keys)
+                if isinstance(self.chain, BlockStore):
+                    self.chain.replace(height, block)
+            self._pruned_height = height
+        if isinstance(self.chain, BlockStore) and self.chain.pruned_height != self._pruned_height:
+            self.chain.pruned_height = self._pruned_height
+        if isinstance(self.chain, BlockStore) and self.chain.wasted_bytes > self.chain.live_bytes:
+            self.chain.compact()
+
+    def is_valid(self, full: bool = False) -> bool:
         """
         Verify the integrity of the blockchain. Checks each block in the chain to ensure all blocks are valid and that the hashes
-        link correctly to maintain the chain's integrity.
+        link correctly to maintain the chain's integrity. The chain is checked in windows of consecutive blocks: the hashes,
+        the proof-of-work of a window, the availability of the senders' public keys and the senders' sequence numbers are checked first, then the signatures of all its transactions are verified as one batch by the blockchain's
+        verifier. Only blocks above the validated height are checked, unless a full check is requested. The validated height
+        is advanced after every window that passes the check. Blocks heavier than the block weight are rejected.
+
+        The signatures of pruned blocks cannot be verified, so only their hashes, links and proof-of-work are checked. As the
+        pruned flag is not covered by a block's hash, this is only done for blocks this blockchain pruned itself after
+        validating them, or that are covered by the trusted checkpoint; other pruned blocks are invalid. If the trusted checkpoint (`assume_valid`) is part of the chain, the signatures of the checkpoint and its ancestors are
+        not verified either. The height up to which this was skipped is kept in `assumed_valid_height` until `verify_history` has
+        verified them.
+
+        Args:
+            full (bool, optional): Whether to re-check the whole chain from the first block. Defaults to False.
 
         Returns:
             bool: True if the blockchain is valid; False otherwise.
         """
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-            if (
-                not current_block.is_valid() or
-                current_block.previous_hash != previous_block.hash
-            ):
+        if full:
+            self.validated_height = 0
+        start = self.validated_height + 1
+        checkpoint_height = self._find_checkpoint(start)
+        previous_hash = self.chain[start - 1].hash
+        for window_start in range(start, len(self.chain), VALIDATION_WINDOW):
+            blocks = self.chain[window_start:window_start + VALIDATION_WINDOW]
+            for block in blocks:
+                if (
+                    not block.has_valid_hashes() or
+                    not block.meets_difficulty(self.difficulty) or
+                    (self.block_weight is not None and block.weight > self.block_weight) or
+                    block.previous_hash != previous_hash or
+                    not self._are_public_keys_revealed(block) or
+                    not self._are_sequences_valid(block) or
+                    (block.pruned and block.index > max(self._pruned_height, checkpoint_height))
+                ):
+                    return False
+                previous_hash = block.hash
+            transactions = (
+                transaction for block in blocks if block.index > checkpoint_height and not block.pruned for transaction in block.transactions
+            )
+            if self.verifier.verify(transactions, self.key_registry) is not None:
+                return False
+            self.validated_height = window_start + len(blocks) - 1
+            if checkpoint_height >= window_start and min(checkpoint_height, self.validated_height) > self.assumed_valid_height:
+                # The newly skipped signatures are not covered by an earlier verification of the history
+                self.assumed_valid_height = min(checkpoint_height, self.validated_height)
+                self.history_valid = None
+        if self.backfill and self.assumed_valid_height > 0 and self.history_valid is None:
+            self.start_backfill()
+        return True
+
+    def _find_checkpoint(self, start: int) -> int:
+        """
+        Find the height of the trusted checkpoint block, searching from the tip down to the given height. Returns 0 if no
+        checkpoint is set or it is not part of the searched blocks.
+        """
+        if self.assume_valid is None:
+            return 0
+        if self._checkpoint_height is None:
+            for height in range(len(self.chain) - 1, start - 1, -1):
+                if self.chain[height].hash == self.assume_valid:
+                    self._checkpoint_height = height
+                    break
+            else:
+                return 0
+        return self._checkpoint_height
+
+    def verify_history(self) -> bool:
+        """
+        Verify the signatures that `is_valid` skipped because they precede the trusted checkpoint, in windows of consecutive
+        blocks. Pruned blocks are skipped. The result is also kept in `history_valid`.
+
+        Returns:
+            bool: True if all skipped signatures are valid; False otherwise.
+        """
+        height = self.assumed_valid_height
+        for window_start in range(1, height + 1, VALIDATION_WINDOW):
+            blocks = self.chain[window_start:min(window_start + VALIDATION_WINDOW, height + 1)]
+            transactions = (transaction for block in blocks if not block.pruned for transaction in block.transactions)
+            if self.verifier.verify(transactions, self.key_registry) is not None:
+                self.history_valid = False
+                return False
+        # Signatures skipped while this ran are left to the next run
+        if self.assumed_valid_height == height:
+            self.assumed_valid_height = 0
+            self.history_valid = True
+        return True
+
+    def start_backfill(self) -> threading.Thread:
+        """
+        Run `verify_history` in a background thread, while the blockchain continues to be used. Its result is available in
+        `history_valid` once the thread has finished. If a backfill is still running, no other one is started.
+
+        Returns:
+            threading.Thread: The started thread, or the running one.
+        """
+        if self.backfill_thread is not None and self.backfill_thread.is_alive():
+            return self.backfill_thread
+        self.history_valid = None
+        self.backfill_thread = threading.Thread(target=self.verify_history, daemon=True)
+        self.backfill_thread.start()
+        return self.backfill_thread
+
+    def export_chain(self, fp: BinaryIO, format: str = 'binary') -> int:
+        """
+        Write the blocks of the chain to a file one at a time (see `write_blocks`), so a chain held in a block store is not
+        loaded into memory as a whole.
+
+        Args:
+            fp (BinaryIO): The file to write to, opened in binary mode.
+            format (str, optional): Either 'binary' or 'jsonl' (JSON Lines, for debugging). Defaults to 'binary'.
+
+        Returns:
+            int: The number of exported blocks.
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        return write_blocks(self.chain, fp, format)
+
+    def import_chain(self, fp: BinaryIO, format: str = 'binary', window: int = VALIDATION_WINDOW) -> int:
+        """
+        Read blocks exported by `export_chain` and append the ones after the tip of the chain. The import is a pipeline of
+        three stages running at the same time: a thread parses the blocks, the calling thread checks their hashes, links,
+        proof-of-work, block weight, public keys and sequence numbers and applies them to the ledger, and the signatures of
+        every `window` checked blocks are verified as one batch by the blockchain's verifier in another thread. A window is
+        appended to the chain once its signatures are valid. At most `window` parsed blocks wait to be checked and at most
+        one window waits for its signatures while the next one is checked, so the memory used does not depend on the length
+        of the chain.
+
+        Blocks the chain already holds have to match it, except that a chain holding only its own genesis block adopts the
+        genesis block of the file. Pruned blocks are only accepted if the trusted checkpoint (`assume_valid`) follows them in
+        the file, since their signatures cannot be verified. Like in `is_valid`, the signatures of the checkpoint and its
+        ancestors are not verified: until the checkpoint is read, windows are appended without verifying their signatures, and
+        they are only verified after the last block if the file does not contain the checkpoint. The height up to which they
+        were skipped is kept in `assumed_valid_height`, and a backfill is started if `backfill` is set. The import stops at the first invalid block or error reading the file,
+        keeps the windows verified before it and rolls back the rest. Transactions of the appended blocks are removed from the mempool.
+
+        Args:
+            fp (BinaryIO): The file to read from, opened in binary mode.
+            format (str, optional): Either 'binary' or 'jsonl'. Defaults to 'binary'.
+            window (int, optional): The number of blocks whose signatures are verified as one batch. Defaults to `VALIDATION_WINDOW`.
+
+        Returns:
+            int: The number of appended blocks.
+
+        Raises:
+            ValueError: If the format is not supported, the file is malformed, or a block does not match the chain or is invalid.
+        """
+        parsed = queue.Queue(maxsize=window)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    parsed.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def parse():
+            try:
+                for block in read_blocks(fp, self.crypto_provider, format):
+                    if not put(block):
+                        return
+                put(None)
+            except BaseException as error:
+                # Forwarded to the calling thread, which would otherwise wait for the next block forever
+                put(error)
+
+        verifications = collections.deque()
+        length = len(self.chain)
+
+        # Height of the trusted checkpoint, None while it is set but has not been read yet
+        checkpoint_height = self._find_checkpoint(1)
+        if self.assume_valid is not None and checkpoint_height == 0:
+            checkpoint_height = None
+
+        # Heights of the first pruned block and of the first block with skipped signatures not yet covered by the checkpoint
+        unconfirmed_height = None
+        skipped_height = None
+
+        def submit(blocks: List[Block]):
+            nonlocal skipped_height
+            if checkpoint_height is None:
+                # Covered by the checkpoint if it follows in the file, otherwise verified after the last block
+                if skipped_height is None:
+                    skipped_height = blocks[0].index
+                verifications.append((blocks, None))
+                return
+            transactions = [
+                transaction for block in blocks if block.index > checkpoint_height and not block.pruned for transaction in block.transactions
+            ]
+            verifications.append((blocks, executor.submit(self.verifier.verify, transactions, self.key_registry)))
+
+        def finish(blocks: List[Block], future: Optional[concurrent.futures.Future]):
+            nonlocal skipped_height
+            if future is not None and future.result() is not None:
+                # The windows after the invalid one must not be appended
+                verifications.clear()
+                raise ValueError(f"Invalid signature in blocks {blocks[0].index} to {blocks[-1].index}")
+            for block in blocks:
+                self.chain.append(block)
+                self.block_tree.add(block, block_work(self.difficulty), keep_block=False)
+                if self.validated_height == block.index - 1:
+                    self.validated_height = block.index
+                if block.hash == self.assume_valid and block.index > self.assumed_valid_height:
+                    self.assumed_valid_height = block.index
+                    self.history_valid = None
+                    skipped_height = None
+                if len(self.mempool):
+                    for transaction in block.transactions:
+                        self.mempool.remove(transaction)
+
+        def drop_unconfirmed():
+            heights = [height for height in (unconfirmed_height, skipped_height) if height is not None and height < len(self.chain)]
+            if heights:
+                first_hash = self.chain[min(heights)].hash
+                self._disconnect(min(heights) - 1)
+                self.block_tree.remove(first_hash)
+
+        parser = threading.Thread(target=parse, daemon=True)
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+        parser.start()
+        try:
+            previous_hash = self.chain[-1].hash
+            blocks = []
+            while True:
+                block = parsed.get()
+                if block is None:
+                    break
+                if isinstance(block, BaseException):
+                    raise block
+                if block.index < len(self.chain):
+                    if block.hash != self.chain[block.index].hash:
+                        if block.index != 0 or len(self.block_tree) > 1 or not block.has_valid_hashes():
+                            raise ValueError(f"Block {block.index} does not match the chain")
+                        self._adopt_genesis(block)
+                        previous_hash = block.hash
+                    continue
+                self.key_registry.register_block(block)
+                if (
+                    block.index != self.ledger.height + 1 or
+                    block.previous_hash != previous_hash or
+                    not block.has_valid_hashes() or
+                    not block.meets_difficulty(self.difficulty) or
+                    (self.block_weight is not None and block.weight > self.block_weight) or
+                    not self._are_public_keys_revealed(block) or
+                    not self._are_sequences_valid(block)
+                ):
+                    raise ValueError(f"Block {block.index} is invalid")
+                # The pruned flag is not covered by the block's hash, so only the trusted checkpoint vouches for pruned blocks
+                if block.pruned:
+                    if self.assume_valid is None:
+                        raise ValueError(f"Block {block.index} is pruned and no trusted checkpoint is set")
+                    if unconfirmed_height is None:
+                        unconfirmed_height = block.index
+                if block.hash == self.assume_valid:
+                    unconfirmed_height = None
+                    checkpoint_height = block.index
+                if self.columnar_blocks:
+                    block.compact()
+                self.ledger.apply_block(block)
+                self.transaction_index.add_block(block)
+                previous_hash = block.hash
+                blocks.append(block)
+                if len(blocks) == window:
+                    submit(blocks)
+                    blocks = []
+                    while len(verifications) > 1:
+                        finish(*verifications.popleft())
+            if blocks:
+                submit(blocks)
+            while verifications:
+                finish(*verifications.popleft())
+            # The checkpoint did not follow the skipped blocks, so their signatures are verified after all
+            while skipped_height is not None:
+                blocks = self.chain[skipped_height:skipped_height + window]
+                transactions = [transaction for block in blocks if not block.pruned for transaction in block.transactions]
+                if self.verifier.verify(transactions, self.key_registry) is not None:
+                    raise ValueError(f"Invalid signature in blocks {blocks[0].index} to {blocks[-1].index}")
+                skipped_height = blocks[-1].index + 1 if blocks[-1].index + 1 < len(self.chain) else None
+            if unconfirmed_height is not None:
+                raise ValueError(f"Pruned block {unconfirmed_height} is not covered by the trusted checkpoint")
+        except BaseException:
+            stopped.set()
+            try:
+                while verifications:
+                    finish(*verifications.popleft())
+            except Exception:
+                pass
+            executor.shutdown(cancel_futures=True)
+            drop_unconfirmed()
+            height = len(self.chain) - 1
+            self.ledger.rollback(height)
+            self.key_registry.rollback(height)
+            self.transaction_index.rollback(height)
+            raise
+        finally:
+            stopped.set()
+            executor.shutdown()
+            parser.join()
+        if self.backfill and self.assumed_valid_height > 0 and self.history_valid is None:
+            self.start_backfill()
+        self.prune()
+        self._save_state_if_due()
+        return len(self.chain) - length
+
+    def _adopt_genesis(self, block: Block):
+        """
+        Replace the genesis block of a chain that holds no other blocks, e.g. to import the chain of another node. The
+        ledger, key registry, block tree and transaction index are rebuilt on their next access.
+        """
+        if isinstance(self.chain, BlockStore):
+            self.chain.truncate(0)
+        else:
+            self.chain.clear()
+        self.chain.append(block)
+        self._ledger = None
+        self._key_registry = None
+        self._block_tree = None
+        self._transaction_index = None
+        self._snapshot_height = 0
+
+    def _are_public_keys_revealed(self, block: Block) -> bool:
+        """
+        Check that every transaction of the block either carries its sender's public key or spends from an address whose
+        key was revealed at or below the block's height.
+        """
+        return all(
+            transaction.public_key is not None or self.key_registry.get(transaction.sender, block.index) is not None
+            for transaction in block.transactions
+        )
+
+    def _are_sequences_valid(self, block: Block) -> bool:
+        """
+        Check that the transactions of every sender in the block continue the sender's sequence numbers at the block's
+        height without gaps or repetitions.
+        """
+        sequences: Dict[str, int] = {}
+        for transaction in block.transactions:
+            sequence = sequences.get(transaction.sender)
+            if sequence is None:
+                sequence = self.ledger.next_sequence(transaction.sender, block.index - 1)
+            if transaction.sequence != sequence:
                 return False
+            sequences[transaction.sender] = sequence + 1
         return True
 
-    def get_balance(self, address):
+    def get_balance(self, address: str, height: int = None) -> int:
         """
-        Calculate the balance for a given address. Iterates through the blockchain to sum up all transactions related to the specified
-        address to determine the current balance.
+        Look up the balance for a given address in the ledger, either at the tip of the chain or after the block at the
+        given height.
 
         Args:
             address (str): The address to calculate the balance for.
+            height (int, optional): The height of the block after which the balance is looked up. Defaults to the tip of the chain.
 
         Returns:
             int: The balance of the specified address.
         """
-        balance = 0
+        return self.ledger.get_balance(address, height)
+
+    def is_ledger_consistent(self) -> bool:
+        """
+        Check the ledger against balances recomputed by iterating through all transactions in the blockchain.
+
+        Returns:
+            bool: True if the ledger matches the full scan of the chain; False otherwise.
+        """
+        balances = {}
         for block in self.chain:
             for transaction in block.transactions:
-                if transaction.recipient == address:
-                    balance += transaction.amount
-                if transaction.sender == address:
-                    balance -= transaction.amount
-        return balance
+                balances[transaction.recipient] = balances.get(transaction.recipient, 0) + transaction.amount
+                balances[transaction.sender] = balances.get(transaction.sender, 0) - transaction.amount - transaction.fee
+        return self.ledger.height == len(self.chain) - 1 and self.ledger.snapshot() == balances
 
     def __str__(self) -> str: # pragma: no cover
         return (
@@ -0,0 +1,146 @@
+import cryptography
+import json
+from typing import BinaryIO, Iterable, Iterator, Optional
+from . import encoding
+from .block import Block
+from .transaction import Transaction
+
+# Formats a chain can be exported in
+CHAIN_FORMATS = ('binary', 'jsonl')
+
+# Magic bytes at the start of a chain exported in the binary format
+CHAIN_MAGIC = b'PQBC'
+
+def _hex(data: Optional[bytes]) -> Optional[str]:
+    return bytes(data).hex() if data is not None else None
+
+def _unhex(data: Optional[str]) -> Optional[bytes]:
+    return bytes.fromhex(data) if data is not None else None
+
+def block_to_json(block: Block) -> dict:
+    """
+    Convert a block into a JSON-compatible dictionary with hex-encoded byte strings. Used for the JSON Lines format.
+    """
+    previous_hash = block.previous_hash.encode() if isinstance(block.previous_hash, str) else block.previous_hash
+    return {
+        "index": block.index,
+        "previous_hash": _hex(previous_hash),
+        "merkle_root": _hex(block.merkle_root),
+        "timestamp": block.timestamp,
+        "nonce": block.nonce,
+        "hash": _hex(block.hash),
+        "pruned": block.pruned,
+        "transactions": [
+            {
+                "sender": transaction.sender,
+                "recipient": transaction.recipient,
+                "amount": transaction.amount,
+                "fee": transaction.fee,
+                "sequence": transaction.sequence,
+                "signature": _hex(transaction.signature),
+                "signature_hash": _hex(transaction.signature_hash),
+                "public_key": _hex(transaction.public_key),
+            }
+            for transaction in block.transactions
+        ],
+    }
+
+def block_from_json(data: dict, crypto_provider: cryptography.CryptoProvider) -> Block:
+    """
+    Restore a block from a dictionary created by `block_to_json`. Like `Block.from_bytes`, the previous hash is restored as bytes.
+
+    Raises:
+        ValueError: If a field is missing or malformed.
+    """
+    try:
+        transactions = []
+        for fields in data["transactions"]:
+            transaction = Transaction(
+                fields["sender"], fields["recipient"], fields["amount"], crypto_provider, fields["fee"],
+                _unhex(fields["public_key"]), fields["sequence"]
+            )
+            transaction.signature = _unhex(fields["signature"])
+            transaction.signature_hash = _unhex(fields["signature_hash"])
+            transactions.append(transaction)
+        block = Block(data["index"], _unhex(data["previous_hash"]), transactions, crypto_provider, data["timestamp"], _unhex(data["merkle_root"]))
+        block.nonce = data["nonce"]
+        block.hash = _unhex(data["hash"])
+        block.pruned = data["pruned"]
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Malformed block: {error!r}") from error
+    return block
+
+def write_blocks(blocks: Iterable[Block], fp: BinaryIO, format: str = 'binary') -> int:
+    """
+    Write blocks to a file one at a time, so only one serialized block is held in memory.
+
+    The binary format starts with `CHAIN_MAGIC` followed by every block in the canonical binary format (see `Block.to_bytes`),
+    prefixed with its length. The JSON Lines format writes one JSON object per block (see `block_to_json`), which is larger
+    but can be read and compared with standard tools.
+
+    Args:
+        blocks (Iterable[Block]): The blocks to write, e.g. the chain of a blockchain or a block store.
+        fp (BinaryIO): The file to write to, opened in binary mode.
+        format (str, optional): Either 'binary' or 'jsonl'. Defaults to 'binary'.
+
+    Returns:
+        int: The number of blocks written.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if format not in CHAIN_FORMATS:
+        raise ValueError(f"Unknown chain format '{format}', expected one of {CHAIN_FORMATS}")
+    if format == 'binary':
+        fp.write(CHAIN_MAGIC)
+    count = 0
+    for block in blocks:
+        if format == 'binary':
+            data = block.to_bytes()
+            fp.write(encoding.LENGTH.pack(len(data)))
+            fp.write(data)
+        else:
+            fp.write(json.dumps(block_to_json(block), separators=(',', ':')).encode())
+            fp.write(b'\n')
+        count += 1
+    return count
+
+def read_blocks(fp: BinaryIO, crypto_provider: cryptography.CryptoProvider, format: str = 'binary') -> Iterator[Block]:
+    """
+    Read blocks written by `write_blocks` one at a time. The blocks are only parsed, not checked.
+
+    Args:
+        fp (BinaryIO): The file to read from, opened in binary mode.
+        crypto_provider (CryptoProvider): The cryptographic provider of the blocks.
+        format (str, optional): Either 'binary' or 'jsonl'. Defaults to 'binary'.
+
+    Yields:
+        Block: The blocks in the order they were written.
+
+    Raises:
+        ValueError: If the format is not supported or the file is malformed or truncated.
+    """
+    if format not in CHAIN_FORMATS:
+        raise ValueError(f"Unknown chain format '{format}', expected one of {CHAIN_FORMATS}")
+    if format == 'jsonl':
+        for line in fp:
+            if line.strip():
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise ValueError(f"Malformed JSON line: {error}") from error
+                yield block_from_json(data, crypto_provider)
+        return
+    if fp.read(len(CHAIN_MAGIC)) != CHAIN_MAGIC:
+        raise ValueError("File is not an exported chain")
+    while True:
+        header = fp.read(encoding.LENGTH.size)
+        if not header:
+            return
+        if len(header) != encoding.LENGTH.size:
+            raise ValueError("Exported chain is truncated")
+        (length,) = encoding.LENGTH.unpack(header)
+        data = fp.read(length)
+        if len(data) != length:
+            raise ValueError("Exported chain is truncated")
+        yield Block.from_bytes(data, crypto_provider)
@@ -0,0 +1,98 @@
+import cryptography
+import array
+import struct
+from collections.abc import Sequence
+from typing import Dict, Iterable, Optional, Tuple
+from .transaction import Transaction
+
+# Amount, fee and sequence number of a transaction, packed next to each other for all transactions of a block
+NUMBERS = struct.Struct('<qQQ')
+
+def _pack(values: Iterable[Optional[bytes]]) -> Tuple[bytes, array.array]:
+    """
+    Join byte strings into one buffer and an array of their offsets (None is packed as empty).
+    """
+    values = list(values)
+    offsets = array.array('Q', [0])
+    for value in values:
+        offsets.append(offsets[-1] + len(value or b''))
+    return b''.join(value or b'' for value in values), offsets
+
+def _unpack(buffer: bytes, offsets: array.array, position: int) -> Optional[bytes]:
+    start, end = offsets[position], offsets[position + 1]
+    return buffer[start:end] if end > start else None
+
+class ColumnarTransactions(Sequence):
+    """
+    Read-only, memory-lean sequence of the transactions of a block.
+
+    Instead of one Python object per transaction, the fields are packed column by column: amounts, fees and sequence numbers into one
+    byte string, all signatures and signatures' hashes (of pruned transactions) into one contiguous buffer with an array of
+    offsets, and addresses into a tuple that shares one string object per distinct address. The crypto provider is stored
+    once for all transactions. Every block pays for these few containers once, so packing saves memory per transaction but
+    only pays off for blocks of more than a handful of transactions.
+
+    Accessing an element creates a new Transaction object from the columns on every access: changes to it are not written
+    back, and repeated accesses pay for the creation again. Callers that need a transaction several times should keep the
+    object, and ones that only need signatures should use `signature`.
+    """
+
+    __slots__ = ('crypto_provider', '_addresses', '_numbers', '_buffer', '_offsets', '_public_keys')
+
+    def __init__(self, transactions: Iterable[Transaction], crypto_provider: cryptography.CryptoProvider = None):
+        """
+        Pack the given transactions.
+
+        Args:
+            transactions (Iterable[Transaction]): The transactions to pack.
+            crypto_provider (CryptoProvider, optional): The crypto provider shared by the transactions. Defaults to the one of the first transaction.
+        """
+        transactions = list(transactions)
+        if crypto_provider is None and transactions:
+            crypto_provider = transactions[0].crypto_provider
+        self.crypto_provider = crypto_provider
+        addresses: Dict[str, str] = {}
+        # Sender and recipient of every transaction, one after the other
+        self._addresses: Tuple[str, ...] = tuple(
+            addresses.setdefault(address, address) for transaction in transactions for address in (transaction.sender, transaction.recipient)
+        )
+        self._numbers = b''.join(NUMBERS.pack(transaction.amount, transaction.fee, transaction.sequence) for transaction in transactions)
+        # Signature and signature's hash of every transaction, one after the other
+        self._buffer, self._offsets = _pack(
+            value for transaction in transactions for value in (transaction.signature, transaction.signature_hash)
+        )
+        # Only the few transactions revealing their sender's key carry one, so blocks without any do not pay for a dictionary
+        self._public_keys: Optional[Dict[int, bytes]] = {
+            position: transaction.public_key for position, transaction in enumerate(transactions) if transaction.public_key is not None
+        } or None
+
+    def __len__(self) -> int:
+        return len(self._numbers) // NUMBERS.size
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("Transaction position out of range")
+        amount, fee, sequence = NUMBERS.unpack_from(self._numbers, position * NUMBERS.size)
+        public_key = self._public_keys.get(position) if self._public_keys is not None else None
+        transaction = Transaction(
+            self._addresses[2 * position], self._addresses[2 * position + 1], amount, self.crypto_provider, fee, public_key, sequence
+        )
+        transaction.signature = self.signature(position)
+        transaction.signature_hash = _unpack(self._buffer, self._offsets, 2 * position + 1)
+        return transaction
+
+    def signature(self, position: int) -> Optional[bytes]:
+        """
+        Get the signature of the transaction at the given position without creating a Transaction object.
+
+        Args:
+            position (int): The position of the transaction.
+
+        Returns:
+            Optional[bytes]: The signature, or None if the transaction is unsigned.
+        """
+        return _unpack(self._buffer, self._offsets, 2 * position)
@@ -0,0 +1,60 @@
+import struct
+from typing import Tuple, Union
+
+# Version byte at the start of every serialized transaction and block
+FORMAT_VERSION = 4
+
+VERSION = struct.Struct('>B')
+LENGTH = struct.Struct('>I')
+INDEX = struct.Struct('>Q')
+NONCE = struct.Struct('>Q')
+AMOUNT = struct.Struct('>q')
+FEE = struct.Struct('>Q')
+SEQUENCE = struct.Struct('>Q')
+TIMESTAMP = struct.Struct('>d')
+FLAGS = struct.Struct('>B')
+
+# Flag of a serialized transaction or block whose signatures have been pruned
+FLAG_PRUNED = 0x01
+
+def write_bytes(out: bytearray, data: Union[bytes, str, None]):
+    """
+    Append a length-prefixed byte string to the output buffer. Strings are encoded as UTF-8, None is written as empty.
+    """
+    if data is None:
+        data = b''
+    elif isinstance(data, str):
+        data = data.encode()
+    out += LENGTH.pack(len(data))
+    out += data
+
+def read_bytes(view: memoryview, offset: int) -> Tuple[memoryview, int]:
+    """
+    Read a length-prefixed byte string written by `write_bytes`. Returns a slice of the given memoryview (no copy) and the
+    offset after the byte string.
+    """
+    length, offset = read_struct(view, offset, LENGTH)
+    end = offset + length
+    if end > len(view):
+        raise ValueError("Serialized data is truncated")
+    return view[offset:end], end
+
+def read_str(view: memoryview, offset: int) -> Tuple[str, int]:
+    data, offset = read_bytes(view, offset)
+    return str(data, 'utf-8'), offset
+
+def read_struct(view: memoryview, offset: int, fmt: struct.Struct) -> Tuple[object, int]:
+    try:
+        (value,) = fmt.unpack_from(view, offset)
+    except struct.error as error:
+        raise ValueError("Serialized data is truncated") from error
+    return value, offset + fmt.size
+
+def read_version(view: memoryview, offset: int) -> int:
+    """
+    Read the format version byte and check that it is supported. Returns the offset after the version byte.
+    """
+    version, offset = read_struct(view, offset, VERSION)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported serialization format version {version}")
+    return offset
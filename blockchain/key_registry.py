@@ -0,0 +1,145 @@
+import cryptography
+import bisect
+from typing import Dict, List, Optional, Tuple
+from . import encoding
+from .block import Block
+
+class KeyRegistry:
+    """
+    Chain-level table of the full public keys behind the hashed addresses.
+
+    An address is the hash of a public key (see `CryptoProvider.address`), so transactions only need to carry the full public
+    key of their sender once, on the sender's first spend. The registry stores every revealed key once, together with the
+    height of the block that first revealed it, and hands out the raw key bytes for signature verification. A journal of the
+    addresses registered per height, together with the sorted list of its heights, allows rolling back to an earlier height
+    by only touching the heights above it.
+    """
+
+    def __init__(self, crypto_provider: cryptography.CryptoProvider):
+        """
+        Initialize an empty key registry.
+
+        Args:
+            crypto_provider (CryptoProvider): The cryptographic provider used to derive addresses from public keys.
+        """
+        self.crypto_provider = crypto_provider
+        self._keys: Dict[str, Tuple[bytes, int]] = {}
+        self._journal: Dict[int, List[str]] = {}
+        self._journal_heights: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._keys
+
+    def register(self, public_key: bytes, height: int) -> str:
+        """
+        Register a public key revealed in the block at the given height. Keeps the earliest height if the key is already known.
+
+        Args:
+            public_key (bytes): The revealed public key.
+            height (int): The height of the block revealing the key.
+
+        Returns:
+            str: The address of the public key.
+        """
+        address = self.crypto_provider.address(public_key)
+        known = self._keys.get(address)
+        if known is None or height < known[1]:
+            self._keys[address] = (bytes(public_key), height)
+            if height not in self._journal:
+                # Blocks are registered in increasing height, so the height is usually appended at the end
+                bisect.insort(self._journal_heights, height)
+            self._journal.setdefault(height, []).append(address)
+        return address
+
+    def register_block(self, block: Block):
+        """
+        Register all public keys revealed by the transactions of a block. Keys that do not belong to the transaction's sender
+        are ignored.
+
+        Args:
+            block (Block): The block whose revealed keys should be registered.
+        """
+        for transaction in block.transactions:
+            if transaction.public_key is not None and self.crypto_provider.address(transaction.public_key) == transaction.sender:
+                self.register(transaction.public_key, block.index)
+
+    def get(self, address: str, height: int = None) -> Optional[bytes]:
+        """
+        Look up the public key of an address.
+
+        Args:
+            address (str): The address to look up.
+            height (int, optional): Only return the key if it was revealed at or below this height. Defaults to any height.
+
+        Returns:
+            Optional[bytes]: The public key, or None if it has not been revealed (up to the given height).
+        """
+        known = self._keys.get(address)
+        if known is None or (height is not None and known[1] > height):
+            return None
+        return known[0]
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the registry in the canonical binary format: the address, public key and height of every registered key.
+        The journal is derived from the heights.
+
+        Returns:
+            bytes: The serialized registry.
+        """
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        out += encoding.LENGTH.pack(len(self._keys))
+        for address, (public_key, height) in self._keys.items():
+            encoding.write_bytes(out, address)
+            encoding.write_bytes(out, public_key)
+            out += encoding.INDEX.pack(height)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, crypto_provider: cryptography.CryptoProvider) -> 'KeyRegistry':
+        """
+        Deserialize a key registry from the canonical binary format.
+
+        Args:
+            data (bytes): The serialized registry.
+            crypto_provider (CryptoProvider): The cryptographic provider used to derive addresses from public keys.
+
+        Returns:
+            KeyRegistry: The deserialized registry.
+
+        Raises:
+            ValueError: If the data is not a single registry in a supported format version.
+        """
+        view = memoryview(data)
+        registry = cls(crypto_provider)
+        offset = encoding.read_version(view, 0)
+        count, offset = encoding.read_struct(view, offset, encoding.LENGTH)
+        for _ in range(count):
+            address, offset = encoding.read_str(view, offset)
+            public_key, offset = encoding.read_bytes(view, offset)
+            height, offset = encoding.read_struct(view, offset, encoding.INDEX)
+            registry._keys[address] = (bytes(public_key), height)
+            registry._journal.setdefault(height, []).append(address)
+        if offset != len(view):
+            raise ValueError("Unexpected trailing bytes after key registry")
+        registry._journal_heights = sorted(registry._journal)
+        return registry
+
+    def rollback(self, height: int):
+        """
+        Forget all keys revealed above the given height. Only the addresses registered above it are touched.
+
+        Args:
+            height (int): The height to roll back to.
+        """
+        position = bisect.bisect_right(self._journal_heights, height)
+        for journal_height in self._journal_heights[position:]:
+            for address in self._journal.pop(journal_height):
+                known = self._keys.get(address)
+                if known is not None and known[1] > height:
+                    del self._keys[address]
+        del self._journal_heights[position:]
+
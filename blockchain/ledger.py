@@ -0,0 +1,202 @@
+import bisect
+from typing import Dict, List, Tuple
+from . import encoding
+from .block import Block
+
+class Ledger:
+    """
+    Account-state index mapping every address to its balance and its next sequence number. Senders pay the amount and the
+    fee of their transactions.
+
+    The ledger is updated block by block as blocks are appended to the chain. For every address it keeps the heights at
+    which its balance changed together with the resulting balances and next sequence numbers, so that historical balances
+    and sequence numbers can be looked up with a binary search. A journal of the addresses touched per height allows rolling back to an earlier height.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty ledger at height 0 (the genesis block, which contains no transactions).
+        """
+        self.height = 0
+        self._balances: Dict[str, int] = {}
+        self._sequences: Dict[str, int] = {}
+        self._history: Dict[str, Tuple[List[int], List[int], List[int]]] = {}
+        self._journal: Dict[int, List[str]] = {}
+
+    def apply_block(self, block: Block):
+        """
+        Apply the transactions of the next block to the balances and advance the next sequence number of their senders.
+
+        Args:
+            block (Block): The block at height `height + 1`.
+        """
+        if block.index != self.height + 1:
+            raise ValueError(f"Expected block at height {self.height + 1}, got block at height {block.index}")
+        deltas: Dict[str, int] = {}
+        sequences: Dict[str, int] = {}
+        for transaction in block.transactions:
+            deltas[transaction.recipient] = deltas.get(transaction.recipient, 0) + transaction.amount
+            deltas[transaction.sender] = deltas.get(transaction.sender, 0) - transaction.amount - transaction.fee
+            sequences[transaction.sender] = max(sequences.get(transaction.sender, 0), transaction.sequence + 1)
+        for address, delta in deltas.items():
+            balance = self._balances.get(address, 0) + delta
+            self._balances[address] = balance
+            sequence = max(self._sequences.get(address, 0), sequences.get(address, 0))
+            if sequence:
+                self._sequences[address] = sequence
+            heights, balances, next_sequences = self._history.setdefault(address, ([], [], []))
+            heights.append(block.index)
+            balances.append(balance)
+            next_sequences.append(sequence)
+        self._journal[block.index] = list(deltas)
+        self.height = block.index
+
+    def get_balance(self, address: str, height: int = None) -> int:
+        """
+        Look up the balance of an address.
+
+        Args:
+            address (str): The address to look up the balance for.
+            height (int, optional): The height after which the balance is looked up. Defaults to the current height.
+
+        Returns:
+            int: The balance of the address.
+        """
+        if height is None or height >= self.height:
+            return self._balances.get(address, 0)
+        history = self._history.get(address)
+        if history is None:
+            return 0
+        heights, balances, _ = history
+        position = bisect.bisect_right(heights, height) - 1
+        return balances[position] if position >= 0 else 0
+
+    def next_sequence(self, address: str, height: int = None) -> int:
+        """
+        Look up the sequence number the next transaction of an address has to carry, i.e. the number of its transactions.
+
+        Args:
+            address (str): The address to look up the sequence number for.
+            height (int, optional): The height after which the sequence number is looked up. Defaults to the current height.
+
+        Returns:
+            int: The next sequence number of the address.
+        """
+        if height is None or height >= self.height:
+            return self._sequences.get(address, 0)
+        history = self._history.get(address)
+        if history is None:
+            return 0
+        heights, _, sequences = history
+        position = bisect.bisect_right(heights, height) - 1
+        return sequences[position] if position >= 0 else 0
+
+    def snapshot(self, height: int = None) -> Dict[str, int]:
+        """
+        Take a snapshot of the balances of all addresses that were part of a transaction up to the given height.
+
+        Args:
+            height (int, optional): The height to take the snapshot at. Defaults to the current height.
+
+        Returns:
+            Dict[str, int]: A copy of the balances at that height.
+        """
+        if height is None or height >= self.height:
+            return dict(self._balances)
+        snapshot = {}
+        for address, (heights, balances, _) in self._history.items():
+            position = bisect.bisect_right(heights, height) - 1
+            if position >= 0:
+                snapshot[address] = balances[position]
+        return snapshot
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the ledger in the canonical binary format: the height followed by the history of every address. The
+        current balances, sequence numbers and the journal are derived from the histories.
+
+        Returns:
+            bytes: The serialized ledger.
+        """
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        out += encoding.INDEX.pack(self.height)
+        out += encoding.LENGTH.pack(len(self._history))
+        for address, (heights, balances, sequences) in self._history.items():
+            encoding.write_bytes(out, address)
+            out += encoding.LENGTH.pack(len(heights))
+            for height, balance, sequence in zip(heights, balances, sequences):
+                out += encoding.INDEX.pack(height)
+                out += encoding.AMOUNT.pack(balance)
+                out += encoding.SEQUENCE.pack(sequence)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Ledger':
+        """
+        Deserialize a ledger from the canonical binary format.
+
+        Args:
+            data (bytes): The serialized ledger.
+
+        Returns:
+            Ledger: The deserialized ledger.
+
+        Raises:
+            ValueError: If the data is not a single ledger in a supported format version.
+        """
+        view = memoryview(data)
+        ledger = cls()
+        offset = encoding.read_version(view, 0)
+        ledger.height, offset = encoding.read_struct(view, offset, encoding.INDEX)
+        # Every block has a journal entry, also if it touched no address
+        ledger._journal = {height: [] for height in range(1, ledger.height + 1)}
+        count, offset = encoding.read_struct(view, offset, encoding.LENGTH)
+        for _ in range(count):
+            address, offset = encoding.read_str(view, offset)
+            entries, offset = encoding.read_struct(view, offset, encoding.LENGTH)
+            heights, balances, sequences = ledger._history[address] = ([], [], [])
+            for _ in range(entries):
+                height, offset = encoding.read_struct(view, offset, encoding.INDEX)
+                balance, offset = encoding.read_struct(view, offset, encoding.AMOUNT)
+                sequence, offset = encoding.read_struct(view, offset, encoding.SEQUENCE)
+                if height not in ledger._journal:
+                    raise ValueError(f"Ledger entry at height {height} is above the ledger's height")
+                heights.append(height)
+                balances.append(balance)
+                sequences.append(sequence)
+                ledger._journal[height].append(address)
+            if not heights:
+                raise ValueError(f"Ledger entry of {address} has no history")
+            ledger._balances[address] = balances[-1]
+            if sequences[-1]:
+                ledger._sequences[address] = sequences[-1]
+        if offset != len(view):
+            raise ValueError("Unexpected trailing bytes after ledger")
+        return ledger
+
+    def rollback(self, height: int):
+        """
+        Undo all blocks above the given height. Only the addresses touched by those blocks are updated.
+
+        Args:
+            height (int): The height to roll back to.
+        """
+        if height < 0:
+            raise ValueError("Cannot roll back below the genesis block")
+        while self.height > height:
+            for address in self._journal.pop(self.height):
+                heights, balances, sequences = self._history[address]
+                heights.pop()
+                balances.pop()
+                sequences.pop()
+                if heights:
+                    self._balances[address] = balances[-1]
+                    if sequences[-1]:
+                        self._sequences[address] = sequences[-1]
+                    else:
+                        self._sequences.pop(address, None)
+                else:
+                    del self._history[address]
+                    del self._balances[address]
+                    self._sequences.pop(address, None)
+            self.height -= 1
@@ -0,0 +1,329 @@
+import bisect
+import collections
+import heapq
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .key_registry import KeyRegistry
+from .transaction import Transaction
+
+# Number of removed entries that policies may keep in addition to the live entries before they are compacted
+_COMPACTION_SLACK = 1024
+
+# What a block template built by `Mempool.pop_template` maximizes
+PACKING_OBJECTIVES = ('count', 'fees')
+
+def pack_template(candidates: Iterable[Tuple[int, int, int]], max_bytes: int, max_count: int = None, objective: str = 'count') -> List[int]:
+    """
+    Choose entries whose sizes sum up to at most `max_bytes`, maximizing either their number or their total fee.
+
+    Taking the smallest entries first maximizes the number of entries that fit. For the total fee (a knapsack problem),
+    entries are taken by fee per byte, skipping the ones that no longer fit, and the single entry with the highest fee is
+    taken instead if it alone pays more, which is at least half of the optimum. The entries are heapified instead of sorted
+    and popped only until the block is full, which is linear in the number of candidates plus logarithmic per chosen entry.
+
+    Args:
+        candidates (Iterable[Tuple[int, int, int]]): Tuples of entry id, fee and size in bytes. Ties are broken by the entry id.
+        max_bytes (int): The maximum total size of the chosen entries in bytes.
+        max_count (int, optional): The maximum number of chosen entries. Defaults to no limit.
+        objective (str, optional): 'count' to maximize the number of entries or 'fees' to maximize their total fee. Defaults to 'count'.
+
+    Returns:
+        List[int]: The ids of the chosen entries in the order they were chosen.
+
+    Raises:
+        ValueError: If the objective is not supported.
+    """
+    if objective not in PACKING_OBJECTIVES:
+        raise ValueError(f"Unsupported packing objective {objective}")
+    candidates = [candidate for candidate in candidates if candidate[2] <= max_bytes]
+    if not candidates or max_count == 0:
+        return []
+    if objective == 'count':
+        heap = [(size, entry_id) for entry_id, _, size in candidates]
+    else:
+        heap = [(-fee / size, size, entry_id) for entry_id, fee, size in candidates]
+    heapq.heapify(heap)
+    smallest_size = min(size for _, _, size in candidates)
+    chosen = []
+    remaining = max_bytes
+    while heap and remaining >= smallest_size and (max_count is None or len(chosen) < max_count):
+        item = heapq.heappop(heap)
+        size, entry_id = item[-2], item[-1]
+        if size <= remaining:
+            chosen.append(entry_id)
+            remaining -= size
+        elif objective == 'count':
+            break # All remaining entries are at least as large
+    if objective == 'fees':
+        fees = {entry_id: fee for entry_id, fee, _ in candidates}
+        best_id, best_fee, _ = max(candidates, key=lambda candidate: (candidate[1], -candidate[0]))
+        if best_fee > sum(fees[entry_id] for entry_id in chosen):
+            return [best_id]
+    return chosen
+
+class FifoPolicy:
+    """
+    Ordering policy that mines transactions in the order they were admitted. When the mempool is full, the most recently
+    admitted transactions are dropped first.
+    """
+
+    def __init__(self):
+        self._queue = collections.deque()
+        # Sorted ids of restored entries, at most a few batches, merged with the queue when popping
+        self._restored = []
+
+    def push(self, entry_id: int, transaction: Transaction, size: int):
+        self._queue.append(entry_id)
+
+    def restore(self, entry_id: int, transaction: Transaction, size: int):
+        bisect.insort(self._restored, entry_id)
+
+    def pop_best(self, is_live: Callable[[int], bool]) -> Optional[int]:
+        while self._queue or self._restored:
+            if self._restored and (not self._queue or self._restored[0] < self._queue[0]):
+                entry_id = self._restored.pop(0)
+            else:
+                entry_id = self._queue.popleft()
+            if is_live(entry_id):
+                return entry_id
+        return None
+
+    def pop_worst(self, is_live: Callable[[int], bool]) -> Optional[int]:
+        while self._queue or self._restored:
+            if self._restored and (not self._queue or self._restored[-1] > self._queue[-1]):
+                entry_id = self._restored.pop()
+            else:
+                entry_id = self._queue.pop()
+            if is_live(entry_id):
+                return entry_id
+        return None
+
+    def compact(self, is_live: Callable[[int], bool]):
+        self._queue = collections.deque(entry_id for entry_id in self._queue if is_live(entry_id))
+        self._restored = [entry_id for entry_id in self._restored if is_live(entry_id)]
+
+class FeePolicy:
+    """
+    Ordering policy that mines transactions with the highest fee per byte first, and admission order among equal fee rates.
+    When the mempool is full, the transactions with the lowest fee per byte are dropped first.
+    """
+
+    def __init__(self):
+        self._best = []
+        self._worst = []
+
+    def push(self, entry_id: int, transaction: Transaction, size: int):
+        fee_rate = transaction.fee / size
+        heapq.heappush(self._best, (-fee_rate, entry_id))
+        heapq.heappush(self._worst, (fee_rate, -entry_id))
+
+    def restore(self, entry_id: int, transaction: Transaction, size: int):
+        # The heaps order by entry id among equal fee rates, so pushing an entry again restores its position
+        self.push(entry_id, transaction, size)
+
+    def pop_best(self, is_live: Callable[[int], bool]) -> Optional[int]:
+        while self._best:
+            _, entry_id = heapq.heappop(self._best)
+            if is_live(entry_id):
+                return entry_id
+        return None
+
+    def pop_worst(self, is_live: Callable[[int], bool]) -> Optional[int]:
+        while self._worst:
+            _, entry_id = heapq.heappop(self._worst)
+            if is_live(-entry_id):
+                return -entry_id
+        return None
+
+    def compact(self, is_live: Callable[[int], bool]):
+        self._best = [item for item in self._best if is_live(item[1])]
+        self._worst = [item for item in self._worst if is_live(-item[1])]
+        heapq.heapify(self._best)
+        heapq.heapify(self._worst)
+
+class Mempool:
+    """
+    Pool of pending transactions waiting to be mined.
+
+    Only transactions with a valid signature are admitted, and every transaction is admitted at most once (deduplicated by
+    its hash). The pool's total size in serialized bytes can be limited, in which case the transactions ranked lowest by
+    the ordering policy are evicted. Ordering policies keep their own queues or heaps of entry ids. Entries removed from the
+    pool are skipped lazily when they come up in a policy, so admitting, dequeuing and removing a transaction never copies
+    the rest of the backlog. The policy is compacted once it holds more removed entries than live ones. Transactions of
+    the last dequeued batch that cannot be mined yet can be put back at their original position with `requeue`.
+    """
+
+    def __init__(self, capacity_bytes: int = None, policy=None):
+        """
+        Initialize a new mempool.
+
+        Args:
+            capacity_bytes (int, optional): The maximum total size of all pending transactions in bytes. Defaults to no limit.
+            policy (FifoPolicy | FeePolicy, optional): The order in which transactions are mined and evicted. Defaults to FifoPolicy.
+        """
+        self.capacity_bytes = capacity_bytes
+        self.policy = policy if policy is not None else FifoPolicy()
+        self.size_bytes = 0
+        self._entries: Dict[int, Tuple[bytes, Transaction, int]] = {}
+        self._entry_ids: Dict[bytes, int] = {}
+        self._next_entry_id = itertools.count()
+        self._removed_entries = 0
+        self._dequeued: Dict[bytes, Tuple[int, int]] = {}
+        # Ids of restored entries, which were added to the entries out of admission order
+        self._restored_ids: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        """
+        Iterate over the pending transactions in the order they were admitted.
+        """
+        entries = list(self._entries.items())
+        if self._restored_ids:
+            # All other entries were added in admission order, so only the few restored ones have to be sorted into them
+            restored = sorted((entry_id, self._entries[entry_id]) for entry_id in self._restored_ids)
+            entries = heapq.merge((item for item in entries if item[0] not in self._restored_ids), restored)
+        return (transaction for _, (_, transaction, _) in entries)
+
+    def __contains__(self, transaction: Transaction) -> bool:
+        return transaction.compute_hash() in self._entry_ids
+
+    def add(self, transaction: Transaction, key_registry: KeyRegistry = None) -> bool:
+        """
+        Admit a transaction to the mempool. Rejects unsigned transactions, transactions with an invalid signature,
+        transactions that are already pending and transactions that would be evicted right away because the pool is full.
+
+        Args:
+            transaction (Transaction): The transaction to admit.
+            key_registry (KeyRegistry, optional): The registry to look up the sender's public key in if the transaction does not carry it.
+
+        Returns:
+            bool: True if the transaction was admitted; False otherwise.
+        """
+        if transaction.signature is None:
+            return False
+        digest = transaction.compute_hash()
+        if digest in self._entry_ids:
+            return False
+        size = len(transaction.to_bytes())
+        if self.capacity_bytes is not None and size > self.capacity_bytes:
+            return False
+        if not transaction.is_valid(key_registry):
+            return False
+
+        entry_id = next(self._next_entry_id)
+        self._entries[entry_id] = (digest, transaction, size)
+        self._entry_ids[digest] = entry_id
+        self.size_bytes += size
+        self.policy.push(entry_id, transaction, size)
+
+        admitted = True
+        while self.capacity_bytes is not None and self.size_bytes > self.capacity_bytes:
+            evicted_id = self.policy.pop_worst(self._is_live)
+            admitted = admitted and evicted_id != entry_id
+            self._remove_entry(evicted_id)
+        return admitted
+
+    def pop(self, count: int) -> List[Transaction]:
+        """
+        Remove and return up to `count` transactions in the order of the policy.
+
+        Args:
+            count (int): The maximum number of transactions to return.
+
+        Returns:
+            List[Transaction]: The dequeued transactions.
+        """
+        entry_ids = []
+        while len(entry_ids) < count:
+            entry_id = self.policy.pop_best(self._is_live)
+            if entry_id is None:
+                break
+            entry_ids.append(entry_id)
+        return self._dequeue(entry_ids)
+
+    def pop_template(self, max_bytes: int, max_count: int = None, objective: str = 'count') -> List[Transaction]:
+        """
+        Remove and return the transactions of a block template: pending transactions whose serialized sizes sum up to at
+        most `max_bytes`, chosen to maximize either their number or their total fee (see `pack_template`) regardless of the
+        policy. The transactions are returned in the order they were admitted.
+
+        Args:
+            max_bytes (int): The maximum total size of the transactions in serialized bytes.
+            max_count (int, optional): The maximum number of transactions. Defaults to no limit.
+            objective (str, optional): 'count' to maximize the number of transactions or 'fees' to maximize their total fee. Defaults to 'count'.
+
+        Returns:
+            List[Transaction]: The dequeued transactions.
+
+        Raises:
+            ValueError: If the objective is not supported.
+        """
+        candidates = ((entry_id, transaction.fee, size) for entry_id, (_, transaction, size) in self._entries.items())
+        entry_ids = pack_template(candidates, max_bytes, max_count, objective)
+        return self._dequeue(sorted(entry_ids))
+
+    def requeue(self, transactions: Iterable[Transaction], key_registry: KeyRegistry = None):
+        """
+        Put transactions of the last `pop` or `pop_template` back, e.g. because their predecessors are still missing. They
+        return to their original position in the policy and are not validated again. Other transactions are admitted with `add`.
+
+        Args:
+            transactions (Iterable[Transaction]): The transactions to put back.
+            key_registry (KeyRegistry, optional): The registry to look up the sender's public key in for transactions that are admitted with `add`.
+        """
+        for transaction in transactions:
+            digest = transaction.compute_hash()
+            dequeued = self._dequeued.pop(digest, None)
+            if dequeued is None or digest in self._entry_ids:
+                self.add(transaction, key_registry)
+                continue
+            entry_id, size = dequeued
+            self._entries[entry_id] = (digest, transaction, size)
+            self._entry_ids[digest] = entry_id
+            self.size_bytes += size
+            self.policy.restore(entry_id, transaction, size)
+            self._restored_ids.add(entry_id)
+
+    def remove(self, transaction: Transaction) -> bool:
+        """
+        Remove a pending transaction, e.g. because it was included in a block received from elsewhere.
+
+        Args:
+            transaction (Transaction): The transaction to remove.
+
+        Returns:
+            bool: True if the transaction was pending; False otherwise.
+        """
+        entry_id = self._entry_ids.get(transaction.compute_hash())
+        if entry_id is None:
+            return False
+        self._remove_entry(entry_id)
+        return True
+
+    def _dequeue(self, entry_ids: List[int]) -> List[Transaction]:
+        """
+        Remove the given entries, remembering their ids and sizes for `requeue`.
+        """
+        self._dequeued = {}
+        transactions = []
+        for entry_id in entry_ids:
+            digest, _, size = self._entries[entry_id]
+            self._dequeued[digest] = (entry_id, size)
+            transactions.append(self._remove_entry(entry_id))
+        return transactions
+
+    def _is_live(self, entry_id: int) -> bool:
+        return entry_id in self._entries
+
+    def _remove_entry(self, entry_id: int) -> Transaction:
+        digest, transaction, size = self._entries.pop(entry_id)
+        del self._entry_ids[digest]
+        self._restored_ids.discard(entry_id)
+        self.size_bytes -= size
+        self._removed_entries += 1
+        if self._removed_entries > len(self._entries) + _COMPACTION_SLACK:
+            self.policy.compact(self._is_live)
+            self._removed_entries = 0
+        return transaction
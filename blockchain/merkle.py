@@ -0,0 +1,78 @@
+from typing import Callable, List, Tuple
+
+# Domain separation between leaves and inner nodes, so an inner node can never be passed off as a leaf
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+MerkleProof = List[Tuple[bytes, bool]]
+
+def _levels(leaves: List[bytes], hash_function: Callable[[bytes], bytes]) -> List[List[bytes]]:
+    """
+    Build all levels of the Merkle tree, from the hashed leaves up to the root. A node without a sibling is promoted to the
+    next level unchanged instead of being paired with a copy of itself.
+    """
+    level = [hash_function(LEAF_PREFIX + leaf) for leaf in leaves]
+    levels = [level]
+    while len(level) > 1:
+        next_level = [hash_function(NODE_PREFIX + level[i] + level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+        levels.append(level)
+    return levels
+
+def merkle_root(leaves: List[bytes], hash_function: Callable[[bytes], bytes]) -> bytes:
+    """
+    Compute the Merkle root of a list of leaves.
+
+    Args:
+        leaves (List[bytes]): The leaves of the tree, e.g. transaction hashes.
+        hash_function (Callable[[bytes], bytes]): The hash function used for the nodes of the tree.
+
+    Returns:
+        bytes: The Merkle root, or the hash of the empty string if there are no leaves.
+    """
+    if not leaves:
+        return hash_function(b'')
+    return _levels(leaves, hash_function)[-1][0]
+
+def merkle_proof(leaves: List[bytes], index: int, hash_function: Callable[[bytes], bytes]) -> MerkleProof:
+    """
+    Build the inclusion proof for the leaf at the given index. The proof has at most one entry per level of the tree,
+    i.e. O(log n) entries.
+
+    Args:
+        leaves (List[bytes]): The leaves of the tree, e.g. transaction hashes.
+        index (int): The position of the leaf to prove.
+        hash_function (Callable[[bytes], bytes]): The hash function used for the nodes of the tree.
+
+    Returns:
+        MerkleProof: The sibling hashes from the leaf up to the root, each with a flag that is True if the sibling is the left node.
+    """
+    if not 0 <= index < len(leaves):
+        raise IndexError("Leaf index out of range")
+    proof = []
+    for level in _levels(leaves, hash_function)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append((level[sibling], sibling < index))
+        index //= 2
+    return proof
+
+def verify_merkle_proof(leaf: bytes, proof: MerkleProof, root: bytes, hash_function: Callable[[bytes], bytes]) -> bool:
+    """
+    Verify that a leaf is included in the tree with the given root.
+
+    Args:
+        leaf (bytes): The leaf to check, e.g. a transaction hash.
+        proof (MerkleProof): The inclusion proof built by `merkle_proof`.
+        root (bytes): The Merkle root the leaf should be included in.
+        hash_function (Callable[[bytes], bytes]): The hash function used for the nodes of the tree.
+
+    Returns:
+        bool: True if the proof leads from the leaf to the root; False otherwise.
+    """
+    node = hash_function(LEAF_PREFIX + leaf)
+    for sibling, sibling_is_left in proof:
+        node = hash_function(NODE_PREFIX + sibling + node) if sibling_is_left else hash_function(NODE_PREFIX + node + sibling)
+    return node == root
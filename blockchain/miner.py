@@ -0,0 +1,149 @@
+import cryptography
+import concurrent.futures
+import multiprocessing
+import time
+from typing import Optional, Tuple
+from . import encoding
+from .block import Block
+
+# Number of nonces a worker tries between two checks of the shared best nonce
+_BATCH_SIZE = 1024
+
+# Smallest valid nonce found by any worker of the current search (-1 if none), shared by the processes of a miner's pool
+_best_nonce = None
+
+def _init_mining_worker(best_nonce):
+    global _best_nonce
+    _best_nonce = best_nonce
+
+def _search_nonces(hashing_algorithm: str, prefix: bytes, difficulty: int, start: int, step: int) -> Tuple[Optional[int], int]:
+    """
+    Search the nonces start, start + step, start + 2 * step, ... for a hash with the required number of leading zero bytes.
+    Runs inside a worker process and stops as soon as it finds a valid nonce or another worker has already found a smaller
+    one.
+
+    Returns:
+        Tuple[Optional[int], int]: The found nonce (or None) and the number of attempts.
+    """
+    best_nonce = _best_nonce
+    midstate = cryptography.CryptoProvider('', hashing_algorithm).midstate(prefix)
+    target = b'\x00' * difficulty
+    nonce = start
+    attempts = 0
+    found = None
+    while found is None:
+        limit = best_nonce.value
+        if limit >= 0 and nonce > limit:
+            break
+        for _ in range(_BATCH_SIZE):
+            attempts += 1
+            if midstate.hash(encoding.NONCE.pack(nonce)).startswith(target):
+                found = nonce
+                break
+            nonce += step
+    if found is not None:
+        with best_nonce.get_lock():
+            if best_nonce.value < 0 or found < best_nonce.value:
+                best_nonce.value = found
+    return found, attempts
+
+class Miner:
+    """
+    Performs the proof-of-work search for a block, either serially or split across a pool of worker processes.
+
+    With more than one worker, each worker searches its own residue class of the nonce space in increasing order. Workers
+    stop once they pass the smallest valid nonce found so far, so the parallel search accepts exactly the nonce the serial
+    search would have found. The worker processes are started on first use and kept for later blocks until `close` is
+    called; if one of them dies, the search fails with a RuntimeError and a new pool is started for the next block. The block's contents preceding the nonce are hashed only once and every attempt continues from
+    that midstate with just the nonce. The number of attempts and the elapsed time of the last search are kept to report the hashrate.
+    """
+
+    def __init__(self, workers: int = 1, instrumentation: cryptography.Instrumentation = None):
+        """
+        Initialize a new miner.
+
+        Args:
+            workers (int, optional): The number of worker processes used for the nonce search. Defaults to 1 (serial search).
+            instrumentation (Instrumentation, optional): Receives the statistics of every mined block.
+        """
+        self.workers = workers
+        self.instrumentation = instrumentation
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.stats = None
+        self._pool = None
+        self._best_nonce = None
+
+    @property
+    def hashrate(self) -> float:
+        """
+        Hashes per second achieved during the last search.
+
+        Returns:
+            float: The number of computed hashes per second, or 0.0 if nothing was mined yet.
+        """
+        return self.attempts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def mine(self, block: Block, difficulty: int):
+        """
+        Find the smallest nonce for which the block's hash starts with the required number of zero bytes. Sets the nonce
+        and the hash of the block, and keeps the statistics of the search (attempts, time-to-solution and hashrate) in `stats`.
+
+        Args:
+            block (Block): The block to mine.
+            difficulty (int): The number of leading zero bytes required in the block's hash.
+
+        Raises:
+            RuntimeError: If a worker process of a parallel search died.
+        """
+        start = time.perf_counter()
+        if self.workers > 1:
+            self._mine_parallel(block, difficulty)
+        else:
+            self._mine_serial(block, difficulty)
+        self.elapsed = time.perf_counter() - start
+        self.stats = cryptography.MiningStats(block.index, difficulty, self.attempts, self.elapsed, self.hashrate)
+        if self.instrumentation is not None:
+            self.instrumentation.observe_mining(self.stats)
+
+    def _mine_serial(self, block: Block, difficulty: int):
+        target = b'\x00' * difficulty
+        midstate = block.crypto_provider.midstate(block.hash_prefix())
+        self.attempts = 1
+        block_hash = midstate.hash(encoding.NONCE.pack(block.nonce))
+        while not block_hash.startswith(target):
+            block.nonce += 1
+            self.attempts += 1
+            block_hash = midstate.hash(encoding.NONCE.pack(block.nonce))
+        block.hash = block_hash
+
+    def _mine_parallel(self, block: Block, difficulty: int):
+        pool = self._get_pool()
+        self._best_nonce.value = -1
+        prefix = block.hash_prefix()
+        futures = [
+            pool.submit(_search_nonces, block.crypto_provider.hashing_algorithm, prefix, difficulty, block.nonce + i, self.workers)
+            for i in range(self.workers)
+        ]
+        try:
+            outcomes = [future.result() for future in futures]
+        except concurrent.futures.process.BrokenProcessPool as error:
+            self.close()
+            raise RuntimeError("A mining worker process died during the nonce search") from error
+        self.attempts = sum(attempts for _, attempts in outcomes)
+        block.nonce = min(nonce for nonce, _ in outcomes if nonce is not None)
+        block.hash = block.compute_hash()
+
+    def close(self):
+        """
+        Shut down the worker processes. They are started again if the miner is used again.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            self._best_nonce = multiprocessing.get_context().Value('q', -1)
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_init_mining_worker, initargs=(self._best_nonce,))
+        return self._pool
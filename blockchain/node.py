@@ -0,0 +1,362 @@
+import asyncio
+import collections
+import struct
+from typing import Callable, Dict, List, Optional, Tuple
+from .block import Block
+from .blockchain import Blockchain
+from .transaction import Transaction
+
+# Header of every message: its type and the length of its payload
+FRAME_HEADER = struct.Struct('>BI')
+
+# Maximum payload length of a message read from a TCP connection, so a peer cannot make the node allocate arbitrary memory
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Message types
+MESSAGE_HELLO = 0 # Name of the connecting node, sent first over TCP connections
+MESSAGE_TRANSACTION = 1 # Serialized transaction
+MESSAGE_BLOCK = 2 # Serialized block
+MESSAGE_GET_BLOCK = 3 # Hash of a requested block
+
+# Maximum number of orphan blocks kept overall and per peer that sent them, so peers cannot exhaust the node's memory
+MAX_ORPHANS = 256
+MAX_ORPHANS_PER_PEER = 32
+
+def frame(message_type: int, payload: bytes) -> bytes:
+    """
+    Prefix a message's payload with its type and length.
+    """
+    return FRAME_HEADER.pack(message_type, len(payload)) + payload
+
+def parse_frame(data: bytes) -> Tuple[int, memoryview]:
+    """
+    Split a framed message into its type and payload (without copying it).
+
+    Raises:
+        ValueError: If the frame is truncated or has trailing bytes.
+    """
+    try:
+        message_type, length = FRAME_HEADER.unpack_from(data, 0)
+    except struct.error as error:
+        raise ValueError("Message is truncated") from error
+    if len(data) != FRAME_HEADER.size + length:
+        raise ValueError("Message length does not match its header")
+    return message_type, memoryview(data)[FRAME_HEADER.size:]
+
+class Node:
+    """
+    Peer of a gossip network, built on a Blockchain and driven by asyncio.
+
+    Transactions and blocks are flooded: a node relays every transaction it admits to its mempool and every block it adds to
+    its chain or block tree to all peers except the one it came from. A block whose parent is unknown is kept as an orphan
+    and its parent is requested from the peer that sent it. At most `MAX_ORPHANS_PER_PEER` orphans of every peer are kept,
+    and the oldest orphan is dropped once `MAX_ORPHANS` are. Received messages are processed one at a time from an inbox, so
+    verifying them delays the node's relaying; a message that fails to be processed is counted in `rejected_messages`.
+    Mining runs in the default executor, so the node keeps processing messages during the proof-of-work.
+
+    Peers are connected either in-process (see `connect`) or over TCP (see `listen` and `connect_tcp`). All messages a node
+    sends share one simulated uplink: a message is transmitted once the previous ones are, at the node's bandwidth, and
+    arrives at the peer after the node's latency. The time every block and transaction was first accepted is recorded for
+    measuring propagation delays.
+    """
+
+    def __init__(self, name: str, blockchain: Blockchain, bandwidth: float = None, latency: float = 0.0):
+        """
+        Initialize a new node.
+
+        Args:
+            name (str): The name identifying the node to its peers.
+            blockchain (Blockchain): The node's blockchain. Nodes of one network have to share the genesis block.
+            bandwidth (float, optional): The upload bandwidth in bytes per second. Defaults to no limit.
+            latency (float, optional): The one-way latency of the node's messages in seconds. Defaults to 0.
+        """
+        self.name = name
+        self.blockchain = blockchain
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.block_arrivals: Dict[bytes, float] = {}
+        self.transaction_arrivals: Dict[bytes, float] = {}
+        self.sent_bytes = 0
+        self.rejected_messages = 0
+        self._peers: Dict[str, Callable[[bytes], None]] = {}
+        self._orphans: Dict[bytes, List[Block]] = {}
+        self._orphan_senders: Dict[bytes, Tuple[bytes, Optional[str]]] = collections.OrderedDict()
+        self._orphans_per_peer: Dict[Optional[str], int] = collections.Counter()
+        self._inbox: asyncio.Queue = None
+        self._tasks: List[asyncio.Task] = []
+        self._writers: List[asyncio.StreamWriter] = []
+        self._server: asyncio.AbstractServer = None
+        self._uplink_free_at = 0.0
+
+    @property
+    def peers(self) -> List[str]:
+        """
+        The names of the connected peers.
+        """
+        return list(self._peers)
+
+    def start(self):
+        """
+        Start processing received messages. Has to be called from within the running event loop.
+        """
+        if self._inbox is None:
+            self._inbox = asyncio.Queue()
+            self._tasks.append(asyncio.ensure_future(self._process_inbox()))
+
+    async def stop(self):
+        """
+        Stop processing messages and close the TCP server and connections.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def idle(self):
+        """
+        Wait until all received messages have been processed.
+        """
+        await self._inbox.join()
+
+    def connect(self, peer: 'Node'):
+        """
+        Connect the node with another node of the same process in both directions. Has to be called from within the running event loop.
+
+        Args:
+            peer (Node): The node to connect with.
+        """
+        self.start()
+        peer.start()
+        self._peers[peer.name] = lambda data: peer.receive(self.name, data)
+        peer._peers[self.name] = lambda data: self.receive(peer.name, data)
+
+    async def listen(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """
+        Accept TCP connections from peers.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): The port to listen on. Defaults to 0 (any free port).
+
+        Returns:
+            int: The port the node listens on.
+        """
+        self.start()
+        self._server = await asyncio.start_server(self._accept, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def connect_tcp(self, host: str, port: int):
+        """
+        Connect to a peer listening for TCP connections.
+
+        Args:
+            host (str): The peer's address.
+            port (int): The peer's port.
+
+        Raises:
+            ValueError: If the peer does not introduce itself with a well-formed message.
+        """
+        self.start()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(frame(MESSAGE_HELLO, self.name.encode()))
+        try:
+            message_type, payload = parse_frame(await self._read_frame(reader))
+        except ValueError:
+            writer.close()
+            raise
+        if message_type != MESSAGE_HELLO:
+            writer.close()
+            raise ValueError("Peer did not introduce itself")
+        self._attach(str(payload, 'utf-8'), reader, writer)
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            message_type, payload = parse_frame(await self._read_frame(reader))
+        except (ValueError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        if message_type != MESSAGE_HELLO:
+            writer.close()
+            return
+        writer.write(frame(MESSAGE_HELLO, self.name.encode()))
+        self._attach(str(payload, 'utf-8'), reader, writer)
+
+    def _attach(self, peer_name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers[peer_name] = writer.write
+        self._writers.append(writer)
+        self._tasks.append(asyncio.ensure_future(self._read_connection(peer_name, reader, writer)))
+
+    async def _read_connection(self, peer_name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                self.receive(peer_name, await self._read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # A peer sending an oversized frame is dropped, as the rest of its stream cannot be framed anymore
+            self._peers.pop(peer_name, None)
+            writer.close()
+
+    @staticmethod
+    async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        _, length = FRAME_HEADER.unpack(header)
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame of {length} bytes exceeds the maximum of {MAX_FRAME_SIZE} bytes")
+        return header + await reader.readexactly(length)
+
+    def receive(self, peer_name: str, data: bytes):
+        """
+        Queue a framed message received from a peer for processing.
+
+        Args:
+            peer_name (str): The name of the peer that sent the message.
+            data (bytes): The framed message.
+        """
+        self._inbox.put_nowait((peer_name, data))
+
+    async def _process_inbox(self):
+        while True:
+            peer_name, data = await self._inbox.get()
+            try:
+                self.handle(peer_name, data)
+            except Exception:
+                # Any message a peer sends may be malformed in ways the parsers do not anticipate
+                self.rejected_messages += 1
+            finally:
+                self._inbox.task_done()
+
+    def handle(self, peer_name: Optional[str], data: bytes):
+        """
+        Process a framed message received from a peer.
+
+        Args:
+            peer_name (str, optional): The name of the peer that sent the message, or None if it was submitted locally.
+            data (bytes): The framed message.
+
+        Raises:
+            ValueError: If the message is malformed.
+        """
+        message_type, payload = parse_frame(data)
+        crypto_provider = self.blockchain.crypto_provider
+        if message_type == MESSAGE_TRANSACTION:
+            self.submit_transaction(Transaction.from_bytes(payload, crypto_provider), peer_name)
+        elif message_type == MESSAGE_BLOCK:
+            self._receive_block(Block.from_bytes(payload, crypto_provider), peer_name)
+        elif message_type == MESSAGE_GET_BLOCK:
+            block = self.blockchain.get_block(bytes(payload))
+            if block is not None and peer_name in self._peers:
+                self._send(peer_name, frame(MESSAGE_BLOCK, block.to_bytes()))
+        else:
+            raise ValueError(f"Unknown message type {message_type}")
+
+    def submit_transaction(self, transaction: Transaction, peer_name: str = None) -> bool:
+        """
+        Admit a transaction to the node's mempool and relay it to the peers.
+
+        Args:
+            transaction (Transaction): The transaction. It should use the crypto provider of the node's blockchain.
+            peer_name (str, optional): The name of the peer the transaction came from, which it is not relayed to. Defaults to None.
+
+        Returns:
+            bool: True if the transaction was admitted; False otherwise.
+        """
+        if not self.blockchain.add_transaction(transaction):
+            return False
+        self.transaction_arrivals.setdefault(transaction.compute_hash(), asyncio.get_running_loop().time())
+        self._broadcast(frame(MESSAGE_TRANSACTION, transaction.to_bytes()), peer_name)
+        return True
+
+    async def mine(self) -> Optional[Block]:
+        """
+        Mine the pending transactions into a new block and relay it to the peers. The proof-of-work is computed in the
+        default executor while the node keeps processing messages. If the chain changes in the meantime, the block is still
+        relayed as a competing block (see `Blockchain.add_mined_block`).
+
+        Returns:
+            Optional[Block]: The mined block, or None if there were no transactions to mine.
+        """
+        block = self.blockchain.build_block()
+        if block is None:
+            return None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.blockchain.miner.mine, block, self.blockchain.difficulty)
+        self.blockchain.add_mined_block(block)
+        self.block_arrivals[block.hash] = loop.time()
+        self._broadcast(frame(MESSAGE_BLOCK, block.to_bytes()), None)
+        return block
+
+    def _receive_block(self, block: Block, peer_name: Optional[str]):
+        """
+        Add a received block, or keep it as an orphan and request its parent if the parent is unknown. Orphans waiting for
+        an added block are added after it.
+        """
+        if block.hash in self.block_arrivals:
+            return
+        if self.blockchain.get_block(block.previous_hash) is None:
+            if block.hash in self._orphan_senders or self._orphans_per_peer[peer_name] >= MAX_ORPHANS_PER_PEER:
+                return
+            if len(self._orphan_senders) >= MAX_ORPHANS:
+                self._drop_orphan(next(iter(self._orphan_senders)))
+            self._orphans.setdefault(block.previous_hash, []).append(block)
+            self._orphan_senders[block.hash] = (block.previous_hash, peer_name)
+            self._orphans_per_peer[peer_name] += 1
+            if peer_name in self._peers:
+                self._send(peer_name, frame(MESSAGE_GET_BLOCK, bytes(block.previous_hash)))
+            return
+        pending = [block]
+        while pending:
+            block = pending.pop()
+            if not self.blockchain.add_block(block):
+                continue
+            self.block_arrivals[block.hash] = asyncio.get_running_loop().time()
+            self._broadcast(frame(MESSAGE_BLOCK, block.to_bytes()), peer_name)
+            children = self._orphans.pop(block.hash, [])
+            for child in children:
+                self._forget_orphan(child.hash)
+            pending.extend(children)
+
+    def _drop_orphan(self, block_hash: bytes):
+        """
+        Drop a kept orphan, e.g. the oldest one to make room for a new one.
+        """
+        parent_hash = self._forget_orphan(block_hash)
+        siblings = [orphan for orphan in self._orphans[parent_hash] if orphan.hash != block_hash]
+        if siblings:
+            self._orphans[parent_hash] = siblings
+        else:
+            del self._orphans[parent_hash]
+
+    def _forget_orphan(self, block_hash: bytes) -> bytes:
+        """
+        Stop counting an orphan against its sender's limit. Returns the hash of the orphan's parent.
+        """
+        parent_hash, peer_name = self._orphan_senders.pop(block_hash)
+        self._orphans_per_peer[peer_name] -= 1
+        return parent_hash
+
+    def _broadcast(self, data: bytes, excluded_peer: Optional[str]):
+        for peer_name in list(self._peers):
+            if peer_name != excluded_peer:
+                self._send(peer_name, data)
+
+    def _send(self, peer_name: str, data: bytes):
+        """
+        Send a framed message over the node's simulated uplink: it is delivered once all earlier messages have been
+        transmitted at the node's bandwidth, plus the node's latency.
+        """
+        loop = asyncio.get_running_loop()
+        start = max(loop.time(), self._uplink_free_at)
+        self._uplink_free_at = start + (len(data) / self.bandwidth if self.bandwidth else 0.0)
+        self.sent_bytes += len(data)
+        loop.call_at(self._uplink_free_at + self.latency, self._deliver, peer_name, data)
+
+    def _deliver(self, peer_name: str, data: bytes):
+        deliver = self._peers.get(peer_name)
+        if deliver is not None:
+            deliver(data)
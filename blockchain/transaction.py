@@ -1,29 +1,46 @@
 import cryptography
 import base64
+from typing import List, Optional, Sequence, Tuple
+from . import encoding
 
 class Transaction:
     """
     Represents a blockchain transaction between a sender and a recipient.
 
     This class contains the details of a transaction, including the sender, recipient,
-    amount, and a cryptographic provider for signing and verifying the transaction.
+    amount, fee, sequence number, and a cryptographic provider for signing and verifying the transaction.
+    Every sender numbers its transactions consecutively from 0, and the sequence number is
+    part of the signed payload, so a transaction cannot be replayed once it has been mined.
+    Sender and recipient are hashed addresses. The sender's full public key is only carried
+    by the transaction until it has been revealed on the chain; afterwards it is looked up
+    in the chain's key registry. A pruned transaction only keeps the hash of its signature,
+    which is all its hash commits to.
     """
 
-    def __init__(self, sender: str, recipient: str, amount: int, crypto_provider: cryptography.CryptoProvider):
+    __slots__ = ('sender', 'recipient', 'amount', 'fee', 'sequence', 'crypto_provider', 'public_key', 'signature', 'signature_hash')
+
+    def __init__(self, sender: str, recipient: str, amount: int, crypto_provider: cryptography.CryptoProvider, fee: int = 0, public_key: bytes = None, sequence: int = 0):
         """
         Initialize a new transaction.
 
         Args:
-            sender (str): The sender's public key as a base64-encoded string.
-            recipient (str): The recipient's public key as a base64-encoded string.
+            sender (str): The sender's address (see `CryptoProvider.address`).
+            recipient (str): The recipient's address (see `CryptoProvider.address`).
             amount (int): The amount of funds to transfer.
             crypto_provider (CryptoProvider): The cryptographic provider used for signing and verifying the transaction.
+            fee (int, optional): The fee paid by the sender on top of the amount, used to prioritize the transaction. Defaults to 0.
+            public_key (bytes, optional): The sender's public key, needed on the sender's first spend. Defaults to None.
+            sequence (int, optional): The number of transactions the sender has sent before this one. Defaults to 0.
         """
         self.sender = sender
         self.recipient = recipient
         self.amount = amount
+        self.fee = fee
+        self.sequence = sequence
         self.crypto_provider = crypto_provider
+        self.public_key = public_key
         self.signature = None
+        self.signature_hash = None
 
     def sign_transaction(self, private_key: bytes):
         """
@@ -32,18 +49,183 @@ class Transaction:
         Args:
             private_key (bytes): The sender's private key in bytes format.
         """
-        transaction = f'{self.sender}{self.recipient}{self.amount}'.encode()
-        self.signature = self.crypto_provider.sign(private_key, transaction)
+        self.signature = self.crypto_provider.sign(private_key, self.payload_bytes())
+
+    @staticmethod
+    def sign_transactions(transactions: List['Transaction'], private_keys: Sequence[bytes], workers: int = None):
+        """
+        Sign many transactions at once. The signatures are created by a pool of worker processes of the transactions' crypto
+        provider (see `CryptoProvider.sign_many`), each of which reuses its signing contexts across transactions.
+
+        Args:
+            transactions (List[Transaction]): The transactions to sign. They have to share one crypto provider.
+            private_keys (Sequence[bytes]): The sender's private key of every transaction, in the same order.
+            workers (int, optional): The number of worker processes. Defaults to the number of CPUs; 1 signs in the calling process.
+
+        Raises:
+            ValueError: If the number of private keys does not match the number of transactions, or the transactions use different crypto providers.
+        """
+        if len(private_keys) != len(transactions):
+            raise ValueError("Expected one private key per transaction")
+        if not transactions:
+            return
+        crypto_provider = transactions[0].crypto_provider
+        if any(transaction.crypto_provider is not crypto_provider for transaction in transactions):
+            raise ValueError("Transactions have to share one crypto provider")
+        signatures = crypto_provider.sign_many(
+            ((private_key, transaction.payload_bytes()) for transaction, private_key in zip(transactions, private_keys)), workers
+        )
+        for transaction, signature in zip(transactions, signatures):
+            transaction.signature = signature
 
-    def is_valid(self) -> bool:
+    def is_valid(self, key_registry: 'KeyRegistry' = None) -> bool:
         """
-        Verify the validity of the transaction signature.
+        Verify the validity of the transaction signature. Transactions whose signature has already been verified are looked up
+        in the crypto provider's signature cache by their hash instead of being verified again.
+
+        Args:
+            key_registry (KeyRegistry, optional): The registry to look up the sender's public key in if the transaction does not carry it.
 
         Returns:
             bool: True if the transaction signature is valid; False otherwise.
         """
-        transaction = f'{self.sender}{self.recipient}{self.amount}'.encode()
-        return self.crypto_provider.verify(base64.b64decode(self.sender), transaction, self.signature)
+        signature_cache = self.crypto_provider.signature_cache
+        if signature_cache.enabled:
+            digest = self.compute_hash()
+            if signature_cache.contains(digest):
+                return True
+        public_key, message, signature = self._verification_input(key_registry)
+        if public_key is None or signature is None:
+            return False
+        is_valid = self.crypto_provider.verify(public_key, message, signature)
+        if is_valid and signature_cache.enabled:
+            signature_cache.add(digest)
+        return is_valid
+
+    @property
+    def pruned(self) -> bool:
+        """
+        Whether the transaction's signature has been pruned, leaving only its hash.
+        """
+        return self.signature is None and self.signature_hash is not None
+
+    def prune(self, public_key: bool = False):
+        """
+        Drop the transaction's signature and keep only its hash, so that the transaction's hash stays the same. A pruned
+        transaction can no longer be verified.
+
+        Args:
+            public_key (bool, optional): Whether to drop the carried public key of the sender as well. Defaults to False.
+        """
+        if self.signature is not None:
+            self.signature_hash = self.crypto_provider.hash(self.signature)
+            self.signature = None
+        if public_key:
+            self.public_key = None
+
+    def sender_public_key(self, key_registry: 'KeyRegistry' = None) -> Optional[bytes]:
+        """
+        Get the sender's public key, either from the transaction itself or from the key registry.
+
+        Args:
+            key_registry (KeyRegistry, optional): The registry to look up the key in if the transaction does not carry it.
+
+        Returns:
+            Optional[bytes]: The sender's public key, or None if it is unknown or does not match the sender's address.
+        """
+        if self.public_key is not None:
+            return self.public_key if self.crypto_provider.address(self.public_key) == self.sender else None
+        if key_registry is not None:
+            return key_registry.get(self.sender)
+        return None
+
+    def _verification_input(self, key_registry: 'KeyRegistry' = None) -> Tuple[Optional[bytes], bytes, bytes]:
+        return self.sender_public_key(key_registry), self.payload_bytes(), self.signature
+
+    def compute_hash(self) -> bytes:
+        """
+        Compute the cryptographic hash of the transaction, which is used as its leaf in the block's Merkle tree. It covers the
+        signed payload and a digest of the signature, so the signature is committed to by a fixed-size value, which is all a
+        pruned transaction keeps.
+
+        Returns:
+            bytes: The computed hash of the transaction.
+        """
+        signature_hash = self.signature_hash if self.pruned else self.crypto_provider.hash(self.signature or b'')
+        return self.crypto_provider.hash(self.payload_bytes() + signature_hash)
+
+    def payload_bytes(self) -> bytes:
+        """
+        Serialize the signed part of the transaction (format version, sender, recipient, amount, fee and sequence number) in the canonical binary
+        format. This is the message that is signed and verified.
+
+        Returns:
+            bytes: The serialized transaction without its signature.
+        """
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        encoding.write_bytes(out, self.sender)
+        encoding.write_bytes(out, self.recipient)
+        out += encoding.AMOUNT.pack(self.amount)
+        out += encoding.FEE.pack(self.fee)
+        out += encoding.SEQUENCE.pack(self.sequence)
+        return bytes(out)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the transaction including its signature (or the signature's hash, if pruned) and the sender's public key
+        (if carried) in the canonical binary format. A missing signature or public key is serialized as empty.
+
+        Returns:
+            bytes: The serialized transaction.
+        """
+        out = bytearray(self.payload_bytes())
+        if self.pruned:
+            out += encoding.FLAGS.pack(encoding.FLAG_PRUNED)
+            encoding.write_bytes(out, self.signature_hash)
+        else:
+            out += encoding.FLAGS.pack(0)
+            encoding.write_bytes(out, self.signature)
+        encoding.write_bytes(out, self.public_key)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, crypto_provider: cryptography.CryptoProvider) -> 'Transaction':
+        """
+        Deserialize a transaction from the canonical binary format.
+
+        Args:
+            data (bytes): The serialized transaction. Any buffer (e.g. a memoryview) is read without copying it first.
+            crypto_provider (CryptoProvider): The cryptographic provider used for signing and verifying the transaction.
+
+        Returns:
+            Transaction: The deserialized transaction.
+
+        Raises:
+            ValueError: If the data is not a single transaction in a supported format version.
+        """
+        view = memoryview(data)
+        transaction, offset = cls._read(view, 0, crypto_provider)
+        if offset != len(view):
+            raise ValueError("Unexpected trailing bytes after transaction")
+        return transaction
+
+    @classmethod
+    def _read(cls, view: memoryview, offset: int, crypto_provider: cryptography.CryptoProvider) -> Tuple['Transaction', int]:
+        offset = encoding.read_version(view, offset)
+        sender, offset = encoding.read_str(view, offset)
+        recipient, offset = encoding.read_str(view, offset)
+        amount, offset = encoding.read_struct(view, offset, encoding.AMOUNT)
+        fee, offset = encoding.read_struct(view, offset, encoding.FEE)
+        sequence, offset = encoding.read_struct(view, offset, encoding.SEQUENCE)
+        flags, offset = encoding.read_struct(view, offset, encoding.FLAGS)
+        signature, offset = encoding.read_bytes(view, offset)
+        public_key, offset = encoding.read_bytes(view, offset)
+        transaction = cls(sender, recipient, amount, crypto_provider, fee, bytes(public_key) if len(public_key) else None, sequence)
+        if flags & encoding.FLAG_PRUNED:
+            transaction.signature_hash = bytes(signature)
+        else:
+            transaction.signature = bytes(signature) if len(signature) else None
+        return transaction, offset
 
     def __str__(self) -> str: # pragma: no cover
         return (
@@ -51,5 +233,7 @@ class Transaction:
             f"  | Sender:     {self.sender}\n"
             f"  | Recipient:  {self.recipient}\n"
             f"  | Amount:     {self.amount}\n"
+            f"  | Fee:        {self.fee}\n"
+            f"  | Sequence:   {self.sequence}\n"
             f"  | Signature:  {base64.b64encode(self.signature).decode('utf-8')}"
         )
\ No newline at end of file
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Tuple
+from . import encoding
+from .block import Block
+
+class TransactionIndex:
+    """
+    Chain-level index mapping the hash of every mined transaction to the height of its block and its position in it.
+
+    The index is updated block by block as blocks are appended to the chain. A journal of the hashes added per height
+    allows rolling back to an earlier height, e.g. when the chain switches to a competing branch.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty transaction index.
+        """
+        self._locations: Dict[bytes, Tuple[int, int]] = {}
+        self._journal: Dict[int, List[bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._locations
+
+    def add_block(self, block: Block):
+        """
+        Add the transactions of a block. A transaction that is already indexed keeps its earlier location.
+
+        Args:
+            block (Block): The block whose transactions should be indexed.
+        """
+        digests = []
+        for position, transaction in enumerate(block.transactions):
+            digest = transaction.compute_hash()
+            if digest not in self._locations:
+                self._locations[digest] = (block.index, position)
+                digests.append(digest)
+        self._journal[block.index] = digests
+
+    def get(self, digest: bytes) -> Optional[Tuple[int, int]]:
+        """
+        Look up where a transaction was mined.
+
+        Args:
+            digest (bytes): The hash of the transaction (see `Transaction.compute_hash`).
+
+        Returns:
+            Optional[Tuple[int, int]]: The height of the block and the position in it, or None if the transaction is not indexed.
+        """
+        return self._locations.get(digest)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the index in the canonical binary format: the hash, height and position of every indexed transaction.
+        The journal is derived from the heights.
+
+        Returns:
+            bytes: The serialized index.
+        """
+        out = bytearray(encoding.VERSION.pack(encoding.FORMAT_VERSION))
+        out += encoding.LENGTH.pack(len(self._locations))
+        for digest, (height, position) in self._locations.items():
+            encoding.write_bytes(out, digest)
+            out += encoding.INDEX.pack(height)
+            out += encoding.INDEX.pack(position)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TransactionIndex':
+        """
+        Deserialize a transaction index from the canonical binary format.
+
+        Args:
+            data (bytes): The serialized index.
+
+        Returns:
+            TransactionIndex: The deserialized index.
+
+        Raises:
+            ValueError: If the data is not a single index in a supported format version.
+        """
+        view = memoryview(data)
+        index = cls()
+        offset = encoding.read_version(view, 0)
+        count, offset = encoding.read_struct(view, offset, encoding.LENGTH)
+        journal: Dict[int, List[bytes]] = {}
+        for _ in range(count):
+            digest, offset = encoding.read_bytes(view, offset)
+            height, offset = encoding.read_struct(view, offset, encoding.INDEX)
+            position, offset = encoding.read_struct(view, offset, encoding.INDEX)
+            index._locations[bytes(digest)] = (height, position)
+            journal.setdefault(height, []).append(bytes(digest))
+        if offset != len(view):
+            raise ValueError("Unexpected trailing bytes after transaction index")
+        # Rolling back pops the journal from its end, so it is ordered by height
+        index._journal = dict(sorted(journal.items()))
+        return index
+
+    def rollback(self, height: int):
+        """
+        Remove the transactions of all blocks above the given height. Only the transactions of those blocks are touched.
+
+        Args:
+            height (int): The height to roll back to.
+        """
+        # Blocks are added in increasing height, so the journal is popped from its end
+        while self._journal and next(reversed(self._journal)) > height:
+            _, digests = self._journal.popitem()
+            for digest in digests:
+                del self._locations[digest]
@@ -0,0 +1,139 @@
+import cryptography
+import concurrent.futures
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+from .key_registry import KeyRegistry
+from .transaction import Transaction
+
+# Tasks per worker a batch is split into, so that fast workers can pick up the work of slow ones
+_CHUNKS_PER_WORKER = 4
+
+# Crypto providers of a worker process (one per signature and hashing algorithm), reused across chunks
+_providers: Dict[Tuple[str, str], cryptography.CryptoProvider] = {}
+
+def _first_invalid(crypto_provider: cryptography.CryptoProvider, chunk: List[Tuple[bytes, bytes, bytes]]) -> int:
+    """
+    Verify a chunk of (public key, message, signature) tuples in order. Runs inside a worker thread.
+
+    Returns:
+        int: The position of the first invalid signature in the chunk, or -1 if all signatures are valid.
+    """
+    for position, (public_key, message, signature) in enumerate(chunk):
+        if public_key is None or signature is None or not crypto_provider.verify(public_key, message, signature):
+            return position
+    return -1
+
+def _first_invalid_in_process(settings: Tuple[str, str], chunk: List[Tuple[bytes, bytes, bytes]]) -> int:
+    """
+    Verify a chunk like `_first_invalid` inside a worker process, with a provider created from the (signature algorithm,
+    hashing algorithm) settings of the batch's provider, as the provider itself cannot be sent to the process.
+    """
+    crypto_provider = _providers.get(settings)
+    if crypto_provider is None:
+        crypto_provider = _providers[settings] = cryptography.CryptoProvider(*settings)
+    return _first_invalid(crypto_provider, chunk)
+
+class BatchVerifier:
+    """
+    Verifies the signatures of many transactions at once by fanning them out across a pool of worker threads or processes.
+
+    Threads suit the OQS algorithms, whose C implementation runs without holding the GIL. Processes also parallelize the
+    pure-Python ECDSA implementation, at the cost of sending the keys, messages and signatures to the workers, whose
+    verifications are not recorded by the provider's instrumentation. The pool is
+    created on first use and kept until `close` is called. Transactions found in the crypto provider's signature cache are
+    not verified again, and all transactions of a valid batch are added to it.
+    """
+
+    def __init__(self, workers: int = 1, executor: str = 'thread'):
+        """
+        Initialize a new batch verifier.
+
+        Args:
+            workers (int, optional): The number of workers verifying signatures in parallel. Defaults to 1 (verification in the calling thread).
+            executor (str, optional): Either 'thread' or 'process', the kind of worker pool to use. Defaults to 'thread'.
+        """
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor '{executor}', expected 'thread' or 'process'")
+        self.workers = workers
+        self.executor = executor
+        self._pool = None
+
+    def verify(self, transactions: Iterable[Transaction], key_registry: KeyRegistry = None) -> Optional[Transaction]:
+        """
+        Verify the signatures of all given transactions. Stops as soon as an invalid signature is found and cancels the
+        verification of the remaining transactions.
+
+        Args:
+            transactions (Iterable[Transaction]): The transactions to verify.
+            key_registry (KeyRegistry, optional): The registry to look up the public keys of senders in that are not carried by the transactions.
+
+        Returns:
+            Optional[Transaction]: The first invalid transaction that was found, or None if all signatures are valid.
+        """
+        transactions = list(transactions)
+        if not transactions:
+            return None
+        crypto_provider = transactions[0].crypto_provider
+        digests = []
+        if crypto_provider.signature_cache.enabled:
+            unverified = []
+            for transaction in transactions:
+                digest = transaction.compute_hash()
+                if not crypto_provider.signature_cache.contains(digest):
+                    unverified.append(transaction)
+                    digests.append(digest)
+            transactions = unverified
+        verify_signatures = self._verify_signatures
+        instrumentation = crypto_provider.instrumentation
+        if instrumentation is not None:
+            instrumentation.count('batch_verified_signatures', crypto_provider.signature_algorithm, len(transactions))
+            verify_signatures = instrumentation.timed('verify_batch', crypto_provider.signature_algorithm, verify_signatures)
+        invalid_transaction = verify_signatures(crypto_provider, transactions, key_registry)
+        if invalid_transaction is None:
+            for digest in digests:
+                crypto_provider.signature_cache.add(digest)
+        return invalid_transaction
+
+    def _verify_signatures(self, crypto_provider: cryptography.CryptoProvider, transactions: List[Transaction], key_registry: KeyRegistry) -> Optional[Transaction]:
+        if not transactions:
+            return None
+        tasks = [transaction._verification_input(key_registry) for transaction in transactions]
+        if self.workers <= 1:
+            position = _first_invalid(crypto_provider, tasks)
+            return transactions[position] if position >= 0 else None
+
+        pool = self._get_pool()
+        chunk_size = math.ceil(len(tasks) / (self.workers * _CHUNKS_PER_WORKER))
+        if self.executor == 'process':
+            verify_chunk, provider = _first_invalid_in_process, (crypto_provider.signature_algorithm, crypto_provider.hashing_algorithm)
+        else:
+            verify_chunk, provider = _first_invalid, crypto_provider
+        futures = {
+            pool.submit(verify_chunk, provider, tasks[start:start + chunk_size]): start
+            for start in range(0, len(tasks), chunk_size)
+        }
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                position = future.result()
+                if position >= 0:
+                    return transactions[futures[future] + position]
+        finally:
+            for future in futures:
+                future.cancel()
+        return None
+
+    def close(self):
+        """
+        Shut down the worker pool. It is recreated if the verifier is used again.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.executor == 'process':
+                self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(self.workers)
+        return self._pool
@@ -1,2 +1,4 @@
-from .crypto_provider import CryptoProvider
+from .crypto_provider import CryptoProvider, Midstate
+from .instrumentation import Histogram, Instrumentation, MiningStats
+from .signature_cache import SignatureCache
 from .supported_algorithms import SUPPORTED_SIGNATURE_ALGORITHMS, SUPPORTED_HASH_FUNCTIONS
\ No newline at end of file
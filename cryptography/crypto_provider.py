@@ -1,12 +1,76 @@
+import base64
+import collections
+import concurrent.futures
+import functools
 import hashlib
+import math
+import os
+import threading
 import ecdsa
-from typing import Tuple
+from typing import Iterable, List, Tuple
 import oqs
+from .instrumentation import Instrumentation
+from .signature_cache import SignatureCache
+
+# Number of parsed ECDSA keys kept per key type (secret keys per provider, public keys per process)
+ECDSA_KEY_CACHE_SIZE = 1024
+
+# Number of OQS signing contexts (one per secret key) kept per thread
+OQS_SIGNER_CACHE_SIZE = 8
+
+# Number of digest bytes an address is made of, so addresses stay short for every key size
+ADDRESS_SIZE = 20
+
+# Number of chunks per worker the items of a bulk operation are split into, to balance uneven workloads
+BULK_CHUNKS_PER_WORKER = 4
+
+# Provider of a bulk worker process, created once by its initializer
+_worker_provider = None
+
+def _init_bulk_worker(signature_algorithm: str):
+    global _worker_provider
+    _worker_provider = CryptoProvider(signature_algorithm, '')
+
+def _bulk_generate_keypairs(n: int) -> List[Tuple[bytes, bytes]]:
+    return _worker_provider._generate_keypairs(n)
+
+def _bulk_sign(pairs: List[Tuple[bytes, bytes]]) -> List[bytes]:
+    return [_worker_provider.sign(secret_key, message) for secret_key, message in pairs]
+
+@functools.lru_cache(maxsize=ECDSA_KEY_CACHE_SIZE)
+def _ecdsa_verifying_key(public_key: bytes) -> ecdsa.VerifyingKey:
+    return ecdsa.VerifyingKey.from_der(public_key)
 
 class CryptoProvider:
-    def __init__(self, signature_algorithm, hashing_algorithm):
+    def __init__(self, signature_algorithm, hashing_algorithm, signature_cache_size=100000, instrumentation: Instrumentation = None):
         self.signature_algorithm = signature_algorithm
         self.hashing_algorithm = hashing_algorithm
+        self.signature_cache = SignatureCache(signature_cache_size)
+        self.instrumentation = instrumentation
+        self._bulk_pool = None
+        self._bulk_workers = 0
+
+        # OQS signature contexts are reused per thread, as they must not be shared between threads
+        self._local = threading.local()
+
+        # Parsed secret keys are only kept as long as the provider, unlike the public keys shared by all providers
+        self._ecdsa_signing_key = functools.lru_cache(maxsize=ECDSA_KEY_CACHE_SIZE)(ecdsa.SigningKey.from_der)
+
+        # Resolve the hash function once instead of on every call
+        if hashing_algorithm.startswith('shake'):
+            name = '_'.join(hashing_algorithm.split('_')[:2])
+            self._digest_args = (int(hashing_algorithm.split('_')[2]),)
+        else:
+            name = hashing_algorithm
+            self._digest_args = ()
+        if name in hashlib.algorithms_guaranteed:
+            self._hash_constructor = getattr(hashlib, name)
+        else:
+            self._hash_constructor = functools.partial(hashlib.new, name)
+
+        # Only an instrumented provider routes its operations through wrappers, so an uninstrumented one pays nothing
+        if instrumentation is not None:
+            self._instrument(instrumentation)
 
     def __repr__(self): # pragma: no cover
         return "CryptoProvider" + self.signature_algorithm + self.hashing_algorithm
@@ -23,32 +87,132 @@ class CryptoProvider:
                 secret_key = generator.export_secret_key()
         return public_key, secret_key
 
+    def generate_keypairs(self, n: int, workers: int = None) -> List[Tuple[bytes, bytes]]:
+        workers = self._bulk_worker_count(n, workers)
+        if workers <= 1:
+            return self._generate_keypairs(n)
+        chunk_size = math.ceil(n / (workers * BULK_CHUNKS_PER_WORKER))
+        chunks = [min(chunk_size, n - start) for start in range(0, n, chunk_size)]
+        pool = self._get_bulk_pool(workers)
+        return [keypair for keypairs in pool.map(_bulk_generate_keypairs, chunks) for keypair in keypairs]
+
+    def _generate_keypairs(self, n: int) -> List[Tuple[bytes, bytes]]:
+        if self.signature_algorithm == 'ECDSA-SHA256':
+            return [self.generate_keypair() for _ in range(n)]
+        # One context generates all keypairs, each call replaces its secret key
+        keypairs = []
+        with oqs.Signature(self.signature_algorithm) as generator:
+            for _ in range(n):
+                public_key = generator.generate_keypair()
+                keypairs.append((public_key, generator.export_secret_key()))
+        return keypairs
+
+    def sign_many(self, pairs: Iterable[Tuple[bytes, bytes]], workers: int = None) -> List[bytes]:
+        pairs = [(bytes(secret_key), bytes(message)) for secret_key, message in pairs]
+        workers = self._bulk_worker_count(len(pairs), workers)
+        if workers <= 1:
+            return [self.sign(secret_key, message) for secret_key, message in pairs]
+        chunk_size = math.ceil(len(pairs) / (workers * BULK_CHUNKS_PER_WORKER))
+        chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+        pool = self._get_bulk_pool(workers)
+        return [signature for signatures in pool.map(_bulk_sign, chunks) for signature in signatures]
+
+    def close(self):
+        self._ecdsa_signing_key.cache_clear()
+        if self._bulk_pool is not None:
+            self._bulk_pool.shutdown()
+            self._bulk_pool = None
+
+    def _bulk_worker_count(self, n: int, workers: int) -> int:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        return min(workers, n)
+
+    def _get_bulk_pool(self, workers: int) -> concurrent.futures.ProcessPoolExecutor:
+        # The pool is kept for later bulk operations, so every worker creates its provider and OQS contexts only once
+        if self._bulk_pool is None or self._bulk_workers != workers:
+            self.close()
+            self._bulk_pool = concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_bulk_worker, initargs=(self.signature_algorithm,))
+            self._bulk_workers = workers
+        return self._bulk_pool
+
     def sign(self, secret_key: bytes, message: bytes) -> bytes:
         if self.signature_algorithm == 'ECDSA-SHA256':
-            signature = ecdsa.SigningKey.from_der(secret_key).sign(message)
+            signature = self._ecdsa_signing_key(bytes(secret_key)).sign(message)
         else:
-            with oqs.Signature(self.signature_algorithm, secret_key) as signer:
-                signature = signer.sign(message)
+            signature = self._oqs_signer(bytes(secret_key)).sign(message)
         return signature
 
     def verify(self, public_key: bytes, message: bytes, signature: bytes) -> bool:
         if self.signature_algorithm == 'ECDSA-SHA256':
             try:
-                is_valid = ecdsa.VerifyingKey.from_der(public_key).verify(signature, message)
-            except ecdsa.BadSignatureError:
+                is_valid = _ecdsa_verifying_key(bytes(public_key)).verify(signature, message)
+            except (ecdsa.BadSignatureError, ecdsa.der.UnexpectedDER, ecdsa.keys.MalformedPointError, ValueError):
+                # A malformed key or signature (e.g. from a peer) is an invalid signature, not an error
                 is_valid = False
         else:
-            with oqs.Signature(self.signature_algorithm) as verifier:
-                is_valid = verifier.verify(message, signature, public_key)
+            verifier = self._oqs_verifier()
+            # liboqs reads a public key of the algorithm's length, so a key of another length can never be valid
+            is_valid = len(public_key) == verifier.length_public_key and verifier.verify(message, signature, public_key)
         return is_valid
 
     def hash(self, data: bytes) -> bytes:
-        if self.hashing_algorithm.startswith('shake'):
-            h = hashlib.new('_'.join(self.hashing_algorithm.split('_')[:2]))
-            h.update(data)
-            digest = h.digest(int(self.hashing_algorithm.split('_')[2]))
+        h = self._hash_constructor()
+        h.update(data)
+        return h.digest(*self._digest_args)
+
+    def address(self, public_key: bytes) -> str:
+        return base64.b64encode(self.hash(public_key)[:ADDRESS_SIZE]).decode('utf-8')
+
+    def midstate(self, prefix: bytes) -> 'Midstate':
+        h = self._hash_constructor()
+        h.update(prefix)
+        return Midstate(h, self._digest_args)
+
+    def _instrument(self, instrumentation: Instrumentation):
+        self.generate_keypair = instrumentation.timed('generate_keypair', self.signature_algorithm, self.generate_keypair)
+        self.sign = instrumentation.timed('sign', self.signature_algorithm, self.sign)
+        self.verify = instrumentation.timed('verify', self.signature_algorithm, self.verify)
+        self.generate_keypairs = instrumentation.timed('generate_keypairs', self.signature_algorithm, self.generate_keypairs)
+        self.sign_many = instrumentation.timed('sign_many', self.signature_algorithm, self.sign_many)
+        timed_hash = instrumentation.timed('hash', self.hashing_algorithm, self.hash)
+
+        def hash(data: bytes) -> bytes:
+            instrumentation.count('hashed_bytes', self.hashing_algorithm, len(data))
+            return timed_hash(data)
+        self.hash = hash
+
+    def _oqs_verifier(self) -> oqs.Signature:
+        verifier = getattr(self._local, 'verifier', None)
+        if verifier is None:
+            verifier = self._local.verifier = oqs.Signature(self.signature_algorithm)
+        return verifier
+
+    def _oqs_signer(self, secret_key: bytes) -> oqs.Signature:
+        signers = getattr(self._local, 'signers', None)
+        if signers is None:
+            signers = self._local.signers = collections.OrderedDict()
+        signer = signers.get(secret_key)
+        if signer is None:
+            signer = signers[secret_key] = oqs.Signature(self.signature_algorithm, secret_key)
+            if len(signers) > OQS_SIGNER_CACHE_SIZE:
+                _, evicted_signer = signers.popitem(last=False)
+                evicted_signer.free()
         else:
-            h = hashlib.new(self.hashing_algorithm)
-            h.update(data)
-            digest = h.digest()
-        return digest
\ No newline at end of file
+            signers.move_to_end(secret_key)
+        return signer
+
+class Midstate:
+    """
+    Hash state that has already absorbed a fixed prefix. Hashing prefix + suffix only copies the state and absorbs the suffix,
+    which avoids re-hashing the prefix for every nonce while mining.
+    """
+
+    def __init__(self, state, digest_args: Tuple[int, ...]):
+        self._state = state
+        self._digest_args = digest_args
+
+    def hash(self, suffix: bytes) -> bytes:
+        h = self._state.copy()
+        h.update(suffix)
+        return h.digest(*self._digest_args)
@@ -0,0 +1,180 @@
+import bisect
+import json
+import threading
+import time
+from typing import Dict, NamedTuple, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets, from 1 microsecond to 10 seconds
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of all exported metric names
+METRIC_PREFIX = "pqb"
+
+class MiningStats(NamedTuple):
+    index: int
+    difficulty: int
+    attempts: int
+    elapsed: float
+    hashrate: float
+
+class Histogram:
+    """
+    Latency histogram with fixed bucket bounds. Keeps the number of observations per bucket (the last bucket counts the
+    observations above the largest bound), their count and their sum.
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "bounds": list(self.bounds), "buckets": list(self.buckets)}
+
+class Instrumentation:
+    """
+    Collects call counts and latency histograms of the cryptographic operations (per operation and algorithm), the number
+    of bytes hashed per hash function and per-block mining statistics.
+
+    A crypto provider only routes its operations through the instrumentation if one is passed to it, so an uninstrumented
+    provider pays nothing. A disabled instrumentation costs one attribute check per operation.
+    """
+
+    def __init__(self, enabled: bool = True, mining_history_size: int = 1000):
+        self.enabled = enabled
+        self.mining_history_size = mining_history_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._latencies: Dict[Tuple[str, str], Histogram] = {}
+            self._counters: Dict[Tuple[str, str], int] = {}
+            self._mining_times = Histogram()
+            self._mining_history = []
+            self._mined_blocks = 0
+            self._mining_attempts = 0
+
+    def observe(self, operation: str, algorithm: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._latencies.get((operation, algorithm))
+            if histogram is None:
+                histogram = self._latencies[(operation, algorithm)] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, counter: str, algorithm: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(counter, algorithm)] = self._counters.get((counter, algorithm), 0) + value
+
+    def observe_mining(self, stats: MiningStats):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._mined_blocks += 1
+            self._mining_attempts += stats.attempts
+            self._mining_times.observe(stats.elapsed)
+            self._mining_history.append(stats)
+            del self._mining_history[:-self.mining_history_size]
+
+    def timed(self, operation: str, algorithm: str, function):
+        """
+        Wrap a function so that its calls are timed as the given operation while the instrumentation is enabled.
+        """
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(operation, algorithm, time.perf_counter() - start)
+        return wrapper
+
+    def snapshot(self) -> dict:
+        """
+        Copy the collected metrics into plain dictionaries and lists.
+
+        Returns:
+            dict: The latency histograms per operation and algorithm, the counters per algorithm and the mining statistics
+            (number of blocks, total attempts, time-to-solution histogram and the statistics of the most recent blocks).
+        """
+        with self._lock:
+            operations = {}
+            for (operation, algorithm), histogram in self._latencies.items():
+                operations.setdefault(operation, {})[algorithm] = histogram.snapshot()
+            counters = {}
+            for (counter, algorithm), value in self._counters.items():
+                counters.setdefault(counter, {})[algorithm] = value
+            return {
+                "operations": operations,
+                "counters": counters,
+                "mining": {
+                    "blocks": self._mined_blocks,
+                    "attempts": self._mining_attempts,
+                    "time_to_solution": self._mining_times.snapshot(),
+                    "recent_blocks": [stats._asdict() for stats in self._mining_history],
+                },
+            }
+
+    def export_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def export_prometheus(self) -> str:
+        """
+        Render the collected metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_crypto_operation_seconds Latency of the cryptographic operations.",
+            f"# TYPE {METRIC_PREFIX}_crypto_operation_seconds histogram",
+        ]
+        for operation, algorithms in sorted(snapshot["operations"].items()):
+            for algorithm, histogram in sorted(algorithms.items()):
+                labels = f'operation="{operation}",algorithm="{_escape(algorithm)}"'
+                lines += _histogram_lines(f"{METRIC_PREFIX}_crypto_operation_seconds", labels, histogram)
+        for counter, algorithms in sorted(snapshot["counters"].items()):
+            name = f"{METRIC_PREFIX}_{counter}_total"
+            lines += [f"# TYPE {name} counter"]
+            lines += [f'{name}{{algorithm="{_escape(algorithm)}"}} {value}' for algorithm, value in sorted(algorithms.items())]
+        mining = snapshot["mining"]
+        lines += [
+            f"# TYPE {METRIC_PREFIX}_mined_blocks_total counter",
+            f"{METRIC_PREFIX}_mined_blocks_total {mining['blocks']}",
+            f"# TYPE {METRIC_PREFIX}_mining_attempts_total counter",
+            f"{METRIC_PREFIX}_mining_attempts_total {mining['attempts']}",
+            f"# HELP {METRIC_PREFIX}_mining_seconds Time-to-solution of the proof-of-work per block.",
+            f"# TYPE {METRIC_PREFIX}_mining_seconds histogram",
+        ]
+        lines += _histogram_lines(f"{METRIC_PREFIX}_mining_seconds", "", mining["time_to_solution"])
+        if mining["recent_blocks"]:
+            lines += [
+                f"# HELP {METRIC_PREFIX}_mining_hashrate Hashes per second of the last mined block.",
+                f"# TYPE {METRIC_PREFIX}_mining_hashrate gauge",
+                f"{METRIC_PREFIX}_mining_hashrate {mining['recent_blocks'][-1]['hashrate']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+def _histogram_lines(name: str, labels: str, histogram: dict):
+    separator = "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, bucket in zip(histogram["bounds"] + ["+Inf"], histogram["buckets"]):
+        cumulative += bucket
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram['sum']}")
+    lines.append(f"{name}_count{suffix} {histogram['count']}")
+    return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
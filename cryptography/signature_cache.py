@@ -0,0 +1,47 @@
+import collections
+import threading
+
+class SignatureCache:
+    """
+    Bounded LRU set of digests of transactions whose signatures have already been verified successfully.
+
+    Keeps track of hits and misses. A disabled cache never reports a hit and does not store anything, which allows
+    benchmarks to measure the full verification cost.
+    """
+
+    def __init__(self, maxsize: int = 100000, enabled: bool = True):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._digests = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def contains(self, digest: bytes) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            if digest in self._digests:
+                self._digests.move_to_end(digest)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, digest: bytes):
+        if not self.enabled or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._digests[digest] = None
+            self._digests.move_to_end(digest)
+            while len(self._digests) > self.maxsize:
+                self._digests.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._digests.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,561 @@
+import argparse
+import concurrent.futures
+import datetime
+import gc
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import numpy as np
+from pympler import asizeof
+
+from blockchain import Blockchain, Transaction
+import cryptography
+
+# Selection benchmarked when no algorithms or hash functions are given
+DEFAULT_ALGORITHMS = ['ECDSA-SHA256', 'Falcon-512', 'Falcon-1024', 'Dilithium2', 'Dilithium3', 'Dilithium5', 'SPHINCS+-SHA2-256f-simple', 'SPHINCS+-SHA2-256s-simple']
+DEFAULT_HASH_FUNCTIONS = ['sha512']
+
+# Digest length (bytes) used for the variable-length SHAKE functions when selecting 'all' hash functions
+SHAKE_DIGEST_LENGTH = 32
+
+# z-value of the two-sided 95% confidence intervals
+Z_95 = 1.959964
+
+# Relative slowdown (or growth in size) above which a metric is flagged as a regression by `compare`
+DEFAULT_THRESHOLD = 0.10
+
+# Python distributions whose versions are recorded with the results
+RECORDED_LIBRARIES = ['liboqs-python', 'ecdsa', 'numpy', 'pympler']
+
+# CPU the current worker process is pinned to (None outside of workers)
+_worker_cpu = None
+
+def resolve_algorithms(names):
+    """
+    Expand the algorithm selection given on the command line and check it against the supported signature algorithms.
+
+    Args:
+        names (List[str]): Signature algorithm names, or ['all'] for every supported algorithm.
+
+    Returns:
+        List[str]: The selected signature algorithms.
+
+    Raises:
+        ValueError: If an algorithm is not supported.
+    """
+    if names == ['all']:
+        return sorted(cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+    unsupported = [name for name in names if name not in cryptography.SUPPORTED_SIGNATURE_ALGORITHMS]
+    if unsupported:
+        raise ValueError(f"Unsupported signature algorithms: {', '.join(unsupported)}")
+    return list(names)
+
+def resolve_hash_functions(names):
+    """
+    Expand the hash function selection given on the command line and check it against the supported hash functions. The
+    SHAKE functions are selected with their digest length in bytes, e.g. 'shake_256_64'.
+
+    Args:
+        names (List[str]): Hash function names, or ['all'] for every supported hash function.
+
+    Returns:
+        List[str]: The selected hash functions.
+
+    Raises:
+        ValueError: If a hash function is not supported.
+    """
+    if names == ['all']:
+        return sorted(name.replace('_x', f'_{SHAKE_DIGEST_LENGTH}') for name in cryptography.SUPPORTED_HASH_FUNCTIONS)
+    unsupported = []
+    for name in names:
+        parts = name.split('_')
+        if name.startswith('shake') and len(parts) == 3 and parts[2].isdigit():
+            name = '_'.join(parts[:2]) + '_x'
+        if name not in cryptography.SUPPORTED_HASH_FUNCTIONS:
+            unsupported.append(name)
+    if unsupported:
+        raise ValueError(f"Unsupported hash functions: {', '.join(unsupported)}")
+    return list(names)
+
+def summarize(samples_ns):
+    """
+    Summarize timing samples. The confidence interval of the median is distribution-free (based on order statistics),
+    the one of the mean assumes a normal sampling distribution.
+
+    Args:
+        samples_ns (List[int]): The measured durations in nanoseconds.
+
+    Returns:
+        dict: Sample count, mean, standard deviation, min, median, p95, p99, max and 95% confidence intervals of the median and the mean, all in milliseconds.
+
+    Raises:
+        ValueError: If there are no samples.
+    """
+    if len(samples_ns) == 0:
+        raise ValueError("At least one sample is needed")
+    samples = np.sort(np.asarray(samples_ns, dtype=np.float64)) / 1e6
+    n = len(samples)
+    mean = float(np.mean(samples))
+    stdev = float(np.std(samples, ddof=1)) if n > 1 else 0.0
+    # Ranks of the order statistics enclosing the median with 95% confidence
+    half_width = Z_95 * np.sqrt(n) / 2
+    lower = max(int(np.floor(n / 2 - half_width)), 0)
+    upper = min(int(np.ceil(n / 2 + half_width)), n - 1)
+    mean_margin = Z_95 * stdev / np.sqrt(n)
+    return {
+        "n": n,
+        "mean": mean,
+        "stdev": stdev,
+        "min": float(samples[0]),
+        "median": float(np.median(samples)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+        "max": float(samples[-1]),
+        "median_ci": [float(samples[lower]), float(samples[upper])],
+        "mean_ci": [mean - mean_margin, mean + mean_margin],
+    }
+
+def measure(operation, repeat_count, warmup_count, setup=None):
+    """
+    Time an operation with `time.perf_counter_ns`. The first runs only warm up caches and are discarded, and the
+    garbage collector is paused while the operation is timed.
+
+    Args:
+        operation (Callable): The operation to time. Called with the result of `setup`, if given.
+        repeat_count (int): The number of timed runs.
+        warmup_count (int): The number of discarded runs before the timed ones.
+        setup (Callable, optional): Prepares the argument of every run outside of the timed section.
+
+    Returns:
+        List[int]: The durations of the timed runs in nanoseconds.
+    """
+    samples = []
+    for run in range(warmup_count + repeat_count):
+        argument = setup(run) if setup is not None else None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            operation(argument) if setup is not None else operation()
+            duration = time.perf_counter_ns() - start
+        finally:
+            gc.enable()
+        if run >= warmup_count:
+            samples.append(duration)
+    return samples
+
+def available_cpus():
+    """
+    The CPUs the current process may run on, or all CPUs if the platform does not support CPU affinity.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def pin_to_cpu(cpu):
+    """
+    Restrict the current process to one CPU, so the scheduler does not migrate it between cores while it is measured.
+    Does nothing on platforms without CPU affinity (e.g. macOS and Windows).
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+def cpu_model():
+    """
+    The model name of the CPU, read from /proc/cpuinfo on Linux.
+    """
+    try:
+        with open('/proc/cpuinfo') as file:
+            for line in file:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+def library_versions():
+    """
+    The versions of the libraries the measurements depend on, including the liboqs C library. Missing libraries are recorded as None.
+    """
+    versions = {}
+    for name in RECORDED_LIBRARIES:
+        try:
+            versions[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            versions[name] = None
+    try:
+        import oqs
+        versions["liboqs"] = oqs.oqs_version()
+    except (ImportError, AttributeError):
+        versions["liboqs"] = None
+    return versions
+
+def machine_metadata():
+    """
+    Describe the machine and the library versions of a run, so results of different runs can be told apart.
+    """
+    return {
+        "python": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "available_cpus": available_cpus(),
+        "libraries": library_versions(),
+    }
+
+def _init_worker(cpus):
+    """
+    Pin a new worker process to the next free CPU of the shared queue, so every worker runs on its own core.
+    """
+    global _worker_cpu
+    _worker_cpu = cpus.get()
+    pin_to_cpu(_worker_cpu)
+
+def _benchmark_in_worker(suite, algorithm, hash_function):
+    return suite.benchmark(algorithm, hash_function), _worker_cpu
+
+class BenchmarkSuite:
+    def __init__(self, algorithms=DEFAULT_ALGORITHMS, hash_functions=DEFAULT_HASH_FUNCTIONS, repeat_count=100, warmup_count=10, block_size=2, difficulty=1, num_transactions=10, workers=1, cpus=None):
+        self.algorithms = algorithms
+        self.hash_functions = hash_functions
+        self.repeat_count = repeat_count # Number of timed repetitions for each measurement
+        self.warmup_count = warmup_count # Number of discarded repetitions before the timed ones
+        self.block_size = block_size # Number of transactions per block
+        self.difficulty = difficulty # Mining difficulty level
+        self.num_transactions = num_transactions # Number of transactions added for the storage measurements
+        self.workers = workers # Number of worker processes the combinations are split across
+        self.cpus = cpus if cpus is not None else available_cpus()[:workers] # CPUs the workers are pinned to, one per worker
+        if repeat_count < 1:
+            raise ValueError("At least one timed repetition is needed")
+        if warmup_count < 0:
+            raise ValueError("The number of warm-up repetitions cannot be negative")
+        if workers < 1:
+            raise ValueError("At least one worker is needed")
+        if len(self.cpus) < workers:
+            raise ValueError(f"{workers} workers need {workers} CPUs to be pinned to, but only {len(self.cpus)} are given")
+        if len(set(self.cpus)) != len(self.cpus):
+            raise ValueError("Every worker needs its own CPU")
+        unavailable = sorted(set(self.cpus) - set(available_cpus()))
+        if unavailable:
+            raise ValueError(f"CPUs not available to this process: {', '.join(map(str, unavailable))}")
+
+    def run(self, log=print):
+        """
+        Run all measurements for every combination of the selected signature algorithms and hash functions. With more than
+        one worker, the combinations are split across worker processes that are each pinned to their own CPU, so they
+        neither compete for a core nor get migrated between cores while they are measured. With one worker, the
+        combinations run one after another in a single process pinned to the first CPU.
+
+        Returns:
+            dict: The run's metadata and its results, keyed by '<algorithm>/<hash function>'. Every result records the CPU it was measured on.
+        """
+        combinations = [(algorithm, hash_function) for algorithm in self.algorithms for hash_function in self.hash_functions]
+        results = {}
+        if self.workers == 1:
+            affinity = available_cpus()
+            pin_to_cpu(self.cpus[0])
+            try:
+                for algorithm, hash_function in combinations:
+                    log(f"Benchmarking {algorithm} with {hash_function}...")
+                    results[f"{algorithm}/{hash_function}"] = {**self.benchmark(algorithm, hash_function), "cpu": self.cpus[0]}
+            finally:
+                if hasattr(os, 'sched_setaffinity'):
+                    os.sched_setaffinity(0, affinity)
+            return {"metadata": self.metadata(), "results": results}
+
+        cpus = multiprocessing.Queue()
+        for cpu in self.cpus[:self.workers]:
+            cpus.put(cpu)
+        log(f"Benchmarking {len(combinations)} combinations in {self.workers} worker processes...")
+        with concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(cpus,)) as executor:
+            futures = {
+                executor.submit(_benchmark_in_worker, self, algorithm, hash_function): f"{algorithm}/{hash_function}"
+                for algorithm, hash_function in combinations
+            }
+            for future in concurrent.futures.as_completed(futures):
+                result, cpu = future.result()
+                log(f"Finished {futures[future]} on CPU {cpu}")
+                results[futures[future]] = {**result, "cpu": cpu}
+        # Report the combinations in the order they were selected, not in the order they finished
+        results = {f"{algorithm}/{hash_function}": results[f"{algorithm}/{hash_function}"] for algorithm, hash_function in combinations}
+        return {"metadata": self.metadata(), "results": results}
+
+    def metadata(self):
+        return {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            **machine_metadata(),
+            "workers": self.workers,
+            "cpus": self.cpus[:self.workers],
+            "repeat_count": self.repeat_count,
+            "warmup_count": self.warmup_count,
+            "block_size": self.block_size,
+            "difficulty": self.difficulty,
+            "num_transactions": self.num_transactions,
+        }
+
+    def benchmark(self, algorithm, hash_function):
+        provider = cryptography.CryptoProvider(algorithm, hash_function)
+        provider.signature_cache.enabled = False # Measure the full verification cost
+
+        # Generate the keys outside of the timed sections
+        public_key1, private_key1 = provider.generate_keypair()
+        sender = provider.address(public_key1)
+        public_key2, private_key2 = provider.generate_keypair()
+        recipient = provider.address(public_key2)
+
+        def create_transaction(amount, sequence=0):
+            transaction = Transaction(sender, recipient, amount, provider, public_key=public_key1, sequence=sequence)
+            transaction.sign_transaction(private_key1)
+            return transaction
+
+        transaction = create_transaction(10)
+        # Consecutive sequence numbers, as the sender's transactions are mined in sequence. They are signed once and
+        # deserialized into fresh objects for every run, since mining removes the public keys from the mined transactions
+        block_transactions = [create_transaction(10, i).to_bytes() for i in range(self.block_size)]
+
+        def fill_blockchain(_):
+            blockchain = Blockchain(self.block_size, self.difficulty, provider)
+            for data in block_transactions:
+                blockchain.add_transaction(Transaction.from_bytes(data, provider))
+            return blockchain
+
+        timings = {
+            "transaction_time": measure(lambda: create_transaction(10), self.repeat_count, self.warmup_count),
+            "verification_time": measure(transaction.is_valid, self.repeat_count, self.warmup_count),
+            "mining_time": measure(lambda blockchain: blockchain.mine_pending_transactions(), self.repeat_count, self.warmup_count, fill_blockchain),
+        }
+
+        return {
+            "algorithm": algorithm,
+            "hash_function": hash_function,
+            "sizes": {
+                "public_key_size": len(public_key1),
+                "private_key_size": len(private_key1),
+                "signature_size": len(transaction.signature),
+                **self.storage_usage(provider, sender, recipient, public_key1, private_key1),
+            },
+            "timings": {metric: summarize(samples) for metric, samples in timings.items()},
+        }
+
+    def storage_usage(self, provider, sender, recipient, public_key, private_key):
+        """
+        Measure the in-memory size (with regular and with columnar blocks) and the serialized size (with regular and with
+        pruned blocks) of a blockchain in Kilobytes.
+        """
+        blockchain = Blockchain(self.block_size, self.difficulty, provider)
+        for i in range(self.num_transactions):
+            transaction = Transaction(sender, recipient, 10 + i, provider, public_key=public_key, sequence=i)
+            transaction.sign_transaction(private_key)
+            blockchain.add_transaction(transaction)
+        while blockchain.pending_transactions:
+            blockchain.mine_pending_transactions()
+
+        storage_usage = asizeof.asizeof(blockchain) / 1024
+        serialized_storage_usage = sum(len(block.to_bytes()) for block in blockchain.chain) / 1024
+        for block in blockchain.chain:
+            block.compact()
+        columnar_storage_usage = asizeof.asizeof(blockchain) / 1024
+        for block in blockchain.chain:
+            block.prune()
+        pruned_storage_usage = sum(len(block.to_bytes()) for block in blockchain.chain) / 1024
+        return {
+            "storage_usage": storage_usage,
+            "serialized_storage_usage": serialized_storage_usage,
+            "columnar_storage_usage": columnar_storage_usage,
+            "pruned_storage_usage": pruned_storage_usage,
+        }
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare a run against a baseline run. A timing is flagged as a regression if its median is more than `threshold`
+    slower than the baseline's median and the confidence intervals of both medians do not overlap. A size is flagged if it
+    grew by more than `threshold`. Only combinations and metrics contained in both runs are compared.
+
+    Args:
+        baseline (dict): The results of the baseline run (as written by `run`).
+        current (dict): The results of the run to check.
+        threshold (float, optional): The relative change tolerated. Defaults to 10%.
+
+    Returns:
+        List[dict]: One entry per compared metric with the combination, the metric, the baseline and current values, the relative change and whether it is a regression.
+    """
+    comparisons = []
+    for key, result in current["results"].items():
+        baseline_result = baseline["results"].get(key)
+        if baseline_result is None:
+            continue
+        for metric, stats in result["timings"].items():
+            baseline_stats = baseline_result["timings"].get(metric)
+            if baseline_stats is None:
+                continue
+            change = stats["median"] / baseline_stats["median"] - 1 if baseline_stats["median"] else 0.0
+            significant = stats["median_ci"][0] > baseline_stats["median_ci"][1]
+            comparisons.append({
+                "key": key, "metric": metric, "baseline": baseline_stats["median"], "current": stats["median"],
+                "change": change, "regression": change > threshold and significant,
+            })
+        for metric, value in result["sizes"].items():
+            baseline_value = baseline_result["sizes"].get(metric)
+            if baseline_value is None:
+                continue
+            change = value / baseline_value - 1 if baseline_value else 0.0
+            comparisons.append({
+                "key": key, "metric": metric, "baseline": baseline_value, "current": value,
+                "change": change, "regression": change > threshold,
+            })
+    return comparisons
+
+def plot_results(report, directory):
+    """
+    Save a bar chart per metric as PNG files into the given directory. Timings show the median with its confidence
+    interval and mark the p95 and p99. Uses a non-interactive backend, so it never blocks.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(directory, exist_ok=True)
+    results = report["results"]
+    labels = list(results.keys())
+    size_metrics = {
+        "public_key_size": ("Public Key Size", "Size (bytes)"),
+        "private_key_size": ("Private Key Size", "Size (bytes)"),
+        "signature_size": ("Signature Size", "Size (bytes)"),
+        "storage_usage": ("Blockchain Storage Usage", "Size (Kilobytes)"),
+        "serialized_storage_usage": ("Serialized Blockchain Size", "Size (Kilobytes)"),
+        "columnar_storage_usage": ("Columnar Blockchain Storage Usage", "Size (Kilobytes)"),
+        "pruned_storage_usage": ("Pruned Blockchain Size", "Size (Kilobytes)"),
+    }
+    timed_metrics = {
+        "transaction_time": "Transaction Time",
+        "verification_time": "Verification Time",
+        "mining_time": "Mining Time",
+    }
+
+    for metric, (title, ylabel) in size_metrics.items():
+        values = [results[label]["sizes"][metric] for label in labels]
+        fig, ax = plt.subplots()
+        bars = ax.bar(labels, values)
+        ax.bar_label(bars, fmt='%.2f')
+        ax.set_title(title)
+        ax.set_ylabel(ylabel)
+        _finish_plot(fig, ax, os.path.join(directory, f"{metric}.png"))
+
+    for metric, title in timed_metrics.items():
+        stats = [results[label]["timings"][metric] for label in labels]
+        medians = [s["median"] for s in stats]
+        errors = [[s["median"] - s["median_ci"][0] for s in stats], [s["median_ci"][1] - s["median"] for s in stats]]
+        fig, ax = plt.subplots()
+        bars = ax.bar(labels, medians, yerr=errors, capsize=4, label="median (95% CI)")
+        ax.scatter(labels, [s["p95"] for s in stats], marker="_", s=200, color="black", label="p95", zorder=3)
+        ax.scatter(labels, [s["p99"] for s in stats], marker="x", color="red", label="p99", zorder=3)
+        ax.bar_label(bars, fmt='%.2f', label_type='center')
+        ax.set_title(title)
+        ax.set_ylabel("Time (ms)")
+        ax.legend()
+        _finish_plot(fig, ax, os.path.join(directory, f"{metric}.png"))
+
+def _finish_plot(fig, ax, path):
+    import matplotlib.pyplot as plt
+    ax.tick_params(axis='x', labelrotation=45)
+    plt.setp(ax.get_xticklabels(), ha="right", rotation_mode="anchor")
+    ax.grid(axis='y')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def print_results(report):
+    for key, result in report["results"].items():
+        print(f"\n{key}")
+        for metric, value in result["sizes"].items():
+            print(f"  {metric:<26} {value:>12.2f}")
+        for metric, stats in result["timings"].items():
+            print(
+                f"  {metric:<26} median {stats['median']:.3f} ms "
+                f"[{stats['median_ci'][0]:.3f}, {stats['median_ci'][1]:.3f}]  "
+                f"p95 {stats['p95']:.3f} ms  p99 {stats['p99']:.3f} ms"
+            )
+
+def print_comparison(comparisons):
+    for entry in comparisons:
+        flag = "REGRESSION" if entry["regression"] else "ok"
+        print(f"{entry['key']:<40} {entry['metric']:<26} {entry['baseline']:>12.3f} -> {entry['current']:>12.3f} ({entry['change']:+.1%})  {flag}")
+
+def positive_int(value):
+    """
+    Parse a command line argument that has to be a positive integer.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+def non_negative_int(value):
+    """
+    Parse a command line argument that has to be a non-negative integer.
+    """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a non-negative integer")
+    return number
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the blockchain with a selection of signature algorithms and hash functions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and write the results as JSON.")
+    run_parser.add_argument("--algorithms", nargs="+", default=DEFAULT_ALGORITHMS, help="Signature algorithms to benchmark, or 'all'.")
+    run_parser.add_argument("--hash-functions", nargs="+", default=DEFAULT_HASH_FUNCTIONS, help="Hash functions to benchmark, or 'all'. SHAKE functions take their digest length in bytes, e.g. shake_256_64.")
+    run_parser.add_argument("--repeat", type=positive_int, default=100, help="Number of timed repetitions per measurement.")
+    run_parser.add_argument("--warmup", type=non_negative_int, default=10, help="Number of discarded repetitions before the timed ones.")
+    run_parser.add_argument("--block-size", type=positive_int, default=2, help="Number of transactions per block.")
+    run_parser.add_argument("--difficulty", type=int, default=1, help="Mining difficulty level.")
+    run_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes, each pinned to its own CPU. 0 uses one per available CPU.")
+    run_parser.add_argument("--cpus", type=int, nargs="+", help="CPUs to pin the workers to. Defaults to the first available ones.")
+    run_parser.add_argument("--output", default="results.json", help="File the JSON results are written to.")
+    run_parser.add_argument("--figures", help="Directory to save bar charts of the results to.")
+    run_parser.add_argument("--baseline", help="JSON results of an earlier run to compare against.")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change flagged as a regression.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two JSON result files.")
+    compare_parser.add_argument("baseline", help="JSON results of the baseline run.")
+    compare_parser.add_argument("current", help="JSON results of the run to check.")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change flagged as a regression.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        try:
+            algorithms = resolve_algorithms(args.algorithms)
+            hash_functions = resolve_hash_functions(args.hash_functions)
+            workers = args.workers or len(args.cpus or available_cpus())
+            suite = BenchmarkSuite(algorithms, hash_functions, args.repeat, args.warmup, args.block_size, args.difficulty, workers=workers, cpus=args.cpus)
+        except ValueError as error:
+            parser.error(str(error))
+        report = suite.run()
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print_results(report)
+        if args.figures:
+            plot_results(report, args.figures)
+        if args.baseline is None:
+            return 0
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    else:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            report = json.load(file)
+
+    comparisons = compare(baseline, report, args.threshold)
+    print_comparison(comparisons)
+    return 1 if any(entry["regression"] for entry in comparisons) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import sys
+
+from blockchain import Blockchain, Node, Transaction
+import cryptography
+from .benchmark import DEFAULT_ALGORITHMS, machine_metadata, resolve_algorithms, resolve_hash_functions, summarize
+from .scaling import TransactionPool
+
+TOPOLOGIES = ['full', 'ring', 'random']
+TRANSPORTS = ['inprocess', 'tcp']
+
+# Upload bandwidth of every node in bytes per second (8 Mbit/s)
+DEFAULT_BANDWIDTH = 1_000_000
+
+# One-way latency of every node's messages in seconds
+DEFAULT_LATENCY = 0.05
+
+def build_topology(node_count, topology, degree, rng):
+    """
+    Choose the pairs of nodes to connect. 'full' connects every pair, 'ring' every node with its successor, and 'random'
+    adds random connections to a ring until every node has at least `degree` peers, so the network stays connected.
+
+    Returns:
+        List[Tuple[int, int]]: The connected pairs of node indices.
+    """
+    if topology == 'full':
+        return [(a, b) for a in range(node_count) for b in range(a + 1, node_count)]
+    edges = {tuple(sorted((i, (i + 1) % node_count))) for i in range(node_count) if node_count > 1}
+    if topology == 'random':
+        degree = min(degree, node_count - 1)
+        peers = {i: set() for i in range(node_count)}
+        for a, b in edges:
+            peers[a].add(b)
+            peers[b].add(a)
+        for a in range(node_count):
+            candidates = [b for b in range(node_count) if b != a and b not in peers[a]]
+            rng.shuffle(candidates)
+            while len(peers[a]) < degree and candidates:
+                b = candidates.pop()
+                peers[a].add(b)
+                peers[b].add(a)
+                edges.add(tuple(sorted((a, b))))
+    return sorted(edges)
+
+def propagation_delays(arrivals, origins, node_count):
+    """
+    Compute the delays until the other nodes accepted every item, and the share of the other nodes that accepted it.
+
+    Args:
+        arrivals (List[Dict[bytes, float]]): The time every node accepted every item.
+        origins (Dict[bytes, float]): The time every item entered the network.
+        node_count (int): The number of nodes.
+
+    Returns:
+        Tuple[List[float], List[float], float]: The delays (seconds) of all receptions, the delays until the last node
+            accepted an item that reached all nodes, and the share of receptions that happened.
+    """
+    delays, full_delays = [], []
+    receptions = 0
+    for digest, origin in origins.items():
+        # The first arrival is the item's origin
+        item_delays = sorted(node_arrivals[digest] - origin for node_arrivals in arrivals if digest in node_arrivals)[1:]
+        delays.extend(item_delays)
+        receptions += len(item_delays)
+        if len(item_delays) == node_count - 1 and item_delays:
+            full_delays.append(max(item_delays))
+    expected = len(origins) * (node_count - 1)
+    return delays, full_delays, receptions / expected if expected else 1.0
+
+def summarize_seconds(samples):
+    return summarize([sample * 1e9 for sample in samples]) if samples else None
+
+class NetworkSimulation:
+    def __init__(self, algorithms=DEFAULT_ALGORITHMS, hash_function='sha256', node_count=8, topology='random', degree=4, bandwidth=DEFAULT_BANDWIDTH, latency=DEFAULT_LATENCY, transport='inprocess', duration=30.0, block_interval=2.0, transaction_rate=50.0, block_size=1000, difficulty=1, settle_seconds=5.0, seed=0):
+        self.algorithms = algorithms
+        self.hash_function = hash_function
+        self.node_count = node_count
+        self.topology = topology # How the nodes are connected, see `build_topology`
+        self.degree = degree # Minimum number of peers per node of the random topology
+        self.bandwidth = bandwidth # Upload bandwidth of every node in bytes per second
+        self.latency = latency # One-way latency of every node's messages in seconds
+        self.transport = transport # 'inprocess' or 'tcp' over localhost
+        self.duration = duration # Seconds during which transactions are submitted and blocks are mined
+        self.block_interval = block_interval # Mean time between two blocks of the whole network in seconds
+        self.transaction_rate = transaction_rate # Submitted transactions per second
+        self.block_size = block_size
+        self.difficulty = difficulty
+        self.settle_seconds = settle_seconds # Seconds to wait for the propagation of the last messages
+        self.seed = seed
+
+    def run(self, log=print):
+        """
+        Simulate the network once per signature algorithm.
+
+        Returns:
+            dict: The run's metadata and the measured metrics, keyed by algorithm.
+        """
+        results = {}
+        for algorithm in self.algorithms:
+            log(f"Pre-signing transactions for {algorithm}...")
+            provider = cryptography.CryptoProvider(algorithm, self.hash_function)
+            pool = TransactionPool(provider, max(1, int(self.duration * self.transaction_rate)))
+            for transaction in pool.transactions:
+                # The senders' keys may not be revealed to the receiving node yet
+                transaction.public_key = pool.public_keys[transaction.sender]
+            payloads = [transaction.to_bytes() for transaction in pool.transactions]
+            log(f"Simulating {self.node_count} nodes with {algorithm}...")
+            results[algorithm] = asyncio.run(self.simulate(algorithm, payloads))
+        return {"metadata": self.metadata(), "results": results}
+
+    def metadata(self):
+        return {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            **machine_metadata(),
+            "hash_function": self.hash_function,
+            "node_count": self.node_count,
+            "topology": self.topology,
+            "degree": self.degree,
+            "bandwidth": self.bandwidth,
+            "latency": self.latency,
+            "transport": self.transport,
+            "duration": self.duration,
+            "block_interval": self.block_interval,
+            "transaction_rate": self.transaction_rate,
+            "block_size": self.block_size,
+            "difficulty": self.difficulty,
+            "seed": self.seed,
+        }
+
+    async def simulate(self, algorithm, payloads):
+        """
+        Start the nodes, submit the serialized transactions at the configured rate to random nodes while random nodes mine
+        blocks at exponentially distributed intervals, and measure the network once the last messages have propagated.
+        """
+        rng = random.Random(self.seed)
+        nodes = self.create_nodes(algorithm)
+        await self.connect_nodes(nodes, build_topology(self.node_count, self.topology, self.degree, rng))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        mined = []
+
+        async def submit_transactions():
+            for i, payload in enumerate(payloads):
+                await asyncio.sleep(max(0.0, start + i / self.transaction_rate - loop.time()))
+                node = rng.choice(nodes)
+                node.submit_transaction(Transaction.from_bytes(payload, node.blockchain.crypto_provider))
+
+        async def mine_blocks():
+            time = start
+            while True:
+                time += rng.expovariate(1 / self.block_interval)
+                if time > start + self.duration:
+                    break
+                await asyncio.sleep(max(0.0, time - loop.time()))
+                block = await rng.choice(nodes).mine()
+                if block is not None:
+                    mined.append(block.hash)
+
+        await asyncio.gather(submit_transactions(), mine_blocks())
+        elapsed = loop.time() - start
+        await asyncio.sleep(self.settle_seconds)
+        for node in nodes:
+            await node.idle()
+        result = self.measure(nodes, mined, elapsed)
+        for node in nodes:
+            await node.stop()
+        return result
+
+    def create_nodes(self, algorithm):
+        """
+        Create the nodes, each with its own crypto provider (and thus signature cache) and a shared genesis block.
+        """
+        nodes = []
+        genesis_block = None
+        for i in range(self.node_count):
+            blockchain = Blockchain(
+                self.block_size, self.difficulty, cryptography.CryptoProvider(algorithm, self.hash_function), genesis_block=genesis_block
+            )
+            genesis_block = blockchain.chain[0]
+            nodes.append(Node(f"node{i}", blockchain, self.bandwidth, self.latency))
+        return nodes
+
+    async def connect_nodes(self, nodes, edges):
+        if self.transport == 'tcp':
+            ports = [await node.listen() for node in nodes]
+            for a, b in edges:
+                await nodes[a].connect_tcp('127.0.0.1', ports[b])
+            # Wait until the accepting nodes know their peers as well
+            while any(len(node.peers) < sum(i in edge for edge in edges) for i, node in enumerate(nodes)):
+                await asyncio.sleep(0.01)
+        else:
+            for a, b in edges:
+                nodes[a].connect(nodes[b])
+
+    def measure(self, nodes, mined, elapsed):
+        """
+        Compute the propagation delays of blocks and transactions, the share of mined blocks that did not end up in the
+        chain of the first node (orphan rate) and the transactions per second confirmed by that chain. Nodes that saw
+        competing blocks of equal work keep the first one they received, so they may not agree on the tip (consensus) while
+        still agreeing on the most work (equal_work).
+        """
+        block_arrivals = [node.block_arrivals for node in nodes]
+        block_origins = {digest: min(arrivals[digest] for arrivals in block_arrivals if digest in arrivals) for digest in mined}
+        block_delays, block_full_delays, block_coverage = propagation_delays(block_arrivals, block_origins, len(nodes))
+
+        transaction_arrivals = [node.transaction_arrivals for node in nodes]
+        transaction_origins = {}
+        for arrivals in transaction_arrivals:
+            for digest, arrival in arrivals.items():
+                transaction_origins[digest] = min(arrival, transaction_origins.get(digest, arrival))
+        transaction_delays, transaction_full_delays, transaction_coverage = propagation_delays(transaction_arrivals, transaction_origins, len(nodes))
+
+        chain = nodes[0].blockchain.chain
+        main_chain = {block.hash for block in chain}
+        confirmed = sum(len(block.transactions) for block in chain[1:])
+        block_sizes = [len(block.to_bytes()) for block in chain[1:]]
+        return {
+            "mined_blocks": len(mined),
+            "chain_height": len(chain) - 1,
+            "orphan_rate": sum(digest not in main_chain for digest in mined) / len(mined) if mined else 0.0,
+            "consensus": len({node.blockchain.chain[-1].hash for node in nodes}) == 1,
+            "equal_work": len({node.blockchain.block_tree.tip.work for node in nodes}) == 1,
+            "submitted_transactions": len(transaction_origins),
+            "confirmed_transactions": confirmed,
+            "transactions_per_second": confirmed / elapsed,
+            "mean_block_bytes": sum(block_sizes) / len(block_sizes) if block_sizes else 0.0,
+            "sent_bytes": sum(node.sent_bytes for node in nodes),
+            "rejected_messages": sum(node.rejected_messages for node in nodes),
+            "block_propagation": summarize_seconds(block_delays),
+            "block_full_propagation": summarize_seconds(block_full_delays),
+            "block_coverage": block_coverage,
+            "transaction_propagation": summarize_seconds(transaction_delays),
+            "transaction_full_propagation": summarize_seconds(transaction_full_delays),
+            "transaction_coverage": transaction_coverage,
+        }
+
+def print_results(report):
+    for algorithm, result in report["results"].items():
+        print(f"\n{algorithm}")
+        for metric in ("block_propagation", "block_full_propagation", "transaction_propagation"):
+            stats = result[metric]
+            if stats is None:
+                print(f"  {metric:<28} no samples")
+            else:
+                print(f"  {metric:<28} median {stats['median']:.1f} ms  p95 {stats['p95']:.1f} ms")
+        print(f"  {'orphan_rate':<28} {result['orphan_rate']:.3f} ({result['mined_blocks']} mined blocks)")
+        print(f"  {'transactions_per_second':<28} {result['transactions_per_second']:.2f}")
+        print(f"  {'mean_block_bytes':<28} {result['mean_block_bytes']:.0f}")
+        print(f"  {'consensus':<28} {result['consensus']} (equal work: {result['equal_work']})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a gossip network of nodes and measure propagation delay, orphan rate and throughput.")
+    parser.add_argument("--algorithms", nargs="+", default=DEFAULT_ALGORITHMS, help="Signature algorithms to simulate, or 'all'.")
+    parser.add_argument("--hash-function", default="sha256", help="Hash function used by all nodes.")
+    parser.add_argument("--nodes", type=int, default=8, help="Number of nodes.")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="random", help="How the nodes are connected.")
+    parser.add_argument("--degree", type=int, default=4, help="Minimum number of peers per node of the random topology.")
+    parser.add_argument("--bandwidth", type=float, default=DEFAULT_BANDWIDTH, help="Upload bandwidth of every node in bytes per second (0 for no limit).")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="One-way latency of every node's messages in seconds.")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="inprocess", help="Connect the nodes in-process or over localhost TCP.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds during which transactions are submitted and blocks mined.")
+    parser.add_argument("--block-interval", type=float, default=2.0, help="Mean time between two blocks of the network in seconds.")
+    parser.add_argument("--tx-rate", type=float, default=50.0, help="Submitted transactions per second.")
+    parser.add_argument("--block-size", type=int, default=1000, help="Maximum number of transactions per block.")
+    parser.add_argument("--difficulty", type=int, default=1, help="Mining difficulty level.")
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds to wait for the last messages to propagate.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random topology, submissions and mining.")
+    parser.add_argument("--output", default="network.json", help="File the JSON results are written to.")
+    args = parser.parse_args(argv)
+
+    try:
+        algorithms = resolve_algorithms(args.algorithms)
+        hash_function, = resolve_hash_functions([args.hash_function])
+    except ValueError as error:
+        parser.error(str(error))
+    simulation = NetworkSimulation(
+        algorithms, hash_function, args.nodes, args.topology, args.degree, args.bandwidth or None, args.latency, args.transport,
+        args.duration, args.block_interval, args.tx_rate, args.block_size, args.difficulty, args.settle, args.seed,
+    )
+    report = simulation.run()
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print_results(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+from blockchain import Block, Blockchain, Transaction
+import cryptography
+from .benchmark import DEFAULT_ALGORITHMS, measure, resolve_algorithms, resolve_hash_functions, summarize
+
+# Number of transactions in the chain at which the chain operations are measured
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Number of pending transactions in the mempool at which mining is measured
+DEFAULT_BACKLOGS = [100, 1000, 10000]
+
+# Number of distinct senders of the synthetic transactions
+SENDER_COUNT = 16
+
+# Curves growing slower than this exponent are treated as constant and get no extrapolated limit
+MIN_GROWTH_EXPONENT = 0.1
+
+class TransactionPool:
+    """
+    Pre-signed transactions with distinct hashes, generated once per signature algorithm and reused for every chain grown
+    with it, so that growing a chain only costs hashing and mining. The keys are generated and the transactions signed
+    in bulk by worker processes. The transactions of every sender carry consecutive sequence numbers, so every prefix of
+    the pool can be mined into a fresh chain.
+    """
+
+    def __init__(self, crypto_provider, count, sender_count=SENDER_COUNT, workers=None):
+        self.crypto_provider = crypto_provider
+        self.public_keys = {}
+        keypairs = []
+        for public_key, secret_key in crypto_provider.generate_keypairs(sender_count, workers):
+            address = crypto_provider.address(public_key)
+            self.public_keys[address] = public_key
+            keypairs.append((address, secret_key))
+        recipient = keypairs[0][0]
+        self.transactions = []
+        private_keys = []
+        for i in range(count):
+            sender, secret_key = keypairs[i % sender_count]
+            self.transactions.append(Transaction(sender, recipient, i // sender_count + 1, crypto_provider, sequence=i // sender_count))
+            private_keys.append(secret_key)
+        Transaction.sign_transactions(self.transactions, private_keys, workers)
+        crypto_provider.close()
+
+    def reveal_keys(self, transactions, key_registry):
+        """
+        Attach the sender's public key to every transaction whose sender has not revealed it on the chain yet, and remove
+        it from all others, just like `Blockchain.mine_pending_transactions` does.
+        """
+        revealed = set()
+        for transaction in transactions:
+            if transaction.sender in key_registry or transaction.sender in revealed:
+                transaction.public_key = None
+            else:
+                transaction.public_key = self.public_keys[transaction.sender]
+                revealed.add(transaction.sender)
+
+def grow_chain(blockchain, transactions, pool):
+    """
+    Append blocks holding the given pre-signed transactions to the blockchain without passing them through the mempool,
+    i.e. without verifying their signatures. The blocks are mined at the blockchain's difficulty and added with
+    `Blockchain.add_mined_block`, which updates all state derived from the chain.
+    """
+    for start in range(0, len(transactions), blockchain.block_size):
+        block_transactions = transactions[start:start + blockchain.block_size]
+        pool.reveal_keys(block_transactions, blockchain.key_registry)
+        block = Block(len(blockchain.chain), blockchain.chain[-1].hash, block_transactions, blockchain.crypto_provider)
+        blockchain.miner.mine(block, blockchain.difficulty)
+        blockchain.add_mined_block(block)
+
+def fit_power_law(sizes, values):
+    """
+    Fit `value = c * size^k` by least squares on the log-log scale.
+
+    Returns:
+        Tuple[float, float]: The exponent k and the coefficient c, or None if fewer than two positive points are given.
+    """
+    points = [(size, value) for size, value in zip(sizes, values) if size > 0 and value > 0]
+    if len(points) < 2:
+        return None
+    exponent, intercept = np.polyfit(np.log([size for size, _ in points]), np.log([value for _, value in points]), 1)
+    return float(exponent), float(np.exp(intercept))
+
+def limit_size(fit, budget):
+    """
+    Extrapolate the size at which a fitted curve reaches the given budget.
+    """
+    if fit is None or fit[0] < MIN_GROWTH_EXPONENT:
+        return None
+    exponent, coefficient = fit
+    return float((budget / coefficient) ** (1 / exponent))
+
+class ScalingSuite:
+    def __init__(self, algorithms=DEFAULT_ALGORITHMS, hash_function='sha512', sizes=DEFAULT_SIZES, block_sizes=(100,), difficulties=(1,), backlogs=DEFAULT_BACKLOGS, repeat_count=20, warmup_count=2, validation_repeat_count=3, max_seconds=60.0, budget_seconds=1.0):
+        self.algorithms = algorithms
+        self.hash_function = hash_function
+        self.sizes = sorted(sizes) # Numbers of transactions in the chain
+        self.block_sizes = list(block_sizes) # Numbers of transactions per block
+        self.difficulties = list(difficulties) # Mining difficulty levels
+        self.backlogs = sorted(backlogs) # Numbers of pending transactions in the mempool
+        self.repeat_count = repeat_count # Number of timed repetitions of the cheap operations
+        self.warmup_count = warmup_count # Number of discarded repetitions before the timed ones
+        self.validation_repeat_count = validation_repeat_count # Number of timed repetitions of the full validation
+        self.max_seconds = max_seconds # The chain stops growing once an operation takes longer than this
+        self.budget_seconds = budget_seconds # Time per operation the extrapolated limits are computed for
+
+    def run(self, log=print):
+        """
+        Measure the time and memory curves for every combination of signature algorithm, block size and difficulty.
+
+        Returns:
+            dict: The run's parameters and the curves, keyed by '<algorithm>/b<block size>/d<difficulty>'.
+        """
+        results = {}
+        for algorithm in self.algorithms:
+            provider = cryptography.CryptoProvider(algorithm, self.hash_function)
+            log(f"Pre-signing transactions for {algorithm}...")
+            pool = TransactionPool(provider, max(self.sizes[-1], self.backlogs[-1] + (self.warmup_count + self.repeat_count) * max(self.block_sizes)))
+            for block_size in self.block_sizes:
+                for difficulty in self.difficulties:
+                    log(f"Scaling {algorithm} with block size {block_size} and difficulty {difficulty}...")
+                    curves = self.chain_curves(provider, pool, block_size, difficulty)
+                    curves["memory"] = self.memory_curve(provider, pool, block_size, difficulty, curves["sizes"])
+                    curves["mining_time"] = self.mining_curve(provider, pool, block_size, difficulty)
+                    results[f"{algorithm}/b{block_size}/d{difficulty}"] = {
+                        "algorithm": algorithm,
+                        "block_size": block_size,
+                        "difficulty": difficulty,
+                        "curves": curves,
+                        "fits": self.fits(curves),
+                    }
+        parameters = {
+            "hash_function": self.hash_function,
+            "sizes": self.sizes,
+            "backlogs": self.backlogs,
+            "repeat_count": self.repeat_count,
+            "warmup_count": self.warmup_count,
+            "validation_repeat_count": self.validation_repeat_count,
+            "budget_seconds": self.budget_seconds,
+        }
+        return {"parameters": parameters, "results": results}
+
+    def chain_curves(self, provider, pool, block_size, difficulty):
+        """
+        Grow a chain through the selected sizes and time `get_balance` and a full `is_valid` at every size. Stops growing
+        once an operation takes longer than `max_seconds`.
+        """
+        blockchain = Blockchain(block_size, difficulty, provider)
+        addresses = list(pool.public_keys)
+        curves = {"sizes": [], "get_balance_time": [], "validation_time": [], "serialized_size": []}
+        grown = 0
+        for size in self.sizes:
+            grow_chain(blockchain, pool.transactions[grown:size], pool)
+            grown = size
+
+            balance_samples = measure(lambda i: blockchain.get_balance(addresses[i % len(addresses)]), self.repeat_count, self.warmup_count, lambda i: i)
+
+            # Measure the full verification cost, not the signature cache, and leave the cache as it was configured
+            cache_enabled = provider.signature_cache.enabled
+            provider.signature_cache.enabled = False
+            try:
+                validation_samples = measure(lambda: blockchain.is_valid(full=True), self.validation_repeat_count, 0)
+            finally:
+                provider.signature_cache.enabled = cache_enabled
+
+            curves["sizes"].append(size)
+            curves["get_balance_time"].append(summarize(balance_samples))
+            curves["validation_time"].append(summarize(validation_samples))
+            curves["serialized_size"].append(sum(len(block.to_bytes()) for block in blockchain.chain))
+            if max(np.median(balance_samples), np.median(validation_samples)) / 1e9 > self.max_seconds:
+                break
+        return curves
+
+    def memory_curve(self, provider, pool, block_size, difficulty, sizes):
+        """
+        Grow a chain through the given sizes while tracing the allocations, and record the memory held at every size (chain,
+        ledger and key registry). Kept separate from the timed growth, as tracing slows down every allocation. The
+        transactions are copied from the pool while tracing, so that they are included.
+        """
+        memory = []
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            blockchain = Blockchain(block_size, difficulty, provider)
+            grown = 0
+            for size in sizes:
+                transactions = [Transaction.from_bytes(transaction.to_bytes(), provider) for transaction in pool.transactions[grown:size]]
+                grow_chain(blockchain, transactions, pool)
+                grown = size
+                memory.append(tracemalloc.get_traced_memory()[0] - baseline)
+        finally:
+            tracemalloc.stop()
+        return memory
+
+    def mining_curve(self, provider, pool, block_size, difficulty):
+        """
+        Time `mine_pending_transactions` with the mempool holding each of the selected backlog depths. The mined
+        transactions are replaced before every run, so the backlog stays at its depth.
+        """
+        curve = {"backlogs": [], "samples": []}
+        for backlog in self.backlogs:
+            blockchain = Blockchain(block_size, difficulty, provider)
+            backlog_transactions = iter(pool.transactions)
+
+            def refill(_):
+                while len(blockchain.mempool) < backlog:
+                    transaction = next(backlog_transactions)
+                    pool.reveal_keys([transaction], blockchain.key_registry)
+                    blockchain.add_transaction(transaction)
+                return blockchain
+
+            samples = measure(lambda blockchain: blockchain.mine_pending_transactions(), self.repeat_count, self.warmup_count, refill)
+            curve["backlogs"].append(backlog)
+            curve["samples"].append(summarize(samples))
+        return curve
+
+    def fits(self, curves):
+        """
+        Fit the complexity of every curve and extrapolate the size at which each operation exceeds the time budget.
+        """
+        sizes = curves["sizes"]
+        fits = {}
+        for operation in ("get_balance_time", "validation_time"):
+            fit = fit_power_law(sizes, [stats["median"] for stats in curves[operation]])
+            fits[operation] = {"fit": fit, "limit_size": limit_size(fit, self.budget_seconds * 1000)}
+        for curve in ("serialized_size", "memory"):
+            fits[curve] = {"fit": fit_power_law(sizes, curves[curve])}
+        mining = curves["mining_time"]
+        fit = fit_power_law(mining["backlogs"], [stats["median"] for stats in mining["samples"]])
+        fits["mining_time"] = {"fit": fit, "limit_size": limit_size(fit, self.budget_seconds * 1000)}
+        return fits
+
+def plot_results(report, directory):
+    """
+    Save a log-log plot per operation and configuration (block size and difficulty) into the given directory, with one
+    curve per signature algorithm and its fitted complexity as a dashed line.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(directory, exist_ok=True)
+    operations = {
+        "get_balance_time": ("Balance Lookup Time", "Time (ms)"),
+        "validation_time": ("Full Validation Time", "Time (ms)"),
+        "mining_time": ("Mining Time", "Time (ms)"),
+        "memory": ("Memory Usage", "Size (bytes)"),
+        "serialized_size": ("Serialized Blockchain Size", "Size (bytes)"),
+    }
+    configurations = {}
+    for result in report["results"].values():
+        configurations.setdefault((result["block_size"], result["difficulty"]), []).append(result)
+
+    for (block_size, difficulty), results in configurations.items():
+        for operation, (title, ylabel) in operations.items():
+            fig, ax = plt.subplots()
+            for result in results:
+                curves = result["curves"]
+                if operation == "mining_time":
+                    sizes = curves[operation]["backlogs"]
+                    values = [stats["median"] for stats in curves[operation]["samples"]]
+                else:
+                    sizes = curves["sizes"]
+                    values = [value["median"] if isinstance(value, dict) else value for value in curves[operation]]
+                fit = result["fits"][operation]["fit"]
+                label = result["algorithm"] + (f" (k={fit[0]:.2f})" if fit else "")
+                line, = ax.loglog(sizes, values, marker="o", label=label)
+                if fit:
+                    ax.loglog(sizes, [fit[1] * size ** fit[0] for size in sizes], linestyle="--", color=line.get_color())
+            ax.set_title(f"{title} (block size {block_size}, difficulty {difficulty})")
+            ax.set_xlabel("Pending transactions" if operation == "mining_time" else "Transactions in the chain")
+            ax.set_ylabel(ylabel)
+            ax.grid(which="both")
+            ax.legend(fontsize="small")
+            fig.tight_layout()
+            fig.savefig(os.path.join(directory, f"scaling_{operation}_b{block_size}_d{difficulty}.png"))
+            plt.close(fig)
+
+def print_results(report):
+    budget = report["parameters"]["budget_seconds"]
+    for key, result in report["results"].items():
+        print(f"\n{key}")
+        for operation, fit in result["fits"].items():
+            if fit["fit"] is None:
+                print(f"  {operation:<20} not enough points to fit")
+                continue
+            line = f"  {operation:<20} O(n^{fit['fit'][0]:.2f})"
+            if fit.get("limit_size") is not None:
+                line += f"  exceeds {budget:g} s at n = {fit['limit_size']:.3g}"
+            print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how the blockchain's operations scale with chain length, block size and backlog depth.")
+    parser.add_argument("--algorithms", nargs="+", default=DEFAULT_ALGORITHMS, help="Signature algorithms to measure, or 'all'.")
+    parser.add_argument("--hash-function", default="sha512", help="Hash function used for all measurements.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Numbers of transactions in the chain to measure at.")
+    parser.add_argument("--block-sizes", nargs="+", type=int, default=[100], help="Numbers of transactions per block.")
+    parser.add_argument("--difficulties", nargs="+", type=int, default=[1], help="Mining difficulty levels.")
+    parser.add_argument("--backlogs", nargs="+", type=int, default=DEFAULT_BACKLOGS, help="Numbers of pending transactions to measure mining with.")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timed repetitions of balance lookups and mining.")
+    parser.add_argument("--warmup", type=int, default=2, help="Number of discarded repetitions before the timed ones.")
+    parser.add_argument("--validation-repeat", type=int, default=3, help="Number of timed repetitions of the full validation.")
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="Stop growing a chain once an operation takes longer than this.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Time per operation (seconds) to extrapolate the size limits for.")
+    parser.add_argument("--output", default="scaling.json", help="File the JSON results are written to.")
+    parser.add_argument("--figures", help="Directory to save the log-log plots to.")
+    args = parser.parse_args(argv)
+
+    try:
+        algorithms = resolve_algorithms(args.algorithms)
+        hash_function, = resolve_hash_functions([args.hash_function])
+    except ValueError as error:
+        parser.error(str(error))
+    suite = ScalingSuite(
+        algorithms, hash_function, args.sizes, args.block_sizes, args.difficulties, args.backlogs,
+        args.repeat, args.warmup, args.validation_repeat, args.max_seconds, args.budget,
+    )
+    report = suite.run()
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print_results(report)
+    if args.figures:
+        plot_results(report, args.figures)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
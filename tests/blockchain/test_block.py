@@ -1,22 +1,22 @@
 import pytest
-import base64
 import cryptography
 import time
-from blockchain import Transaction, Block
+import struct
+from blockchain import Transaction, Block, ColumnarTransactions
 
 @pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
 def init(request):
     signature_algorithm = request.param
     crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
     public_key1, secret_key1 = crypto_provider.generate_keypair()
-    address1 = base64.b64encode(public_key1).decode("utf-8")
+    address1 = crypto_provider.address(public_key1)
     public_key2, secret_key2 = crypto_provider.generate_keypair()
-    address2 = base64.b64encode(public_key2).decode("utf-8")
+    address2 = crypto_provider.address(public_key2)
     amount1 = 30
     amount2 = 20
-    transaction1 = Transaction(address1, address2, amount1, crypto_provider)
+    transaction1 = Transaction(address1, address2, amount1, crypto_provider, public_key=public_key1)
     transaction1.sign_transaction(secret_key1)
-    transaction2 = Transaction(address2, address1, amount2, crypto_provider)
+    transaction2 = Transaction(address2, address1, amount2, crypto_provider, public_key=public_key2)
     transaction2.sign_transaction(secret_key2)
     timestamp = time.time()
     block = Block(0, "0", [transaction1, transaction2], crypto_provider, timestamp)
@@ -39,10 +39,38 @@ def test_compute_hash(init):
     block, _, _, crypto_provider, timestamp = init
 
     # Check correctness of hash calculation
-    block_bytes = f'{block.index}{block.previous_hash}{block.transactions}{block.timestamp}{block.nonce}'.encode()
+    block_bytes = block.hash_prefix() + struct.pack('>Q', block.nonce)
     block_hash = block.compute_hash()
     assert block_hash == crypto_provider.hash(block_bytes), "Compute hash should return the correct hash of the block"
 
+    # Check that the hash does not depend on the identity of the transaction objects
+    transactions = [Transaction.from_bytes(transaction.to_bytes(), crypto_provider) for transaction in block.transactions]
+    copied_block = Block(block.index, block.previous_hash, transactions, crypto_provider, timestamp)
+    assert copied_block.compute_hash() == block_hash, "Hash should only depend on the block's contents"
+
+def test_to_and_from_bytes(init):
+    block, _, _, crypto_provider, _ = init
+
+    block.hash = block.compute_hash()
+    block_bytes = block.to_bytes()
+    assert isinstance(block_bytes, bytes), "Serialized block should be bytes"
+
+    # Check that a deserialized block keeps its contents and can be re-verified
+    restored_block = Block.from_bytes(memoryview(block_bytes), crypto_provider)
+    assert restored_block.index == block.index, "Index should be restored"
+    assert restored_block.timestamp == block.timestamp, "Timestamp should be restored"
+    assert restored_block.nonce == block.nonce, "Nonce should be restored"
+    assert restored_block.hash == block.hash, "Hash should be restored"
+    assert len(restored_block.transactions) == len(block.transactions), "All transactions should be restored"
+    assert restored_block.to_bytes() == block_bytes, "Serialization should be canonical"
+    assert restored_block.is_valid(), "Restored block should be valid"
+
+    # Check that malformed data is rejected
+    with pytest.raises(ValueError):
+        Block.from_bytes(block_bytes + b'\x00', crypto_provider)
+    with pytest.raises(ValueError):
+        Block.from_bytes(b'\xff' + block_bytes[1:], crypto_provider)
+
 def test_is_valid(init):
     block, _, _, crypto_provider, _ = init
 
@@ -53,4 +81,67 @@ def test_is_valid(init):
 
     # Modify the amount of the first transaction to make the signature invalid
     block.transactions[0].amount = 0
-    assert not block.is_valid(), "Block should not be valid after modifying the signature of one of the blocks transactions"
\ No newline at end of file
+    assert not block.is_valid(), "Block should not be valid after modifying the signature of one of the blocks transactions"
+
+def test_inclusion_proof(init):
+    block, transaction1, transaction2, _, _ = init
+
+    # Check that the hash only commits to the transactions through the Merkle root
+    assert block.merkle_root == block.compute_merkle_root(), "Merkle root should be computed on creation"
+    assert block.merkle_root in block.hash_prefix(), "Header should contain the Merkle root"
+
+    # Check inclusion proofs of both transactions
+    for position, transaction in enumerate([transaction1, transaction2]):
+        proof = block.inclusion_proof(position)
+        assert block.verify_inclusion(transaction.compute_hash(), proof), "Inclusion proof should verify"
+    assert not block.verify_inclusion(transaction1.compute_hash(), block.inclusion_proof(1)), "Proof of another transaction should not verify"
+
+    # Modifying a transaction should break the commitment
+    block.hash = block.compute_hash()
+    block.transactions[1].amount += 1
+    assert block.merkle_root != block.compute_merkle_root(), "Merkle root should change when a transaction is modified"
+    assert not block.is_valid(), "Block should not be valid after modifying a transaction"
+
+def test_compact(init):
+    block, transaction1, transaction2, _, _ = init
+
+    block.hash = block.compute_hash()
+    block_bytes = block.to_bytes()
+    block.compact()
+    assert isinstance(block.transactions, ColumnarTransactions), "Transactions should be packed into columns"
+    assert len(block.transactions) == 2, "Compacted block should contain all transactions"
+    assert block.transactions[-1].amount == transaction2.amount, "Transactions should be restored from the columns"
+    assert block.transactions[0].signature == transaction1.signature, "Signatures should be restored from the columns"
+    assert block.transactions[0].public_key == transaction1.public_key, "Public keys should be restored from the columns"
+    assert block.to_bytes() == block_bytes, "Compacting should not change the serialized block"
+    assert block.is_valid(), "Compacted block should be valid"
+    assert block.transactions[0] is not block.transactions[0], "Every access should create a new transaction"
+    with pytest.raises(AttributeError):
+        block.transactions.note = "Columnar transactions should not have a __dict__"
+    with pytest.raises(AttributeError):
+        block.note = "Blocks should not have a __dict__"
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_prune(init, columnar):
+    block, transaction1, _, crypto_provider, _ = init
+
+    block.hash = block.compute_hash()
+    transaction_hash = transaction1.compute_hash()
+    if columnar:
+        block.compact()
+    block.prune()
+    assert block.pruned, "Block should be flagged as pruned"
+    assert all(transaction.pruned and transaction.signature is None for transaction in block.transactions), "Signatures should be dropped"
+    assert block.transactions[0].public_key == transaction1.public_key, "Public keys should be kept by default"
+    assert block.transactions[0].compute_hash() == transaction_hash, "Transaction hash should not change by pruning"
+    assert block.has_valid_hashes(), "Hash commitments of a pruned block should still verify"
+    assert not block.is_valid(), "Pruned block should not be valid on its own, as its signatures cannot be verified"
+
+    restored_block = Block.from_bytes(block.to_bytes(), crypto_provider)
+    assert restored_block.pruned, "Pruned flag should be serialized"
+    assert restored_block.transactions[0].signature_hash == block.transactions[0].signature_hash, "Signature hashes should be serialized"
+    assert restored_block.has_valid_hashes(), "Hash commitments of a restored pruned block should verify"
+
+    block.prune(public_keys=True)
+    assert all(transaction.public_key is None for transaction in block.transactions), "Public keys should be dropped if requested"
+    assert block.has_valid_hashes(), "Public keys should not be part of the hash commitments"
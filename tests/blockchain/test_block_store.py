@@ -0,0 +1,221 @@
+import pytest
+import os
+import cryptography
+from blockchain import Blockchain, Transaction, BlockStore
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request, tmp_path):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    public_key2, _ = crypto_provider.generate_keypair()
+    address2 = crypto_provider.address(public_key2)
+
+    # Mine three blocks into a disk-backed blockchain
+    block_store = BlockStore(str(tmp_path), crypto_provider, cache_size=2)
+    blockchain = Blockchain(1, 1, crypto_provider, block_store=block_store)
+    for sequence, amount in enumerate([30, 10, 15]):
+        transaction = Transaction(address1, address2, amount, crypto_provider, public_key=public_key1, sequence=sequence)
+        transaction.sign_transaction(secret_key1)
+        blockchain.add_transaction(transaction)
+        blockchain.mine_pending_transactions()
+
+    return blockchain, block_store, crypto_provider, str(tmp_path), address1, address2
+
+def test_append_and_load(init):
+    blockchain, block_store, _, _, _, _ = init
+
+    assert len(block_store) == 4, "Store should contain the genesis block and three mined blocks"
+    assert block_store[-1] is blockchain.chain[3], "Recently appended blocks should be cached"
+    assert [block.index for block in block_store] == [0, 1, 2, 3], "Blocks should be stored in order"
+    assert [block.index for block in block_store[1:3]] == [1, 2], "Slices should return lists of blocks"
+    assert block_store[1].hash == blockchain.chain[1].hash, "Loaded block should have the stored hash"
+    with pytest.raises(IndexError):
+        block_store[4]
+
+def test_reopen(init):
+    blockchain, block_store, crypto_provider, path, address1, address2 = init
+    tip_hash = blockchain.chain[-1].hash
+    block_store.close()
+
+    # The reopened blockchain continues from the stored tip instead of a new genesis block
+    reopened_store = BlockStore(path, crypto_provider)
+    reopened_blockchain = Blockchain(1, 1, crypto_provider, block_store=reopened_store)
+    assert len(reopened_blockchain.chain) == 4, "Reopened blockchain should contain all stored blocks"
+    assert reopened_blockchain.chain[-1].hash == tip_hash, "Reopened blockchain should have the stored tip"
+    assert reopened_blockchain.validated_height == 0, "Reopened blocks should be validated again"
+    assert reopened_blockchain.is_valid(), "Reopened blockchain should be valid"
+    assert reopened_blockchain.get_balance(address1) == -55, "Ledger should be rebuilt from the stored blocks"
+    assert reopened_blockchain.get_balance(address2) == 55, "Ledger should be rebuilt from the stored blocks"
+    reopened_store.close()
+
+def test_interrupted_write(init):
+    _, block_store, crypto_provider, path, _, _ = init
+    block_store.close()
+
+    # An index record without the corresponding data in the segment file is ignored
+    with open(os.path.join(path, 'blocks.dat'), 'r+b') as segment:
+        segment.truncate(os.path.getsize(os.path.join(path, 'blocks.dat')) - 1)
+    reopened_store = BlockStore(path, crypto_provider)
+    assert len(reopened_store) == 3, "Incompletely written block should be ignored"
+    assert reopened_store[-1].index == 2, "Tip should be the last completely written block"
+    reopened_store.close()
+
+def test_replace_and_compact(init):
+    blockchain, block_store, crypto_provider, path, _, _ = init
+    hashes = [block.hash for block in block_store]
+    segment_size = os.path.getsize(os.path.join(path, 'blocks.dat'))
+
+    block = block_store[1]
+    block.prune()
+    block_store.replace(1, block)
+    assert block_store.wasted_bytes > 0, "Replaced version should count as wasted space"
+    block_store.close()
+
+    reopened_store = BlockStore(path, crypto_provider)
+    assert reopened_store[1].pruned, "Replaced block should be loaded"
+    assert reopened_store.wasted_bytes == block_store.wasted_bytes, "Wasted space should be restored on opening"
+    reopened_store.compact()
+    assert reopened_store.wasted_bytes == 0, "Compacting should reclaim the wasted space"
+    assert os.path.getsize(os.path.join(path, 'blocks.dat')) == reopened_store.live_bytes, "Segment file should only hold the current versions"
+    assert reopened_store.live_bytes <= segment_size, "Segment file should not grow by pruning"
+    assert [block.hash for block in reopened_store] == hashes, "Compacted store should contain all blocks in order"
+    reopened_store.close()
+
+def test_interrupted_compaction(init):
+    _, block_store, crypto_provider, path, _, _ = init
+    block = block_store[2]
+    block.prune()
+    block_store.replace(2, block)
+    block_store.close()
+
+    # Compacted files left behind before the segment file was replaced are discarded
+    for name in ('blocks.dat', 'blocks.idx'):
+        with open(os.path.join(path, name), 'rb') as source, open(os.path.join(path, name + '.compact'), 'wb') as target:
+            target.write(source.read()[:-1])
+    reopened_store = BlockStore(path, crypto_provider)
+    assert not os.path.exists(os.path.join(path, 'blocks.idx.compact')), "Incomplete compaction should be discarded"
+    assert len(reopened_store) == 4 and reopened_store[2].pruned, "Store should be unchanged by a discarded compaction"
+    reopened_store.close()
+
+def test_truncate(init):
+    blockchain, block_store, crypto_provider, path, _, _ = init
+    hashes = [block.hash for block in block_store]
+    block_store.truncate(2)
+    assert len(block_store) == 2, "Blocks from the given height on should be dropped"
+    with pytest.raises(IndexError):
+        block_store[2]
+    assert block_store.wasted_bytes == 0, "Dropped blocks should not count as wasted space"
+    assert os.path.getsize(os.path.join(path, 'blocks.dat')) == block_store.live_bytes, "Segment file should be truncated"
+
+    block_store.append(blockchain.chain[1])
+    block_store.close()
+    reopened_store = BlockStore(path, crypto_provider)
+    assert [block.hash for block in reopened_store] == hashes[:2] + hashes[1:2], "Blocks appended after truncating should be stored"
+    reopened_store.close()
+
+def test_truncate_after_replace(init):
+    _, block_store, crypto_provider, path, _, _ = init
+    block = block_store[1]
+    block.prune()
+    block_store.replace(1, block)
+
+    # Only the records of the dropped blocks are read, and the replaced version written after them is kept
+    read_heights = []
+    record = block_store._record
+    block_store._record = lambda height: read_heights.append(height) or record(height)
+    block_store.truncate(2)
+    assert sorted(read_heights) == [2, 3], "Only the dropped records should be read"
+    block_store._cache.clear()
+    assert block_store[1].pruned and block_store[1].hash == block.hash, "Replaced version of a kept block should be kept"
+    assert os.path.getsize(os.path.join(path, 'blocks.dat')) == block_store.live_bytes + block_store.wasted_bytes, "Segment file should end after the kept versions"
+    block_store.close()
+
+    reopened_store = BlockStore(path, crypto_provider)
+    assert len(reopened_store) == 2 and reopened_store[1].pruned, "Truncated store should be reopened"
+    reopened_store.close()
+
+def test_reopen_from_meta_and_snapshot(init):
+    blockchain, block_store, crypto_provider, path, address1, address2 = init
+    blockchain.save_state()
+    block_hash = blockchain.chain[1].hash
+    transaction_hash = blockchain.chain[2].transactions[0].compute_hash()
+    live_bytes, wasted_bytes = block_store.live_bytes, block_store.wasted_bytes
+    block_store.close()
+
+    # Reopening reads the sizes from the meta file and the state from the snapshot instead of the stored blocks
+    reopened_store = BlockStore(path, crypto_provider)
+    loaded = []
+    load = reopened_store._load
+    reopened_store._load = lambda height: loaded.append(height) or load(height)
+    assert (reopened_store.live_bytes, reopened_store.wasted_bytes) == (live_bytes, wasted_bytes), "Sizes should be restored from the meta file"
+    reopened_blockchain = Blockchain(1, 1, crypto_provider, block_store=reopened_store)
+    assert reopened_blockchain.get_balance(address2) == 55, "Ledger should be restored from the snapshot"
+    assert set(loaded) == {3}, "Only the tip should be loaded to check the snapshot"
+    assert reopened_blockchain.get_block(block_hash).hash == block_hash, "Block tree should be restored from the snapshot"
+    assert reopened_blockchain.find_transaction(transaction_hash) == (2, 0), "Transaction index should be restored from the snapshot"
+    assert reopened_blockchain.is_valid() and reopened_blockchain.is_ledger_consistent(), "Restored state should match the chain"
+
+    # Blocks appended after the snapshot are applied on top of it, and a snapshot of dropped blocks is ignored
+    reopened_store.truncate(3)
+    reopened_store.close()
+    reopened_store = BlockStore(path, crypto_provider)
+    reopened_blockchain = Blockchain(1, 1, crypto_provider, block_store=reopened_store)
+    assert reopened_blockchain.get_balance(address2) == 40, "Ledger should be rebuilt if the snapshot is ahead of the chain"
+    assert reopened_blockchain.is_ledger_consistent(), "Rebuilt ledger should match the chain"
+    reopened_store.close()
+
+def test_reject_foreign_snapshot(init):
+    blockchain, block_store, crypto_provider, path, _, address2 = init
+    blockchain.save_state()
+    tip_hash = block_store[3].hash
+    block_store.close()
+    with open(os.path.join(path, 'state.dat'), 'rb') as state:
+        data = state.read()
+
+    # Snapshots of another format version, malformed ones and ones of other blocks are ignored and the state is rebuilt
+    for snapshot in (b'\xff' + data[1:], data[:-1], b'\x80\x04garbage', data.replace(tip_hash, b'\x00' * len(tip_hash))):
+        with open(os.path.join(path, 'state.dat'), 'wb') as state:
+            state.write(snapshot)
+        reopened_store = BlockStore(path, crypto_provider)
+        loaded = []
+        load = reopened_store._load
+        reopened_store._load = lambda height: loaded.append(height) or load(height)
+        reopened_blockchain = Blockchain(1, 1, crypto_provider, block_store=reopened_store)
+        assert reopened_blockchain.get_balance(address2) == 55, "Ledger should be rebuilt from the blocks"
+        assert set(loaded) == {0, 1, 2, 3}, "All blocks should be applied instead of the snapshot"
+        reopened_store.close()
+
+def test_reopen_after_interrupted_meta_write(init):
+    _, block_store, crypto_provider, path, _, _ = init
+    block = block_store[1]
+    block.prune()
+    block_store.replace(1, block)
+    live_bytes, wasted_bytes = block_store.live_bytes, block_store.wasted_bytes
+    block_store.close()
+
+    # A meta file that does not match the segment file is recomputed from the index
+    with open(os.path.join(path, 'blocks.meta'), 'wb') as meta:
+        meta.write(b'\x00' * 24)
+    reopened_store = BlockStore(path, crypto_provider)
+    assert (reopened_store.live_bytes, reopened_store.wasted_bytes) == (live_bytes, wasted_bytes), "Sizes should be recomputed from the index"
+    reopened_store.close()
+
+def test_reopen_pruned(init):
+    blockchain, block_store, crypto_provider, path, _, _ = init
+    blockchain.prune_depth = 1
+    blockchain.prune()
+    assert block_store.pruned_height == 2, "Pruned height should be kept in the store"
+    block_store.close()
+
+    # Blocks pruned before reopening are still trusted, later pruned-looking blocks are not
+    reopened_store = BlockStore(path, crypto_provider)
+    reopened_blockchain = Blockchain(1, 1, crypto_provider, block_store=reopened_store)
+    assert reopened_store.pruned_height == 2, "Pruned height should be restored"
+    assert reopened_blockchain.is_valid(full=True), "Blocks pruned by the blockchain itself should be valid after reopening"
+    block = reopened_store[3]
+    block.prune()
+    reopened_store.replace(3, block)
+    assert not reopened_blockchain.is_valid(full=True), "Block pruned behind the blockchain's back should be invalid"
+    reopened_store.close()
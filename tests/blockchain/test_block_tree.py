@@ -0,0 +1,72 @@
+import pytest
+import cryptography
+from blockchain import Block, BlockTree, block_work
+
+def make_block(parent, crypto_provider, timestamp):
+    block = Block(parent.index + 1, parent.hash, [], crypto_provider, timestamp)
+    block.hash = block.compute_hash()
+    return block
+
+def test_fork_choice():
+    crypto_provider = cryptography.CryptoProvider('ECDSA-SHA256', 'sha256')
+    genesis = Block(0, "0", [], crypto_provider, 0)
+    genesis.hash = genesis.compute_hash()
+    tree = BlockTree()
+    tree.add(genesis, block_work(1), keep_block=False)
+
+    # Two branches forking after block a1
+    a1 = make_block(genesis, crypto_provider, 1)
+    a2 = make_block(a1, crypto_provider, 2)
+    b2 = make_block(a1, crypto_provider, 3)
+    b3 = make_block(b2, crypto_provider, 4)
+    for block in (a1, a2, b2):
+        tree.add(block, block_work(1))
+    assert tree.tip.hash == a2.hash, "First seen block should stay the tip among equal work"
+    assert tree.get(b2.hash).work == 3 * block_work(1), "Cumulative work should be kept per block"
+    assert tree.get(a2.hash).block is a2, "Block should be kept in its node"
+    tree.add(b3, block_work(1))
+    assert tree.tip.hash == b3.hash, "Branch with the most work should become the tip"
+
+    assert tree.fork_point(a2.hash, b3.hash).hash == a1.hash, "Fork point should be the common ancestor"
+    assert tree.fork_point(a1.hash, b3.hash).hash == a1.hash, "Ancestor should be its own fork point"
+    assert [node.hash for node in tree.branch(a1.hash, b3.hash)] == [b2.hash, b3.hash], "Branch should be in increasing height"
+
+    with pytest.raises(ValueError):
+        tree.add(b3, block_work(1))
+    with pytest.raises(ValueError):
+        tree.add(make_block(make_block(b3, crypto_provider, 5), crypto_provider, 6), block_work(1))
+
+    tree.remove(b2.hash)
+    assert b2.hash not in tree and b3.hash not in tree, "Removing a block should remove its descendants"
+    assert tree.tip.hash == a2.hash and len(tree) == 3, "Tip should be chosen again after removing blocks"
+
+    # Removing a branch that does not hold the tip keeps the tip
+    c2 = make_block(a1, crypto_provider, 7)
+    tree.add(c2, block_work(1))
+    tree.remove(c2.hash)
+    assert tree.tip.hash == a2.hash and c2.hash not in tree, "Tip should be kept when another branch is removed"
+
+    # A parent without other children becomes a branch end again
+    tree.remove(a2.hash)
+    assert tree.tip.hash == a1.hash, "Parent of the removed tip should become the tip"
+    tree.add(a2, block_work(1))
+    assert tree.tip.hash == a2.hash, "Re-added block should extend its parent"
+
+def test_to_and_from_bytes():
+    crypto_provider = cryptography.CryptoProvider('ECDSA-SHA256', 'sha256')
+    genesis = Block(0, "0", [], crypto_provider, 0)
+    genesis.hash = genesis.compute_hash()
+    tree = BlockTree()
+    tree.add(genesis, block_work(16), keep_block=False)
+    a1 = make_block(genesis, crypto_provider, 1)
+    tree.add(a1, block_work(16), keep_block=False)
+    tree.add(make_block(genesis, crypto_provider, 2), block_work(16))
+
+    # Only the active chain is serialized, with work beyond 64 bits
+    restored = BlockTree.from_bytes(tree.to_bytes())
+    assert len(restored) == 2 and restored.tip.hash == a1.hash, "Active chain should be restored"
+    assert restored.get(a1.hash).work == 2 * block_work(16), "Cumulative work should be restored"
+    restored.add(make_block(a1, crypto_provider, 3), block_work(16))
+    assert restored.tip.height == 2, "Restored tree should be extended"
+    with pytest.raises(ValueError):
+        BlockTree.from_bytes(tree.to_bytes()[:-1])
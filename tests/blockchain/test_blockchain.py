@@ -1,24 +1,23 @@
 import pytest
-import base64
 import cryptography
 import time
-from blockchain import Blockchain, Transaction, Block
+from blockchain import Blockchain, Transaction, Block, BatchVerifier, BlockStore, ColumnarTransactions, block_work
 
 @pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
 def init(request):
     signature_algorithm = request.param
     crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
     public_key1, secret_key1 = crypto_provider.generate_keypair()
-    address1 = base64.b64encode(public_key1).decode("utf-8")
+    address1 = crypto_provider.address(public_key1)
     public_key2, secret_key2 = crypto_provider.generate_keypair()
-    address2 = base64.b64encode(public_key2).decode("utf-8")
+    address2 = crypto_provider.address(public_key2)
     
     # Create transactions
-    transaction1 = Transaction(address1, address2, 30, crypto_provider)
+    transaction1 = Transaction(address1, address2, 30, crypto_provider, public_key=public_key1)
     transaction1.sign_transaction(secret_key1)
-    transaction2 = Transaction(address2, address1, 10, crypto_provider)
+    transaction2 = Transaction(address2, address1, 10, crypto_provider, public_key=public_key2)
     transaction2.sign_transaction(secret_key2)
-    transaction3 = Transaction(address2, address1, 15, crypto_provider)
+    transaction3 = Transaction(address2, address1, 15, crypto_provider, public_key=public_key2, sequence=1)
     transaction3.sign_transaction(secret_key2)
     
     #Create blockchain and add transactions
@@ -55,4 +54,275 @@ def test_is_valid(init):
     assert blockchain.is_valid() == True, "Blockchain should be valid even after mining the first block"
 
     blockchain.chain[1].transactions[0].amount = 100
-    assert blockchain.is_valid() == False, "Blockchain should be invalid after modifying a transaction"
\ No newline at end of file
+    assert blockchain.is_valid(full=True) == False, "Blockchain should be invalid after modifying a transaction"
+
+def test_incremental_is_valid(init):
+    blockchain, _, _ = init
+
+    blockchain.mine_pending_transactions()
+    assert blockchain.validated_height == 0, "Mined blocks should not count as validated"
+    assert blockchain.is_valid(), "Blockchain should be valid"
+    assert blockchain.validated_height == 1, "Validated height should advance to the tip"
+
+    # Blocks below the validated height are not checked again unless a full check is requested
+    blockchain.chain[1].transactions[0].amount = 100
+    assert blockchain.is_valid(), "Incremental check should skip already validated blocks"
+    assert not blockchain.is_valid(full=True), "Full check should detect the modified transaction"
+    assert blockchain.validated_height == 0, "Failed full check should reset the validated height"
+
+    # New blocks above the validated height are checked
+    blockchain.chain[1].transactions[0].amount = 30
+    assert blockchain.is_valid(), "Blockchain should be valid again"
+    blockchain.mine_pending_transactions()
+    assert blockchain.chain[2].previous_hash == blockchain.chain[1].hash, "New block should link to the stored hash of the tip"
+    blockchain.chain[2].transactions[0].amount = 100
+    assert not blockchain.is_valid(), "Incremental check should detect a modified new block"
+    assert blockchain.validated_height == 1, "Failed incremental check should keep the validated height"
+
+def test_is_valid_with_parallel_verifier(init):
+    blockchain, _, _ = init
+    blockchain.verifier = BatchVerifier(2)
+
+    blockchain.mine_pending_transactions()
+    blockchain.mine_pending_transactions()
+    assert blockchain.is_valid(), "Blockchain should be valid when verified in parallel"
+
+    blockchain.chain[2].transactions[0].amount = 100
+    assert not blockchain.is_valid(full=True), "Blockchain should be invalid after modifying a transaction"
+    blockchain.verifier.close()
+
+def test_add_transaction(init):
+    blockchain, _, _ = init
+
+    transaction = blockchain.pending_transactions[0]
+    assert len(blockchain.pending_transactions) == 3, "All valid transactions should be pending"
+    assert not blockchain.add_transaction(transaction), "Duplicate transaction should be rejected"
+
+    blockchain.mine_pending_transactions()
+    assert len(blockchain.pending_transactions) == 1, "Mined transactions should leave the mempool"
+    assert blockchain.chain[1].transactions[0] is transaction, "Transactions should be mined in admission order"
+
+def test_columnar_blocks(init):
+    blockchain, address1, address2 = init
+    blockchain.columnar_blocks = True
+
+    blockchain.mine_pending_transactions()
+    blockchain.mine_pending_transactions()
+    assert all(isinstance(block.transactions, ColumnarTransactions) for block in blockchain.chain[1:]), "Mined blocks should be compacted"
+    assert blockchain.is_valid(), "Blockchain with compacted blocks should be valid"
+    assert blockchain.is_ledger_consistent(), "Ledger should match the compacted blocks"
+    assert blockchain.get_balance(address1) == -5, "Balance of address1 should be -5"
+
+def test_proof_of_work(init):
+    blockchain, _, _ = init
+    blockchain.mine_pending_transactions()
+    block = blockchain.chain[1]
+    assert block.meets_difficulty(blockchain.difficulty), "Mined block should meet the difficulty"
+
+    # A consistent block hash without the proof-of-work is rejected
+    block.nonce += 1
+    while block.compute_hash().startswith(b'\x00'):
+        block.nonce += 1
+    block.hash = block.compute_hash()
+    assert block.has_valid_hashes(), "Block hash should match its header"
+    assert not blockchain.is_valid(full=True), "Blockchain with a block below the difficulty should be invalid"
+
+def test_assume_valid(init):
+    blockchain, address1, address2 = init
+    crypto_provider = blockchain.crypto_provider
+    crypto_provider.signature_cache.enabled = False
+
+    # Append a block with a forged signature, bypassing the mempool, followed by a regular block
+    forged = Transaction(address1, address2, 1000, crypto_provider, sequence=1)
+    forged.sign_transaction(crypto_provider.generate_keypair()[1])
+    blockchain.mine_pending_transactions()
+    block = Block(len(blockchain.chain), blockchain.chain[-1].hash, [forged], crypto_provider)
+    blockchain.miner.mine(block, blockchain.difficulty)
+    blockchain.ledger.apply_block(block)
+    blockchain.block_tree.add(block, block_work(blockchain.difficulty), keep_block=False)
+    blockchain.chain.append(block)
+    blockchain.mine_pending_transactions()
+    assert not blockchain.is_valid(), "Blockchain with a forged signature should be invalid"
+
+    # With the forged block below the checkpoint, only the hashes, links and proof-of-work are checked up to it
+    blockchain.assume_valid = blockchain.chain[2].hash
+    assert blockchain.is_valid(full=True), "Signatures up to the checkpoint should be assumed valid"
+    assert blockchain.assumed_valid_height == 2, "Height up to which signatures were skipped should be kept"
+    assert blockchain.validated_height == 3, "Blocks after the checkpoint should be validated"
+    assert not blockchain.verify_history(), "Verifying the history should detect the forged signature"
+    assert blockchain.history_valid is False, "Result of the history verification should be kept"
+
+    # Blocks after another checkpoint are still fully verified
+    blockchain.assume_valid = blockchain.chain[1].hash
+    assert blockchain.history_valid is None, "History should be verified again for another checkpoint"
+    assert not blockchain.is_valid(), "Forged signature after the new checkpoint should be detected"
+
+def test_backfill(init):
+    blockchain, _, _ = init
+    blockchain.mine_pending_transactions()
+    blockchain.mine_pending_transactions()
+    blockchain.assume_valid = blockchain.chain[1].hash
+    blockchain.backfill = True
+    blockchain.crypto_provider.signature_cache.enabled = False
+
+    assert blockchain.is_valid(), "Blockchain should be valid"
+    assert blockchain.backfill_thread is not None, "Skipped signatures should be verified in the background"
+    blockchain.backfill_thread.join()
+    assert blockchain.history_valid is True, "Background verification should find the history valid"
+    assert blockchain.assumed_valid_height == 0, "Verified history should no longer count as assumed valid"
+    first_thread = blockchain.backfill_thread
+
+    # Re-checking with a later checkpoint skips more signatures, which are verified by another backfill
+    blockchain.assume_valid = blockchain.chain[2].hash
+    assert blockchain.is_valid(full=True), "Blockchain should be valid"
+    assert blockchain.backfill_thread is not first_thread, "Another backfill should be started"
+    blockchain.backfill_thread.join()
+    assert blockchain.history_valid is True and blockchain.assumed_valid_height == 0, "Another backfill should verify the history"
+
+def test_pruning(init):
+    blockchain, address1, _ = init
+    blockchain.prune_depth = 1
+    blockchain.mine_pending_transactions()
+    assert not blockchain.chain[1].pruned, "Block at the tip should not be pruned"
+    blockchain.mine_pending_transactions()
+    assert blockchain.chain[1].pruned, "Block buried deep enough should be pruned"
+    assert not blockchain.chain[2].pruned, "Block above the pruning depth should not be pruned"
+    assert blockchain.is_valid(full=True), "Blockchain with pruned blocks should be valid"
+    assert blockchain.get_balance(address1) == -5, "Balances should not be affected by pruning"
+
+    blockchain.chain[1].transactions[0].amount = 100
+    assert not blockchain.is_valid(full=True), "Modified pruned block should be detected"
+
+def test_forged_pruned_block(init):
+    blockchain, address1, address2 = init
+    crypto_provider = blockchain.crypto_provider
+    blockchain.prune_depth = 1
+    blockchain.mine_pending_transactions()
+
+    # A block with a forged signature that is flagged as pruned, as its flag is not covered by its hash
+    forged = Transaction(address2, address1, 1000, crypto_provider, sequence=0)
+    forged.sign_transaction(crypto_provider.generate_keypair()[1])
+    block = mine_block(blockchain, blockchain.chain[-1], [forged])
+    block.prune()
+    assert not block.is_valid(), "Pruned block should not be valid on its own"
+    assert not blockchain.add_block(block), "Received pruned block should be rejected"
+    blockchain.ledger.apply_block(block)
+    blockchain.chain.append(block)
+    assert not blockchain.is_valid(full=True), "Pruned block the blockchain did not prune itself should be invalid"
+
+def test_pruning_public_keys_from_block_store(tmp_path):
+    crypto_provider = cryptography.CryptoProvider('ECDSA-SHA256', 'sha512')
+    with pytest.raises(ValueError):
+        Blockchain(1, 1, crypto_provider, block_store=BlockStore(str(tmp_path), crypto_provider), prune_public_keys=True)
+
+def test_block_weight(init):
+    blockchain, address1, _ = init
+    weight = max(len(transaction.to_bytes()) for transaction in blockchain.pending_transactions)
+    blockchain.block_weight = weight
+    while blockchain.pending_transactions:
+        blockchain.mine_pending_transactions()
+    assert len(blockchain.chain) == 4, "Only one transaction should fit into a block"
+    assert all(block.weight <= weight for block in blockchain.chain), "Mined blocks should not exceed the block weight"
+    assert blockchain.get_balance(address1) == -5, "All transactions should be mined"
+    assert blockchain.is_valid(), "Blockchain within the block weight should be valid"
+
+    blockchain.block_weight = weight - 1
+    assert not blockchain.is_valid(full=True), "Blocks heavier than the block weight should be rejected"
+    with pytest.raises(ValueError):
+        Blockchain(1, 1, blockchain.crypto_provider, block_weight=weight, packing='size')
+
+def mine_block(blockchain, parent, transactions):
+    block = Block(parent.index + 1, parent.hash, transactions, blockchain.crypto_provider)
+    blockchain.miner.mine(block, blockchain.difficulty)
+    return block
+
+def test_reorganization(init):
+    blockchain, address1, address2 = init
+    crypto_provider = blockchain.crypto_provider
+    blockchain.mine_pending_transactions()
+    blockchain.mine_pending_transactions()
+    block1, block2 = blockchain.chain[1], blockchain.chain[2]
+    transaction3 = block2.transactions[0]
+    assert blockchain.get_block(block1.hash) is block1, "Blocks should be found by their hash"
+    assert blockchain.get_block(b"unknown") is None, "Unknown hash should not be found"
+
+    # A competing branch with the same work is kept aside
+    public_key3, secret_key3 = crypto_provider.generate_keypair()
+    address3 = crypto_provider.address(public_key3)
+    transaction4 = Transaction(address3, address1, 7, crypto_provider, public_key=public_key3)
+    transaction4.sign_transaction(secret_key3)
+    assert blockchain.add_transaction(transaction4), "Transaction should be pending"
+    side2 = mine_block(blockchain, block1, [transaction4])
+    assert blockchain.add_block(side2), "Block of a competing branch should be kept"
+    assert blockchain.chain[-1] is block2, "Chain should stay on the first seen branch among equal work"
+    assert blockchain.get_block(side2.hash) is side2, "Block of a competing branch should be found by its hash"
+    assert not blockchain.add_block(side2), "Known block should be rejected"
+    assert not blockchain.add_block(mine_block(blockchain, Block(5, b"unknown", [], crypto_provider), [])), "Block with unknown parent should be rejected"
+
+    # The competing branch overtakes the chain
+    side3 = mine_block(blockchain, side2, [])
+    assert blockchain.add_block(side3), "Block extending the competing branch should be added"
+    assert [block.hash for block in blockchain.chain[2:]] == [side2.hash, side3.hash], "Chain should switch to the branch with more work"
+    assert blockchain.get_balance(address1) == -13, "Balances should follow the new branch"
+    assert blockchain.get_balance(address3) == -7, "Transactions of the new branch should be applied"
+    assert blockchain.pending_transactions == [transaction3], "Transactions of rolled back blocks should return to the mempool"
+    assert blockchain.get_block(block2.hash) is block2, "Rolled back block should still be known"
+    assert blockchain.find_transaction(transaction3.compute_hash()) is None, "Rolled back transaction should not be indexed"
+    assert blockchain.find_transaction(transaction4.compute_hash()) == (2, 0), "Transaction of the new branch should be indexed"
+    assert blockchain.is_valid() and blockchain.is_ledger_consistent(), "Reorganized blockchain should be valid"
+
+    # A heavier branch with an invalid block is dropped and the chain stays on its branch
+    forged = Transaction(address2, address1, 1000, crypto_provider, sequence=1)
+    forged.sign_transaction(crypto_provider.generate_keypair()[1])
+    invalid2 = mine_block(blockchain, block1, [forged])
+    invalid3 = mine_block(blockchain, invalid2, [])
+    invalid4 = mine_block(blockchain, invalid3, [])
+    assert blockchain.add_block(invalid2) and blockchain.add_block(invalid3), "Blocks of a lighter branch should be kept"
+    assert not blockchain.add_block(invalid4), "Heavier branch with an invalid block should be rejected"
+    assert blockchain.get_block(invalid2.hash) is None, "Invalid block should be dropped"
+    assert blockchain.chain[-1] is side3, "Chain should switch back to its branch"
+    assert blockchain.get_balance(address1) == -13, "Balances should be restored"
+    assert blockchain.key_registry.get(address3) == public_key3, "Revealed keys should be restored"
+
+    # Mining continues on the chosen branch, and switching back returns the rolled back key reveal to the mempool
+    blockchain.mine_pending_transactions()
+    assert blockchain.chain[-1].transactions[0].compute_hash() == transaction3.compute_hash(), "Mining should continue on the tip"
+    for _ in range(3):
+        block2 = mine_block(blockchain, block2, [])
+        blockchain.add_block(block2)
+    assert blockchain.chain[-1] is block2, "Chain should switch to the heavier branch"
+    assert blockchain.pending_transactions[0].public_key == public_key3, "Returned transaction should carry its rolled back key"
+    assert blockchain.is_valid() and blockchain.is_ledger_consistent(), "Blockchain should be valid after switching back"
+
+def test_replay_protection(init):
+    blockchain, address1, address2 = init
+    crypto_provider = blockchain.crypto_provider
+    transaction1, transaction2, transaction3 = blockchain.pending_transactions
+    blockchain.mine_pending_transactions()
+    assert blockchain.find_transaction(transaction2.compute_hash()) == (1, 1), "Mined transaction should be indexed"
+    assert blockchain.find_transaction(transaction3.compute_hash()) is None, "Pending transaction should not be indexed"
+    assert not blockchain.add_transaction(transaction1), "Replayed transaction should be rejected"
+
+    blockchain.mine_pending_transactions()
+    assert blockchain.ledger.next_sequence(address2) == 2, "Sequence number should advance with every mined transaction"
+
+    # Transactions following a gap in the sequence numbers wait for their predecessor
+    public_key3, secret_key3 = crypto_provider.generate_keypair()
+    address3 = crypto_provider.address(public_key3)
+    transactions = [Transaction(address3, address1, 1, crypto_provider, public_key=public_key3, sequence=sequence) for sequence in range(3)]
+    for transaction in transactions:
+        transaction.sign_transaction(secret_key3)
+    blockchain.block_size = 3
+    assert blockchain.add_transaction(transactions[2]) and blockchain.add_transaction(transactions[1]), "Future transactions should be admitted"
+    assert blockchain.mine_pending_transactions() == "No transactions to mine.", "Transactions following a gap should not be mined"
+    assert blockchain.pending_transactions == [transactions[2], transactions[1]], "Transactions following a gap should stay pending in their order"
+    assert blockchain.add_transaction(transactions[0]), "Transaction closing the gap should be admitted"
+    blockchain.mine_pending_transactions()
+    assert [transaction.sequence for transaction in blockchain.chain[-1].transactions] == [0, 1, 2], "Transactions should be mined in sequence"
+    assert blockchain.is_valid(), "Blockchain should be valid"
+
+    # Blocks repeating a sequence number are invalid
+    replay = Block(len(blockchain.chain), blockchain.chain[-1].hash, [transaction1], crypto_provider)
+    blockchain.miner.mine(replay, blockchain.difficulty)
+    assert not blockchain.add_block(replay), "Block replaying a transaction should be rejected"
+    assert blockchain.chain[-1].index == 3, "Chain should not be extended by a replaying block"
@@ -0,0 +1,238 @@
+import pytest
+import io
+import cryptography
+from blockchain import Blockchain, Transaction, BlockStore, read_blocks, write_blocks
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    address2 = crypto_provider.address(crypto_provider.generate_keypair()[0])
+
+    # Mine five blocks, the first one revealing the sender's public key
+    blockchain = Blockchain(1, 1, crypto_provider)
+    for sequence in range(5):
+        transaction = Transaction(address1, address2, 10, crypto_provider, public_key=public_key1 if sequence == 0 else None, sequence=sequence)
+        transaction.sign_transaction(secret_key1)
+        blockchain.add_transaction(transaction)
+        blockchain.mine_pending_transactions()
+
+    return blockchain, crypto_provider, address2
+
+def forge(blockchain, height):
+    """
+    Replace the signature of the first transaction at the given height and re-mine that block and the ones after it, so
+    all hashes and links stay valid and only the signature is invalid.
+    """
+    crypto_provider = blockchain.crypto_provider
+    blockchain.chain[height].transactions[0].signature = crypto_provider.sign(crypto_provider.generate_keypair()[1], b"forged")
+    for block in blockchain.chain[height:]:
+        block.previous_hash = blockchain.chain[block.index - 1].hash
+        block.merkle_root = block.compute_merkle_root()
+        block.hash = block.compute_hash()
+        while not block.meets_difficulty(blockchain.difficulty):
+            block.nonce += 1
+            block.hash = block.compute_hash()
+
+class FailingReader(io.BytesIO):
+    """
+    Stream that fails after the given number of bytes, like a broken disk or connection.
+    """
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        if self.tell() + max(size, 0) > self.limit:
+            raise OSError("Read failed")
+        return super().read(size)
+
+@pytest.mark.parametrize("format", ['binary', 'jsonl'])
+def test_export_and_import(init, format):
+    blockchain, crypto_provider, address2 = init
+    exported = io.BytesIO()
+    assert blockchain.export_chain(exported, format) == 6, "All blocks should be exported"
+
+    exported.seek(0)
+    blocks = list(read_blocks(exported, crypto_provider, format))
+    assert [block.to_bytes() for block in blocks] == [block.to_bytes() for block in blockchain.chain], "Blocks should be restored exactly"
+
+    # A new blockchain adopts the exported genesis block
+    imported = Blockchain(1, 1, crypto_provider)
+    exported.seek(0)
+    assert imported.import_chain(exported, format, window=2) == 5, "All blocks after the genesis block should be imported"
+    assert imported.chain[-1].hash == blockchain.chain[-1].hash, "Imported chain should end in the exported tip"
+    assert imported.validated_height == 5, "Imported blocks should be validated"
+    assert imported.get_balance(address2) == 50, "Imported blocks should be applied to the ledger"
+    assert imported.find_transaction(blockchain.chain[3].transactions[0].compute_hash()) == (3, 0), "Imported transactions should be indexed"
+    assert imported.is_valid() and imported.is_ledger_consistent(), "Imported blockchain should be valid"
+
+    # Importing again only matches the known blocks
+    exported.seek(0)
+    assert imported.import_chain(exported, format) == 0, "Known blocks should not be imported again"
+
+def test_import_continues_chain(init, tmp_path):
+    blockchain, crypto_provider, _ = init
+    exported = io.BytesIO()
+    write_blocks(blockchain.chain[:3], exported)
+    block_store = BlockStore(str(tmp_path), crypto_provider)
+    imported = Blockchain(1, 1, crypto_provider, block_store=block_store)
+    exported.seek(0)
+    assert imported.import_chain(exported) == 2, "Blocks of a partial export should be imported"
+
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+    exported.seek(0)
+    assert imported.import_chain(exported) == 3, "Import should continue after the tip"
+    assert len(block_store) == 6 and block_store[-1].hash == blockchain.chain[-1].hash, "Imported blocks should be stored"
+    assert imported.is_ledger_consistent(), "Ledger should match the imported chain"
+
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        Blockchain(1, 1, crypto_provider).import_chain(exported, format='xml')
+
+def test_import_rejects_invalid(init):
+    blockchain, crypto_provider, address2 = init
+
+    # A forged signature in the last block stops the import after the windows before it
+    forge(blockchain, 5)
+    forged = blockchain.chain[5]
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+    imported = Blockchain(1, 1, crypto_provider)
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        imported.import_chain(exported, window=2)
+    assert len(imported.chain) == 5, "Windows before the invalid block should be kept"
+    assert imported.get_balance(address2) == 40, "Ledger should be rolled back to the kept blocks"
+    assert imported.find_transaction(forged.transactions[0].compute_hash()) is None, "Rolled back transactions should not be indexed"
+    assert imported.is_valid() and imported.is_ledger_consistent(), "Kept blocks should be valid"
+
+    # A truncated export and a chain with another genesis block are rejected
+    data = exported.getvalue()
+    with pytest.raises(ValueError):
+        Blockchain(1, 1, crypto_provider).import_chain(io.BytesIO(data[:len(data) - 10]))
+    with pytest.raises(ValueError):
+        list(read_blocks(io.BytesIO(b"garbage"), crypto_provider))
+    other = Blockchain(1, 1, crypto_provider)
+    other.chain[0].timestamp += 1
+    other.chain[0].hash = other.chain[0].compute_hash()
+    other.add_transaction(blockchain.chain[1].transactions[0])
+    other.mine_pending_transactions()
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        other.import_chain(exported)
+
+@pytest.mark.parametrize("window, kept", [(1, 1), (2, 0)])
+def test_import_stops_at_invalid_block(init, window, kept):
+    blockchain, crypto_provider, address2 = init
+
+    # A forged signature in the middle of the chain, followed by blocks linking to it
+    forge(blockchain, 2)
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+    imported = Blockchain(1, 1, crypto_provider)
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        imported.import_chain(exported, window=window)
+    # The window of the invalid block is dropped as a whole
+    assert [block.index for block in imported.chain] == list(range(kept + 1)), "No block after the invalid one should be appended"
+    assert imported.ledger.height == kept and imported.get_balance(address2) == 10 * kept, "Ledger should be rolled back to the kept blocks"
+    assert imported.is_valid(full=True) and imported.is_ledger_consistent(), "Kept blocks should be valid"
+
+def test_import_rolls_back_on_any_error(init):
+    blockchain, crypto_provider, _ = init
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+    data = exported.getvalue()
+
+    # A failing stream raises its error instead of blocking the import
+    imported = Blockchain(1, 1, crypto_provider)
+    with pytest.raises(OSError):
+        imported.import_chain(FailingReader(data, len(data) - 10), window=1)
+    assert imported.is_valid(full=True) and imported.is_ledger_consistent(), "State should match the kept blocks after a read error"
+
+    # A malformed JSON record is rejected without leaving a partially applied block
+    exported = io.BytesIO()
+    blockchain.export_chain(exported, 'jsonl')
+    lines = exported.getvalue().splitlines(keepends=True)
+    lines[3] = lines[3].replace(b'"nonce":', b'"nonce":"x","ignored":')
+    imported = Blockchain(1, 1, crypto_provider)
+    with pytest.raises(Exception):
+        imported.import_chain(io.BytesIO(b"".join(lines)), 'jsonl', window=1)
+    assert len(imported.chain) <= 3, "Blocks after the malformed record should not be appended"
+    assert imported.is_valid(full=True) and imported.is_ledger_consistent(), "State should match the kept blocks after a malformed record"
+
+def test_import_pruned_blocks(init):
+    blockchain, crypto_provider, address2 = init
+
+    # A forged transaction in a block flagged as pruned, which hides its signature without changing the block's hash
+    forge(blockchain, 3)
+    blockchain.chain[3].prune()
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+
+    imported = Blockchain(1, 1, crypto_provider)
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        imported.import_chain(exported, window=1)
+    assert len(imported.chain) == 3, "Import should stop at the pruned block"
+    assert imported.is_valid(full=True) and imported.is_ledger_consistent(), "Kept blocks should be valid"
+
+    # Pruned blocks are only accepted below a trusted checkpoint that follows them in the file
+    imported = Blockchain(1, 1, crypto_provider, assume_valid=blockchain.chain[2].hash)
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        imported.import_chain(exported, window=1)
+    assert len(imported.chain) == 3, "Pruned block after the checkpoint should be dropped"
+    assert imported.get_block(blockchain.chain[3].hash) is None, "Dropped pruned block should not be kept in the block tree"
+    assert imported.is_valid(full=True) and imported.is_ledger_consistent(), "Kept blocks should be valid"
+
+    imported = Blockchain(1, 1, crypto_provider, assume_valid=blockchain.chain[4].hash)
+    exported.seek(0)
+    assert imported.import_chain(exported, window=1) == 5, "Pruned block below the checkpoint should be accepted"
+    assert imported.is_valid(full=True), "Pruned block below the checkpoint should be trusted"
+
+def test_import_below_checkpoint(init):
+    blockchain, crypto_provider, address2 = init
+
+    # A forged signature below the checkpoint is not verified by the import, only by the history verification
+    forge(blockchain, 2)
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+    imported = Blockchain(1, 1, crypto_provider, assume_valid=blockchain.chain[3].hash)
+    exported.seek(0)
+    assert imported.import_chain(exported, window=2) == 5, "Blocks up to the checkpoint should be imported without verifying their signatures"
+    assert imported.assumed_valid_height == 3, "Height up to which signatures were skipped should be kept"
+    assert imported.validated_height == 5, "Imported blocks should be validated"
+    assert not imported.verify_history(), "Verifying the history should detect the forged signature"
+
+    # Without the checkpoint in the file, the skipped signatures are verified after the last block
+    imported = Blockchain(1, 1, crypto_provider, assume_valid=b"\x00" * 32)
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        imported.import_chain(exported, window=1)
+    assert len(imported.chain) == 2, "Windows before the forged signature should be kept"
+    assert imported.assumed_valid_height == 0, "No signatures should be assumed valid without the checkpoint"
+    assert imported.is_valid(full=True) and imported.is_ledger_consistent(), "Kept blocks should be valid"
+
+    # A forged signature after the checkpoint is still detected
+    imported = Blockchain(1, 1, crypto_provider, assume_valid=blockchain.chain[1].hash)
+    exported.seek(0)
+    with pytest.raises(ValueError):
+        imported.import_chain(exported, window=1)
+    assert len(imported.chain) == 2, "Import should stop at the forged signature after the checkpoint"
+
+def test_import_backfill(init):
+    blockchain, crypto_provider, _ = init
+    exported = io.BytesIO()
+    blockchain.export_chain(exported)
+    imported = Blockchain(1, 1, crypto_provider, assume_valid=blockchain.chain[4].hash, backfill=True)
+    exported.seek(0)
+    assert imported.import_chain(exported, window=2) == 5, "All blocks should be imported"
+    assert imported.backfill_thread is not None, "Skipped signatures should be verified in the background"
+    imported.backfill_thread.join()
+    assert imported.history_valid is True and imported.assumed_valid_height == 0, "Background verification should find the history valid"
@@ -0,0 +1,91 @@
+import pytest
+import base64
+import cryptography
+from blockchain import Blockchain, Transaction, KeyRegistry
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    public_key2, _ = crypto_provider.generate_keypair()
+    address2 = crypto_provider.address(public_key2)
+    return crypto_provider, public_key1, secret_key1, address1, public_key2, address2
+
+def test_register_and_get(init):
+    crypto_provider, public_key1, _, address1, public_key2, address2 = init
+    key_registry = KeyRegistry(crypto_provider)
+
+    assert len(address1) < len(base64.b64encode(public_key1)), "Address should be shorter than the base64-encoded public key"
+    assert key_registry.register(public_key1, 3) == address1, "Registering should return the address of the key"
+    assert address1 in key_registry and address2 not in key_registry, "Only registered keys should be known"
+    assert key_registry.get(address1) == public_key1, "Registered key should be returned"
+    assert key_registry.get(address1, 2) is None, "Key should not be known below the height it was revealed at"
+    assert key_registry.get(address1, 3) == public_key1, "Key should be known at the height it was revealed at"
+
+    # Keys keep the earliest height they were revealed at
+    key_registry.register(public_key1, 1)
+    key_registry.register(public_key1, 5)
+    assert key_registry.get(address1, 1) == public_key1, "Earliest height should be kept"
+    assert len(key_registry) == 1, "Every key should be stored once"
+
+def test_rollback(init):
+    crypto_provider, public_key1, _, address1, public_key2, address2 = init
+    key_registry = KeyRegistry(crypto_provider)
+    key_registry.register(public_key1, 1)
+    key_registry.register(public_key2, 3)
+    key_registry.register(public_key1, 4)
+
+    key_registry.rollback(2)
+    assert address2 not in key_registry, "Key revealed above the height should be forgotten"
+    assert key_registry.get(address1) == public_key1, "Key revealed below the height should be kept"
+    key_registry.rollback(0)
+    assert len(key_registry) == 0, "Rolling back to the genesis block should forget all keys"
+
+    # Keys registered out of height order are rolled back by their heights
+    key_registry.register(public_key2, 6)
+    key_registry.register(public_key1, 5)
+    key_registry.rollback(5)
+    assert address2 not in key_registry and key_registry.get(address1) == public_key1, "Only keys above the height should be forgotten"
+    key_registry.rollback(4)
+    assert len(key_registry) == 0, "Key registered below a later one should be forgotten as well"
+
+def test_to_and_from_bytes(init):
+    crypto_provider, public_key1, _, address1, public_key2, address2 = init
+    key_registry = KeyRegistry(crypto_provider)
+    key_registry.register(public_key1, 1)
+    key_registry.register(public_key2, 3)
+
+    restored = KeyRegistry.from_bytes(key_registry.to_bytes(), crypto_provider)
+    assert restored.get(address1, 1) == public_key1 and restored.get(address2, 2) is None, "Keys should be restored with their heights"
+    restored.rollback(2)
+    assert address2 not in restored and address1 in restored, "Restored registry should be rolled back by the heights of its keys"
+    with pytest.raises(ValueError):
+        KeyRegistry.from_bytes(key_registry.to_bytes() + b'\x00', crypto_provider)
+
+def test_reveal_on_first_spend(init):
+    crypto_provider, public_key1, secret_key1, address1, _, address2 = init
+    blockchain = Blockchain(1, 1, crypto_provider)
+
+    # Without its public key, the first spend of an address is rejected
+    transaction = Transaction(address1, address2, 30, crypto_provider)
+    transaction.sign_transaction(secret_key1)
+    assert not blockchain.add_transaction(transaction), "First spend without public key should be rejected"
+
+    # Later spends are admitted without the key, and keys carried anyway are only stored once
+    transactions = []
+    for sequence, (amount, public_key) in enumerate([(30, public_key1), (10, None), (5, public_key1)]):
+        transaction = Transaction(address1, address2, amount, crypto_provider, public_key=public_key, sequence=sequence)
+        transaction.sign_transaction(secret_key1)
+        transactions.append(transaction)
+    assert blockchain.add_transaction(transactions[0]), "First spend with public key should be admitted"
+    blockchain.mine_pending_transactions()
+    assert blockchain.key_registry.get(address1) == public_key1, "Revealed key should be registered"
+    assert blockchain.add_transaction(transactions[1]), "Later spend without public key should be admitted"
+    assert blockchain.add_transaction(transactions[2]), "Later spend with public key should be admitted"
+    blockchain.mine_pending_transactions()
+    blockchain.mine_pending_transactions()
+    assert blockchain.chain[1].transactions[0].public_key == public_key1, "First spend should reveal the key on the chain"
+    assert blockchain.chain[3].transactions[0].public_key is None, "Already revealed key should not be stored again"
+    assert blockchain.is_valid(), "Blockchain should be valid"
@@ -0,0 +1,83 @@
+import pytest
+import cryptography
+from blockchain import Blockchain, Transaction, Ledger
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    public_key2, secret_key2 = crypto_provider.generate_keypair()
+    address2 = crypto_provider.address(public_key2)
+
+    # Mine three blocks with one transaction each
+    blockchain = Blockchain(1, 1, crypto_provider)
+    for sender, recipient, amount, public_key, secret_key, sequence in [(address1, address2, 30, public_key1, secret_key1, 0), (address2, address1, 10, public_key2, secret_key2, 0), (address2, address1, 15, public_key2, secret_key2, 1)]:
+        transaction = Transaction(sender, recipient, amount, crypto_provider, public_key=public_key, sequence=sequence)
+        transaction.sign_transaction(secret_key)
+        blockchain.add_transaction(transaction)
+    for _ in range(3):
+        blockchain.mine_pending_transactions()
+
+    return blockchain, address1, address2
+
+def test_balances(init):
+    blockchain, address1, address2 = init
+
+    assert blockchain.ledger.height == 3, "Ledger should contain every mined block"
+    assert blockchain.get_balance(address1) == -5, "Balance of address1 should be -5"
+    assert blockchain.get_balance(address2) == 5, "Balance of address2 should be 5"
+    assert blockchain.is_ledger_consistent(), "Ledger should match the full scan of the chain"
+
+    # Historical balances
+    assert blockchain.get_balance(address1, 0) == 0, "Balance at genesis should be 0"
+    assert blockchain.get_balance(address1, 1) == -30, "Balance of address1 after block 1 should be -30"
+    assert blockchain.get_balance(address2, 2) == 20, "Balance of address2 after block 2 should be 20"
+    assert blockchain.ledger.snapshot(2) == {address1: -20, address2: 20}, "Snapshot should contain the balances at height 2"
+
+    # Sequence numbers
+    assert blockchain.ledger.next_sequence(address2) == 2, "Next sequence number should follow the mined transactions"
+    assert blockchain.ledger.next_sequence(address2, 2) == 1, "Historical sequence number should be looked up"
+    assert blockchain.ledger.next_sequence(address2, 1) == 0, "Recipient-only address should keep its sequence number"
+
+    # Modifying a mined transaction makes the ledger inconsistent with the chain
+    blockchain.chain[1].transactions[0].amount = 100
+    assert not blockchain.is_ledger_consistent(), "Ledger should not match a modified chain"
+
+def test_rollback(init):
+    blockchain, address1, address2 = init
+    ledger = blockchain.ledger
+
+    ledger.rollback(1)
+    assert ledger.height == 1, "Ledger should be at the rolled back height"
+    assert ledger.next_sequence(address2) == 0, "Sequence numbers should be rolled back"
+    assert ledger.snapshot() == {address1: -30, address2: 30}, "Balances should be the ones at height 1"
+
+    ledger.rollback(0)
+    assert ledger.snapshot() == {}, "No address should have a balance at genesis"
+
+    # Blocks can be applied again after a rollback, but only in order
+    with pytest.raises(ValueError):
+        ledger.apply_block(blockchain.chain[2])
+    for block in blockchain.chain[1:]:
+        ledger.apply_block(block)
+    assert blockchain.is_ledger_consistent(), "Re-applied ledger should match the chain"
+
+    with pytest.raises(ValueError):
+        Ledger().rollback(-1)
+
+def test_to_and_from_bytes(init):
+    blockchain, address1, address2 = init
+    ledger = Ledger.from_bytes(blockchain.ledger.to_bytes())
+    assert ledger.height == 3 and ledger.snapshot() == blockchain.ledger.snapshot(), "Balances should be restored"
+    assert ledger.get_balance(address2, 2) == 20 and ledger.next_sequence(address2) == 2, "History and sequence numbers should be restored"
+
+    # The journal is restored as well, so the restored ledger can be rolled back
+    ledger.rollback(1)
+    assert ledger.snapshot() == {address1: -30, address2: 30} and ledger.next_sequence(address2) == 0, "Restored ledger should be rolled back"
+
+    with pytest.raises(ValueError):
+        Ledger.from_bytes(blockchain.ledger.to_bytes()[:-1])
+    with pytest.raises(ValueError):
+        Ledger.from_bytes(b'\xff' + blockchain.ledger.to_bytes()[1:])
@@ -0,0 +1,144 @@
+import pytest
+import cryptography
+from blockchain import Transaction, Mempool, FifoPolicy, FeePolicy, pack_template
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    public_key2, _ = crypto_provider.generate_keypair()
+    address2 = crypto_provider.address(public_key2)
+
+    # Transactions with equal size and increasing fee
+    transactions = []
+    for fee in range(4):
+        transaction = Transaction(address1, address2, 10, crypto_provider, fee, public_key1)
+        transaction.sign_transaction(secret_key1)
+        transactions.append(transaction)
+    return transactions, address1, address2, crypto_provider
+
+def test_admission(init):
+    transactions, address1, address2, crypto_provider = init
+    mempool = Mempool()
+
+    assert mempool.add(transactions[0]), "Valid transaction should be admitted"
+    assert not mempool.add(transactions[0]), "Duplicate transaction should be rejected"
+    assert transactions[0] in mempool, "Admitted transaction should be pending"
+    assert mempool.size_bytes == len(transactions[0].to_bytes()), "Size should be tracked in serialized bytes"
+
+    unsigned_transaction = Transaction(address1, address2, 10, crypto_provider)
+    assert not mempool.add(unsigned_transaction), "Unsigned transaction should be rejected"
+
+    transactions[1].amount = 100
+    assert not mempool.add(transactions[1]), "Transaction with invalid signature should be rejected"
+    assert len(mempool) == 1, "Only the valid transaction should be pending"
+
+    assert mempool.remove(transactions[0]), "Pending transaction should be removable"
+    assert not mempool.remove(transactions[0]), "Removed transaction should no longer be pending"
+    assert len(mempool) == 0 and mempool.size_bytes == 0, "Mempool should be empty"
+
+@pytest.mark.parametrize("policy, expected_order", [(FifoPolicy, [0, 1, 2, 3]), (FeePolicy, [3, 2, 1, 0])])
+def test_pop_order(init, policy, expected_order):
+    transactions, _, _, _ = init
+    mempool = Mempool(policy=policy())
+    for transaction in transactions:
+        mempool.add(transaction)
+
+    assert list(mempool) == transactions, "Iteration should be in admission order"
+    mempool.remove(transactions[expected_order[1]])
+    popped = mempool.pop(2) + mempool.pop(5)
+    expected = [transactions[i] for i in expected_order if i != expected_order[1]]
+    assert popped == expected, "Transactions should be dequeued in the order of the policy"
+    assert mempool.pop(1) == [], "Empty mempool should not return transactions"
+
+@pytest.mark.parametrize("policy, kept", [(FifoPolicy, [0, 1]), (FeePolicy, [2, 3])])
+def test_capacity(init, policy, kept):
+    transactions, _, _, _ = init
+    size = len(transactions[0].to_bytes())
+    mempool = Mempool(capacity_bytes=2 * size, policy=policy())
+
+    admitted = [mempool.add(transaction) for transaction in transactions]
+    assert mempool.size_bytes <= 2 * size, "Mempool should not exceed its capacity"
+    assert list(mempool) == [transactions[i] for i in kept], "Transactions ranked lowest by the policy should be evicted"
+    assert admitted[:2] == [True, True], "Transactions fitting into the mempool should be admitted"
+    if policy is FifoPolicy:
+        assert admitted[2:] == [False, False], "FIFO mempool should reject new transactions when full"
+    else:
+        assert admitted[2:] == [True, True], "Fee mempool should admit transactions with higher fees when full"
+
+    assert not Mempool(capacity_bytes=size - 1).add(transactions[0]), "Transaction larger than the capacity should be rejected"
+
+def test_pack_template():
+    # Tuples of entry id, fee and size
+    candidates = [(0, 1, 50), (1, 9, 100), (2, 4, 30), (3, 4, 30), (4, 0, 200)]
+    assert pack_template(candidates, 110) == [2, 3, 0], "Smallest entries should be packed to maximize the count"
+    assert pack_template(candidates, 110, max_count=2) == [2, 3], "Count limit should be respected"
+    assert pack_template(candidates, 10) == [], "Entries larger than the limit should be skipped"
+    assert pack_template(candidates, 160, objective='fees') == [2, 3, 1], "Highest fee rates should be packed to maximize the fees"
+    assert pack_template([(0, 2, 10), (1, 10, 100)], 100, objective='fees') == [1], "Single entry paying more should be packed alone"
+    with pytest.raises(ValueError):
+        pack_template(candidates, 100, objective='size')
+
+    # Large backlogs are packed without sorting all entries
+    candidates = [(entry_id, entry_id % 7, 100 + entry_id % 13) for entry_id in range(100000)]
+    chosen = pack_template(candidates, 10000, objective='fees')
+    assert sum(100 + entry_id % 13 for entry_id in chosen) <= 10000, "Packed entries should fit into the limit"
+    assert all(entry_id % 7 == 6 for entry_id in chosen), "Only entries with the highest fee rate should be packed"
+
+def test_pop_template(init):
+    transactions, _, _, _ = init
+    size = len(transactions[0].to_bytes())
+    mempool = Mempool()
+    for transaction in transactions:
+        mempool.add(transaction)
+
+    popped = mempool.pop_template(2 * size + 1, objective='fees')
+    assert popped == transactions[2:], "Transactions with the highest fees should be dequeued in admission order"
+    assert mempool.size_bytes == 2 * size, "Dequeued transactions should no longer count towards the size"
+    assert mempool.pop_template(3 * size, max_count=1) == transactions[:1], "Count limit should be respected"
+    assert mempool.pop_template(size - 1) == [], "Transactions larger than the limit should stay pending"
+    assert len(mempool) == 1, "Remaining transaction should still be pending"
+
+@pytest.mark.parametrize("policy, expected_order", [(FifoPolicy, [0, 1, 2, 3]), (FeePolicy, [3, 2, 1, 0])])
+def test_requeue(init, policy, expected_order, monkeypatch):
+    transactions, _, _, _ = init
+    mempool = Mempool(policy=policy())
+    for transaction in transactions:
+        mempool.add(transaction)
+    size_bytes = mempool.size_bytes
+
+    # Put back transactions return to their position without being verified again
+    popped = mempool.pop(3)
+    monkeypatch.setattr(Transaction, 'is_valid', lambda transaction, key_registry=None: False)
+    mempool.requeue(popped[1:])
+    monkeypatch.undo()
+    assert list(mempool) == [transaction for transaction in transactions if transaction is not popped[0]], "Iteration should stay in admission order"
+    assert mempool.size_bytes == size_bytes - len(popped[0].to_bytes()), "Put back transactions should count towards the size again"
+    assert mempool.pop(5) == [transactions[i] for i in expected_order[1:]], "Put back transactions should keep their position in the policy"
+
+    # Transactions of a block template are put back in admission order, others are admitted again
+    for transaction in transactions:
+        mempool.add(transaction)
+    popped = mempool.pop_template(size_bytes, max_count=2)
+    mempool.requeue(popped[1:])
+    assert list(mempool) == [transaction for transaction in transactions if transaction is not popped[0]], "Template transactions should be put back in admission order"
+    mempool.remove(transactions[-1])
+    mempool.pop(1)
+    mempool.requeue([transactions[-1]])
+    assert list(mempool)[-1] is transactions[-1], "Transaction that was not dequeued last should be admitted as a new one"
+
+def test_fifo_restore():
+    policy = FifoPolicy()
+    for entry_id in range(5):
+        policy.push(entry_id, None, 1)
+    live = set(range(5))
+    assert [policy.pop_best(live.__contains__) for _ in range(3)] == [0, 1, 2], "Entries should be popped in admission order"
+
+    # Restored entries are merged with the queued ones from both ends
+    for entry_id in (2, 0):
+        policy.restore(entry_id, None, 1)
+    assert policy.pop_worst(live.__contains__) == 4, "Newest entry should be evicted first"
+    assert [policy.pop_best(live.__contains__) for _ in range(3)] == [0, 2, 3], "Restored entries should keep their position"
+    assert policy.pop_best(live.__contains__) is None, "All entries should have been popped"
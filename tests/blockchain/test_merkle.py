@@ -0,0 +1,38 @@
+import pytest
+import cryptography
+from blockchain import merkle_root, merkle_proof, verify_merkle_proof
+
+@pytest.fixture(params=cryptography.SUPPORTED_HASH_FUNCTIONS)
+def init(request):
+    hash_function = request.param
+
+    # shake_128 and shake_256 have variable digest length, so they are as 'shake_128_x' and 'shake_256_x' in SUPPORTED_HASH_FUNCTIONS
+    if hash_function.endswith('x'):
+        hash_function = hash_function.replace('x', '20')
+
+    crypto_provider = cryptography.CryptoProvider('', hash_function)
+    leaves = [f'Transaction {i}'.encode() for i in range(7)]
+    return leaves, crypto_provider
+
+def test_merkle_root(init):
+    leaves, crypto_provider = init
+
+    assert merkle_root([], crypto_provider.hash) == crypto_provider.hash(b''), "Root of no leaves should be the hash of the empty string"
+    assert merkle_root(leaves, crypto_provider.hash) == merkle_root(list(leaves), crypto_provider.hash), "Root should be deterministic"
+    assert merkle_root(leaves, crypto_provider.hash) != merkle_root(leaves[:-1], crypto_provider.hash), "Root should change when a leaf is removed"
+    assert merkle_root(leaves[:2], crypto_provider.hash) != merkle_root(leaves[1::-1], crypto_provider.hash), "Root should depend on the order of the leaves"
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 7])
+def test_merkle_proof(init, count):
+    leaves, crypto_provider = init
+    leaves = leaves[:count]
+    root = merkle_root(leaves, crypto_provider.hash)
+
+    for index, leaf in enumerate(leaves):
+        proof = merkle_proof(leaves, index, crypto_provider.hash)
+        assert len(proof) <= max(count - 1, 0).bit_length(), "Proof should have at most one entry per tree level"
+        assert verify_merkle_proof(leaf, proof, root, crypto_provider.hash), "Proof should verify for an included leaf"
+        assert not verify_merkle_proof(b'Not included', proof, root, crypto_provider.hash), "Proof should not verify for another leaf"
+
+    with pytest.raises(IndexError):
+        merkle_proof(leaves, count, crypto_provider.hash)
@@ -0,0 +1,64 @@
+import pytest
+import cryptography
+import os
+import time
+from blockchain import Block, Miner
+from blockchain import miner as miner_module
+
+@pytest.fixture(params=cryptography.SUPPORTED_HASH_FUNCTIONS)
+def init(request):
+    hash_function = request.param
+
+    # shake_128 and shake_256 have variable digest length, so they are as 'shake_128_x' and 'shake_256_x' in SUPPORTED_HASH_FUNCTIONS
+    if hash_function.endswith('x'):
+        hash_function = hash_function.replace('x', '20')
+
+    crypto_provider = cryptography.CryptoProvider('', hash_function)
+    timestamp = time.time()
+    serial_block = Block(1, b'0', [], crypto_provider, timestamp)
+    parallel_block = Block(1, b'0', [], crypto_provider, timestamp)
+
+    return serial_block, parallel_block
+
+def test_mine_serial_and_parallel(init):
+    serial_block, parallel_block = init
+
+    serial_miner = Miner()
+    serial_miner.mine(serial_block, 1)
+    assert serial_block.hash.startswith(b'\x00'), "Serially mined hash should meet the difficulty"
+    assert serial_block.hash == serial_block.compute_hash(), "Serially mined hash should match the computed hash"
+    assert serial_miner.attempts == serial_block.nonce + 1, "Serial miner should try every nonce up to the found one"
+    assert serial_miner.hashrate > 0, "Hashrate should be reported after mining"
+
+    parallel_miner = Miner(workers=2)
+    parallel_miner.mine(parallel_block, 1)
+    assert parallel_block.nonce == serial_block.nonce, "Parallel mining should accept the same nonce as serial mining"
+    assert parallel_block.hash == serial_block.hash, "Parallel mining should produce the same block hash as serial mining"
+    assert parallel_miner.attempts >= parallel_block.nonce + 1, "Parallel miner should count the attempts of all workers"
+    assert parallel_miner.hashrate > 0, "Hashrate should be reported after mining"
+
+    # The worker processes are kept for the next block
+    pool = parallel_miner._pool
+    next_block = Block(2, parallel_block.hash, [], parallel_block.crypto_provider)
+    parallel_miner.mine(next_block, 1)
+    assert parallel_miner._pool is pool, "Parallel miner should reuse its worker processes"
+    assert next_block.hash == next_block.compute_hash() and next_block.hash.startswith(b'\x00'), "Next block should be mined by the reused workers"
+    parallel_miner.close()
+
+def _crash(*args):
+    os._exit(1)
+
+def test_mine_parallel_worker_crash(init, monkeypatch):
+    _, parallel_block = init
+    miner = Miner(workers=2)
+
+    # A crashed worker fails the search instead of blocking it forever
+    monkeypatch.setattr(miner_module, '_search_nonces', _crash)
+    with pytest.raises(RuntimeError):
+        miner.mine(parallel_block, 1)
+    monkeypatch.undo()
+
+    # The next search starts new workers
+    miner.mine(parallel_block, 1)
+    assert parallel_block.hash.startswith(b'\x00'), "Miner should recover from a crashed worker"
+    miner.close()
@@ -0,0 +1,193 @@
+import pytest
+import asyncio
+import os
+import cryptography
+from blockchain import Block, Blockchain, Transaction, Node
+from blockchain import node as node_module
+from blockchain.node import frame, parse_frame, MESSAGE_BLOCK, MESSAGE_HELLO, MESSAGE_TRANSACTION
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha256')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    address2 = crypto_provider.address(crypto_provider.generate_keypair()[0])
+
+    # Create transactions of one sender
+    transactions = []
+    for sequence in range(3):
+        transaction = Transaction(address1, address2, 10, crypto_provider, public_key=public_key1 if sequence == 0 else None, sequence=sequence)
+        transaction.sign_transaction(secret_key1)
+        transactions.append(transaction)
+
+    # Create nodes sharing the genesis block
+    genesis = Blockchain(1, 1, crypto_provider).chain[0]
+    nodes = [Node(f"node{i}", Blockchain(1, 1, crypto_provider, genesis_block=genesis), latency=0.01) for i in range(3)]
+
+    return nodes, transactions
+
+def test_frame():
+    message_type, payload = parse_frame(frame(MESSAGE_BLOCK, b"payload"))
+    assert message_type == MESSAGE_BLOCK, "Message type should be restored"
+    assert bytes(payload) == b"payload", "Payload should be restored"
+    with pytest.raises(ValueError):
+        parse_frame(frame(MESSAGE_BLOCK, b"payload")[:-1])
+    with pytest.raises(ValueError):
+        parse_frame(b"\x01")
+
+def test_propagation(init):
+    nodes, transactions = init
+
+    async def run():
+        # Line topology: node0 - node1 - node2
+        nodes[0].connect(nodes[1])
+        nodes[1].connect(nodes[2])
+        assert nodes[1].peers == ["node0", "node2"], "Node should know its peers"
+
+        assert nodes[0].submit_transaction(transactions[0]), "Transaction should be admitted"
+        assert not nodes[0].submit_transaction(transactions[0]), "Duplicate transaction should not be admitted"
+        await asyncio.sleep(0.1)
+        for node in nodes:
+            await node.idle()
+        assert all(len(node.blockchain.pending_transactions) == 1 for node in nodes), "Transaction should reach all nodes"
+
+        block = await nodes[2].mine()
+        assert block is not None, "Node should mine its pending transaction"
+        assert await nodes[2].mine() is None, "Node should not mine without pending transactions"
+        await asyncio.sleep(0.1)
+        for node in nodes:
+            await node.idle()
+        assert all(node.blockchain.chain[-1].hash == block.hash for node in nodes), "Block should reach all nodes"
+        assert all(not node.blockchain.pending_transactions for node in nodes), "Mined transaction should leave all mempools"
+        assert nodes[0].block_arrivals[block.hash] > nodes[1].block_arrivals[block.hash] > nodes[2].block_arrivals[block.hash], "Block should arrive hop by hop"
+        assert nodes[0].transaction_arrivals[transactions[0].compute_hash()] < nodes[2].transaction_arrivals[transactions[0].compute_hash()], "Transaction should arrive hop by hop"
+
+        # Malformed messages are counted and dropped
+        nodes[1].receive("node0", frame(MESSAGE_TRANSACTION, b"garbage")[:-1])
+        await nodes[1].idle()
+        assert nodes[1].rejected_messages == 1, "Malformed message should be rejected"
+
+        # A transaction with a malformed public key is not admitted, and the messages after it are still processed
+        crypto_provider = nodes[1].blockchain.crypto_provider
+        malformed_key = b"garbage"
+        malformed = Transaction(crypto_provider.address(malformed_key), transactions[1].recipient, 10, crypto_provider, public_key=malformed_key)
+        malformed.signature = transactions[1].signature
+        nodes[1].receive("node0", frame(MESSAGE_TRANSACTION, malformed.to_bytes()))
+        nodes[1].receive("node0", frame(MESSAGE_TRANSACTION, transactions[1].to_bytes()))
+        await nodes[1].idle()
+        assert [transaction.compute_hash() for transaction in nodes[1].blockchain.pending_transactions] == [transactions[1].compute_hash()], "Only the valid transaction should be admitted"
+
+        # Any error while processing a message is counted instead of stopping the node
+        original_handle = nodes[1].handle
+        nodes[1].handle = lambda peer_name, data: {}[data]
+        nodes[1].receive("node0", b"unexpected")
+        await nodes[1].idle()
+        nodes[1].handle = original_handle
+        assert nodes[1].rejected_messages == 2, "Message raising an unexpected error should be rejected"
+        nodes[1].receive("node0", frame(MESSAGE_TRANSACTION, b"garbage"))
+        await nodes[1].idle()
+        assert nodes[1].rejected_messages == 3, "Node should keep processing messages after an unexpected error"
+
+        for node in nodes:
+            await node.stop()
+
+    asyncio.run(run())
+
+def test_orphans(init):
+    nodes, transactions = init
+
+    async def run():
+        # node0 mines two blocks before it is connected, so node1 first learns of the second one
+        node0, node1 = nodes[0], nodes[1]
+        node0.start()
+        node0.submit_transaction(transactions[0])
+        block1 = await node0.mine()
+        node0.submit_transaction(transactions[1])
+        node0.connect(node1)
+        node1.receive(node0.name, frame(MESSAGE_BLOCK, (await node0.mine()).to_bytes()))
+        await asyncio.sleep(0.1)
+        await node0.idle()
+        await node1.idle()
+        assert [block.hash for block in node1.blockchain.chain] == [block.hash for block in node0.blockchain.chain], "Orphan should be added after its requested parent"
+        assert block1.hash in node1.block_arrivals, "Requested parent should be recorded"
+        assert node1.blockchain.get_balance(node1.blockchain.chain[1].transactions[0].sender) == -20, "Orphan's transactions should be applied"
+
+        for node in nodes:
+            await node.stop()
+
+    asyncio.run(run())
+
+def test_orphan_limits(init, monkeypatch):
+    nodes, transactions = init
+    monkeypatch.setattr(node_module, 'MAX_ORPHANS', 3)
+    monkeypatch.setattr(node_module, 'MAX_ORPHANS_PER_PEER', 2)
+
+    async def run():
+        node = nodes[0]
+        node.start()
+        crypto_provider = node.blockchain.crypto_provider
+
+        def orphan(peer_name):
+            block = Block(1, os.urandom(32), transactions[:1], crypto_provider)
+            block.hash = block.compute_hash()
+            node.receive(peer_name, frame(MESSAGE_BLOCK, block.to_bytes()))
+            return block
+
+        peer1_orphans = [orphan("peer1") for _ in range(3)]
+        await node.idle()
+        assert [block.hash for blocks in node._orphans.values() for block in blocks] == [block.hash for block in peer1_orphans[:2]], "Orphans beyond the limit of a peer should be dropped"
+
+        peer2_orphans = [orphan("peer2") for _ in range(2)]
+        await node.idle()
+        kept = [block.hash for blocks in node._orphans.values() for block in blocks]
+        assert kept == [peer1_orphans[1].hash] + [block.hash for block in peer2_orphans], "Oldest orphan should be dropped beyond the overall limit"
+        assert node.rejected_messages == 0, "Dropped orphans should not count as rejected messages"
+
+        await node.stop()
+
+    asyncio.run(run())
+
+def test_tcp(init):
+    nodes, transactions = init
+
+    async def run():
+        port = await nodes[0].listen()
+        await nodes[1].connect_tcp('127.0.0.1', port)
+        await asyncio.sleep(0.05)
+        assert nodes[0].peers == ["node1"] and nodes[1].peers == ["node0"], "Nodes should introduce themselves"
+
+        nodes[1].submit_transaction(transactions[0])
+        await asyncio.sleep(0.1)
+        await nodes[0].idle()
+        block = await nodes[0].mine()
+        await asyncio.sleep(0.1)
+        await nodes[1].idle()
+        assert nodes[1].blockchain.chain[-1].hash == block.hash, "Block should be sent over TCP"
+        assert nodes[0].sent_bytes > len(block.to_bytes()), "Sent bytes should be counted"
+
+        for node in nodes:
+            await node.stop()
+
+    asyncio.run(run())
+
+def test_tcp_oversized_frame(init, monkeypatch):
+    nodes, _ = init
+    monkeypatch.setattr(node_module, 'MAX_FRAME_SIZE', 1024)
+
+    async def run():
+        port = await nodes[0].listen()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(frame(MESSAGE_HELLO, b"peer"))
+        await asyncio.sleep(0.05)
+        assert nodes[0].peers == ["peer"], "Peer should be connected after introducing itself"
+
+        # A frame announcing more than the maximum payload drops the peer without reading the payload
+        writer.write(node_module.FRAME_HEADER.pack(MESSAGE_BLOCK, 1025))
+        await asyncio.sleep(0.05)
+        assert nodes[0].peers == [], "Peer sending an oversized frame should be dropped"
+        assert await reader.read() == frame(MESSAGE_HELLO, b"node0"), "Connection to the dropped peer should be closed"
+        writer.close()
+        await nodes[0].stop()
+
+    asyncio.run(run())
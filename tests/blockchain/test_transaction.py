@@ -1,18 +1,17 @@
 import pytest
-import base64
 import cryptography
-from blockchain import Transaction
+from blockchain import Transaction, KeyRegistry
 
 @pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
 def init(request):
     signature_algorithm = request.param
     crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
     public_key1, secret_key1 = crypto_provider.generate_keypair()
-    address1 = base64.b64encode(public_key1).decode("utf-8")
+    address1 = crypto_provider.address(public_key1)
     public_key2, secret_key2 = crypto_provider.generate_keypair()
-    address2 = base64.b64encode(public_key2).decode("utf-8")
+    address2 = crypto_provider.address(public_key2)
     amount = 30
-    transaction = Transaction(address1, address2, amount, crypto_provider)
+    transaction = Transaction(address1, address2, amount, crypto_provider, public_key=public_key1)
     return transaction, address1, address2, amount, crypto_provider, secret_key1, secret_key2
 
 def test_create_transaction(init):
@@ -41,3 +40,104 @@ def test_sign_and_verify_transaction(init):
     is_valid = transaction.is_valid()
     assert is_valid, "Transaction should be valid"
 
+    # The sequence number is signed
+    transaction.sequence = 1
+    assert not transaction.is_valid(), "Transaction should not be valid after changing its sequence number"
+
+def test_to_and_from_bytes(init):
+    transaction, _, _, _, crypto_provider, secret_key1, _ = init
+
+    # Unsigned transactions are serialized with an empty signature
+    restored_transaction = Transaction.from_bytes(transaction.to_bytes(), crypto_provider)
+    assert restored_transaction.signature is None, "Restored unsigned transaction should have no signature"
+
+    transaction.sign_transaction(secret_key1)
+    transaction_bytes = transaction.to_bytes()
+    assert transaction_bytes.startswith(transaction.payload_bytes()), "Serialized transaction should start with the signed payload"
+
+    restored_transaction = Transaction.from_bytes(memoryview(transaction_bytes), crypto_provider)
+    assert restored_transaction.sender == transaction.sender, "Sender should be restored"
+    assert restored_transaction.recipient == transaction.recipient, "Recipient should be restored"
+    assert restored_transaction.amount == transaction.amount, "Amount should be restored"
+    assert restored_transaction.sequence == transaction.sequence, "Sequence number should be restored"
+    assert restored_transaction.signature == transaction.signature, "Signature should be restored"
+    assert restored_transaction.to_bytes() == transaction_bytes, "Serialization should be canonical"
+    assert restored_transaction.is_valid(), "Restored transaction should be valid"
+
+    # Check that malformed data is rejected
+    with pytest.raises(ValueError):
+        Transaction.from_bytes(transaction_bytes + b'\x00', crypto_provider)
+
+def test_signature_cache(init):
+    transaction, _, _, _, crypto_provider, secret_key1, _ = init
+    signature_cache = crypto_provider.signature_cache
+
+    transaction.sign_transaction(secret_key1)
+    assert transaction.is_valid(), "Transaction should be valid"
+    assert signature_cache.misses == 1 and signature_cache.hits == 0, "First verification should miss the cache"
+    assert transaction.is_valid(), "Transaction should still be valid"
+    assert signature_cache.hits == 1, "Second verification should hit the cache"
+
+    # A modified transaction has a different hash and is verified again
+    transaction.amount = 0
+    assert not transaction.is_valid(), "Modified transaction should not be valid"
+    assert signature_cache.misses == 2, "Modified transaction should miss the cache"
+
+    # With a disabled cache every verification is done from scratch
+    transaction.amount = 30
+    signature_cache.enabled = False
+    assert transaction.is_valid(), "Transaction should be valid without cache"
+    assert signature_cache.hits == 1, "Disabled cache should not be used"
+
+def test_public_key(init):
+    transaction, address1, _, _, crypto_provider, secret_key1, _ = init
+    public_key1 = transaction.public_key
+
+    transaction.sign_transaction(secret_key1)
+    assert crypto_provider.address(public_key1) == address1, "Sender should be the address of the carried public key"
+    assert transaction.sender_public_key() == public_key1, "Carried public key should be used"
+
+    # Without the key, the transaction can only be verified with a key registry
+    transaction.public_key = None
+    crypto_provider.signature_cache.enabled = False
+    assert not transaction.is_valid(), "Transaction without known public key should not be valid"
+    key_registry = KeyRegistry(crypto_provider)
+    key_registry.register(public_key1, 0)
+    assert transaction.is_valid(key_registry), "Transaction should be valid with the key from the registry"
+
+    # A carried key that does not belong to the sender is rejected
+    other_public_key, _ = crypto_provider.generate_keypair()
+    transaction.public_key = other_public_key
+    assert transaction.sender_public_key() is None, "Key of another address should not be used"
+    assert not transaction.is_valid(key_registry), "Transaction carrying the key of another address should not be valid"
+
+def test_sign_transactions(init):
+    transaction, address1, address2, _, crypto_provider, secret_key1, _ = init
+    public_key1 = transaction.public_key
+    public_key3, secret_key3 = crypto_provider.generate_keypair()
+    address3 = crypto_provider.address(public_key3)
+    transactions = [Transaction(address1, address2, amount, crypto_provider, public_key=public_key1) for amount in range(3)]
+    transactions.append(Transaction(address3, address2, 5, crypto_provider, public_key=public_key3))
+    private_keys = [secret_key1] * 3 + [secret_key3]
+
+    Transaction.sign_transactions(transactions, private_keys, workers=2)
+    crypto_provider.close()
+    assert all(transaction.is_valid() for transaction in transactions), "Every transaction should be signed with its sender's key"
+
+    with pytest.raises(ValueError):
+        Transaction.sign_transactions(transactions, private_keys[:1])
+
+def test_prune(init):
+    transaction, _, _, _, crypto_provider, secret_key1, _ = init
+    transaction.sign_transaction(secret_key1)
+    transaction_hash = transaction.compute_hash()
+
+    transaction.prune()
+    assert transaction.pruned, "Transaction should be pruned"
+    assert transaction.signature is None, "Signature should be dropped"
+    assert transaction.compute_hash() == transaction_hash, "Hash should be computed from the kept signature hash"
+    assert not transaction.is_valid(), "Pruned transaction should not verify"
+
+    restored_transaction = Transaction.from_bytes(transaction.to_bytes(), crypto_provider)
+    assert restored_transaction.pruned, "Pruned transaction should be restored as pruned"
+    assert restored_transaction.compute_hash() == transaction_hash, "Restored pruned transaction should have the same hash"
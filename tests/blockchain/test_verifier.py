@@ -0,0 +1,54 @@
+import pytest
+import cryptography
+from blockchain import Transaction, BatchVerifier
+
+@pytest.fixture(params=cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def init(request):
+    signature_algorithm = request.param
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha512')
+    public_key1, secret_key1 = crypto_provider.generate_keypair()
+    address1 = crypto_provider.address(public_key1)
+    public_key2, _ = crypto_provider.generate_keypair()
+    address2 = crypto_provider.address(public_key2)
+    transactions = []
+    for amount in range(1, 9):
+        transaction = Transaction(address1, address2, amount, crypto_provider, public_key=public_key1)
+        transaction.sign_transaction(secret_key1)
+        transactions.append(transaction)
+    return transactions
+
+@pytest.mark.parametrize("workers, executor", [(1, 'thread'), (3, 'thread'), (2, 'process')])
+def test_verify(init, workers, executor):
+    transactions = init
+    verifier = BatchVerifier(workers, executor)
+
+    assert verifier.verify([]) is None, "Empty batch should be valid"
+    assert verifier.verify(transactions) is None, "Batch of valid transactions should be valid"
+
+    # Modify the amount of one transaction to make its signature invalid
+    transactions[5].amount = 0
+    assert verifier.verify(transactions) is transactions[5], "Verifier should return the invalid transaction"
+
+    # Remove the signature of another transaction
+    transactions[5].amount = 6
+    transactions[2].signature = None
+    assert verifier.verify(transactions) is transactions[2], "Verifier should return the unsigned transaction"
+    verifier.close()
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_instrumented_provider(init, workers):
+    transactions = init
+    instrumentation = cryptography.Instrumentation()
+    crypto_provider = cryptography.CryptoProvider(transactions[0].crypto_provider.signature_algorithm, 'sha512', instrumentation=instrumentation)
+    for transaction in transactions:
+        transaction.crypto_provider = crypto_provider
+    verifier = BatchVerifier(workers)
+
+    # Worker threads verify with the provider of the transactions, so their verifications are recorded
+    assert verifier.verify(transactions) is None, "Batch of valid transactions should be valid"
+    assert instrumentation.snapshot()["operations"]["verify"][crypto_provider.signature_algorithm]["count"] == len(transactions), "Every verification should be recorded"
+    verifier.close()
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        BatchVerifier(2, 'fiber')
@@ -1,5 +1,6 @@
 import pytest
 import cryptography
+import concurrent.futures
 
 @pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
 def test_keygen_sign_and_verify(signature_algorithm):
@@ -24,6 +25,35 @@ def test_keygen_sign_and_verify(signature_algorithm):
     is_valid = crypto_provider.verify(public_key, message, invalid_signature)
     assert not is_valid, "Verification of invalid signature should return False"
 
+    for malformed_key in (public_key[:-1], b"\x00" * len(public_key), b"garbage"):
+        assert not crypto_provider.verify(malformed_key, message, signature), "Verification with a malformed public key should return False"
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def test_reused_contexts_and_keys(signature_algorithm):
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, '')
+    keypairs = [crypto_provider.generate_keypair() for _ in range(2)]
+    messages = [f"Test message {i}".encode() for i in range(8)]
+
+    # Sign and verify alternately with both keys from several threads, so that contexts and parsed keys are reused
+    def sign_and_verify(i):
+        public_key, secret_key = keypairs[i % 2]
+        other_public_key, _ = keypairs[(i + 1) % 2]
+        signature = crypto_provider.sign(secret_key, messages[i])
+        return crypto_provider.verify(public_key, messages[i], signature), crypto_provider.verify(other_public_key, messages[i], signature)
+
+    with concurrent.futures.ThreadPoolExecutor(3) as executor:
+        results = list(executor.map(sign_and_verify, range(len(messages))))
+    assert all(is_valid for is_valid, _ in results), "Signatures should be valid for the signing key"
+    assert not any(is_valid for _, is_valid in results), "Signatures should not be valid for the other key"
+
+    # Parsed secret keys are kept by their provider only and dropped when it is closed
+    if signature_algorithm == 'ECDSA-SHA256':
+        other_provider = cryptography.CryptoProvider(signature_algorithm, '')
+        assert crypto_provider._ecdsa_signing_key.cache_info().currsize == 2, "Parsed secret keys should be cached by the provider"
+        assert other_provider._ecdsa_signing_key.cache_info().currsize == 0, "Parsed secret keys should not be shared with other providers"
+        crypto_provider.close()
+        assert crypto_provider._ecdsa_signing_key.cache_info().currsize == 0, "Closing the provider should drop the parsed secret keys"
+
 @pytest.mark.parametrize("hash_function", cryptography.SUPPORTED_HASH_FUNCTIONS)
 def test_hash(hash_function):
 
@@ -41,3 +71,33 @@ def test_hash(hash_function):
     assert isinstance(hashed_data1, bytes), "Hashed data should be bytes"
     assert hashed_data1 == hashed_data2, "Hashed data should be equal"
     assert hashed_data1 != hashed_data3, "Hashed data should not be equal"
+
+@pytest.mark.parametrize("hash_function", cryptography.SUPPORTED_HASH_FUNCTIONS)
+def test_midstate(hash_function):
+
+    # shake_128 and shake_256 have variable digest length, so they are as 'shake_128_x' and 'shake_256_x' in SUPPORTED_HASH_FUNCTIONS
+    if hash_function.endswith('x'):
+        hash_function = hash_function.replace('x', '20')
+
+    crypto_provider = cryptography.CryptoProvider('', hash_function)
+    prefix = b"Fixed block contents"
+    midstate = crypto_provider.midstate(prefix)
+    assert midstate.hash(b"1") == crypto_provider.hash(prefix + b"1"), "Midstate hash should equal the hash of prefix and suffix"
+    assert midstate.hash(b"2") == crypto_provider.hash(prefix + b"2"), "Midstate should be reusable for further suffixes"
+    assert midstate.hash(b"") == crypto_provider.hash(prefix), "Midstate hash of empty suffix should equal the hash of the prefix"
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bulk_keygen_and_signing(signature_algorithm, workers):
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, '')
+    keypairs = crypto_provider.generate_keypairs(5, workers)
+    assert len(keypairs) == 5, "Requested number of keypairs should be generated"
+    assert len({public_key for public_key, _ in keypairs}) == 5, "Generated keypairs should be distinct"
+
+    messages = [f"Test message {i}".encode() for i in range(5)]
+    signatures = crypto_provider.sign_many([(secret_key, message) for (_, secret_key), message in zip(keypairs, messages)], workers)
+    crypto_provider.close()
+    assert len(signatures) == 5, "Every message should be signed"
+    for (public_key, _), message, signature in zip(keypairs, messages, signatures):
+        assert crypto_provider.verify(public_key, message, signature), "Signatures should be returned in the order of the messages"
+    assert crypto_provider.sign_many([], workers) == [], "Signing nothing should return no signatures"
@@ -0,0 +1,66 @@
+import pytest
+import json
+import cryptography
+from blockchain import Blockchain, Transaction
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def test_crypto_operations(signature_algorithm):
+    instrumentation = cryptography.Instrumentation()
+    crypto_provider = cryptography.CryptoProvider(signature_algorithm, 'sha256', instrumentation=instrumentation)
+    public_key, secret_key = crypto_provider.generate_keypair()
+    signature = crypto_provider.sign(secret_key, b"Test message")
+    assert crypto_provider.verify(public_key, b"Test message", signature), "Instrumented verification should still work"
+    crypto_provider.hash(b"1234")
+    crypto_provider.hash(b"567")
+
+    snapshot = instrumentation.snapshot()
+    for operation in ('generate_keypair', 'sign', 'verify'):
+        assert snapshot["operations"][operation][signature_algorithm]["count"] == 1, f"{operation} should be counted once"
+    histogram = snapshot["operations"]["hash"]["sha256"]
+    assert histogram["count"] == 2, "Hash calls should be counted"
+    assert sum(histogram["buckets"]) == 2, "Every call should fall into one bucket"
+    assert histogram["sum"] > 0, "Latencies should be summed up"
+    assert snapshot["counters"]["hashed_bytes"]["sha256"] == 7, "Hashed bytes should be counted"
+
+    # A disabled instrumentation does not record anything
+    instrumentation.enabled = False
+    crypto_provider.sign(secret_key, b"Test message")
+    assert instrumentation.snapshot() == snapshot, "Disabled instrumentation should not record operations"
+
+    instrumentation.reset()
+    assert instrumentation.snapshot()["operations"] == {}, "Reset should drop all metrics"
+
+def test_mining_stats_and_exporters():
+    instrumentation = cryptography.Instrumentation(mining_history_size=2)
+    crypto_provider = cryptography.CryptoProvider('ECDSA-SHA256', 'sha256', instrumentation=instrumentation)
+    public_key, secret_key = crypto_provider.generate_keypair()
+    address = crypto_provider.address(public_key)
+    blockchain = Blockchain(1, 1, crypto_provider)
+
+    for amount in range(3):
+        transaction = Transaction(address, address, amount, crypto_provider, public_key=public_key, sequence=amount)
+        transaction.sign_transaction(secret_key)
+        blockchain.add_transaction(transaction)
+        blockchain.mine_pending_transactions()
+        assert blockchain.miner.stats.index == amount + 1, "Miner should keep the statistics of the last mined block"
+
+    mining = instrumentation.snapshot()["mining"]
+    assert mining["blocks"] == 3, "Every mined block should be counted"
+    assert mining["time_to_solution"]["count"] == 3, "Time-to-solution should be recorded per block"
+    assert [stats["index"] for stats in mining["recent_blocks"]] == [2, 3], "Only the most recent blocks should be kept"
+    assert mining["attempts"] >= 3, "Attempts of all blocks should be summed up"
+
+    crypto_provider.signature_cache.enabled = False # Verify the signatures again instead of hitting the cache
+    assert blockchain.is_valid(full=True), "Instrumented blockchain should be valid"
+    snapshot = json.loads(instrumentation.export_json())
+    assert snapshot["counters"]["batch_verified_signatures"]['ECDSA-SHA256'] >= 3, "Batch verification should be counted"
+
+    text = instrumentation.export_prometheus()
+    assert 'pqb_crypto_operation_seconds_count{operation="sign",algorithm="ECDSA-SHA256"} 3' in text, "Sign calls should be exported"
+    assert 'pqb_crypto_operation_seconds_bucket{operation="sign",algorithm="ECDSA-SHA256",le="+Inf"} 3' in text, "Buckets should be cumulative"
+    assert "pqb_mined_blocks_total 3" in text, "Mined blocks should be exported"
+    assert "pqb_mining_hashrate " in text, "Hashrate of the last block should be exported"
+
+def test_uninstrumented_provider():
+    crypto_provider = cryptography.CryptoProvider('ECDSA-SHA256', 'sha256')
+    assert 'hash' not in vars(crypto_provider), "Uninstrumented provider should not wrap its operations"
@@ -0,0 +1,30 @@
+import cryptography
+
+def test_hits_misses_and_eviction():
+    signature_cache = cryptography.SignatureCache(maxsize=2)
+
+    assert not signature_cache.contains(b'a'), "Empty cache should not contain a digest"
+    signature_cache.add(b'a')
+    signature_cache.add(b'b')
+    assert signature_cache.contains(b'a'), "Added digest should be contained"
+    assert (signature_cache.hits, signature_cache.misses) == (1, 1), "Hits and misses should be counted"
+
+    # b'b' is the least recently used digest and gets evicted
+    signature_cache.add(b'c')
+    assert len(signature_cache) == 2, "Cache should not grow beyond its maximum size"
+    assert not signature_cache.contains(b'b'), "Least recently used digest should be evicted"
+    assert signature_cache.contains(b'a') and signature_cache.contains(b'c'), "Recently used digests should be kept"
+
+    signature_cache.clear()
+    assert len(signature_cache) == 0, "Cleared cache should be empty"
+    assert (signature_cache.hits, signature_cache.misses) == (0, 0), "Clearing should reset the counters"
+
+def test_disabled():
+    signature_cache = cryptography.SignatureCache(enabled=False)
+    signature_cache.add(b'a')
+    assert not signature_cache.contains(b'a'), "Disabled cache should never report a hit"
+    assert (signature_cache.hits, signature_cache.misses) == (0, 0), "Disabled cache should not count lookups"
+
+    signature_cache = cryptography.SignatureCache(maxsize=0)
+    signature_cache.add(b'a')
+    assert len(signature_cache) == 0, "Cache with maximum size 0 should not store anything"
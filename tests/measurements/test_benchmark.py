@@ -0,0 +1,98 @@
+import pytest
+import os
+import cryptography
+from measurements.benchmark import BenchmarkSuite, available_cpus, compare, main, resolve_algorithms, resolve_hash_functions, summarize
+
+def result(median, median_ci, public_key_size=100):
+    return {"timings": {"mining_time": {"median": median, "median_ci": median_ci}}, "sizes": {"public_key_size": public_key_size}}
+
+def test_summarize():
+    stats = summarize([3_000_000, 1_000_000, 2_000_000])
+    assert stats["n"] == 3, "All samples should be counted"
+    assert (stats["min"], stats["median"], stats["max"]) == (1.0, 2.0, 3.0), "Samples should be converted to milliseconds"
+    assert stats["mean"] == 2.0 and stats["stdev"] == 1.0, "Mean and standard deviation should be computed"
+    assert stats["median_ci"][0] <= stats["median"] <= stats["median_ci"][1], "Confidence interval should enclose the median"
+
+    stats = summarize([5_000_000])
+    assert stats["stdev"] == 0.0 and stats["median_ci"] == [5.0, 5.0], "A single sample should have no spread"
+    with pytest.raises(ValueError):
+        summarize([])
+
+def test_compare():
+    baseline = {"results": {"a": result(1.0, [0.9, 1.1]), "b": result(1.0, [0.9, 1.1])}}
+    current = {"results": {"a": result(1.5, [1.4, 1.6], 120), "b": result(1.5, [1.0, 2.0]), "c": result(9.0, [9.0, 9.0])}}
+    comparisons = {(entry["key"], entry["metric"]): entry for entry in compare(baseline, current, 0.1)}
+    assert set(comparisons) == {("a", "mining_time"), ("a", "public_key_size"), ("b", "mining_time"), ("b", "public_key_size")}, "Only combinations of both runs should be compared"
+    assert comparisons[("a", "mining_time")]["regression"], "Significantly slower timing should be a regression"
+    assert comparisons[("a", "mining_time")]["change"] == pytest.approx(0.5), "Relative change should be reported"
+    assert not comparisons[("b", "mining_time")]["regression"], "Slower timing with overlapping confidence intervals should not be a regression"
+    assert comparisons[("a", "public_key_size")]["regression"], "Grown size should be a regression"
+    assert not comparisons[("b", "public_key_size")]["regression"], "Unchanged size should not be a regression"
+    assert not any(entry["regression"] for entry in compare(baseline, current, 1.0)), "Changes within the threshold should not be regressions"
+
+def test_resolve():
+    assert resolve_algorithms(['all']) == sorted(cryptography.SUPPORTED_SIGNATURE_ALGORITHMS), "'all' should select every algorithm"
+    algorithms = sorted(cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)[:2]
+    assert resolve_algorithms(algorithms) == algorithms, "Supported algorithms should be kept"
+    with pytest.raises(ValueError):
+        resolve_algorithms(['RSA'])
+
+    hash_functions = resolve_hash_functions(['all'])
+    assert 'sha512' in hash_functions and 'shake_256_32' in hash_functions, "'all' should select every hash function with a SHAKE digest length"
+    assert resolve_hash_functions(['sha256', 'shake_256_64']) == ['sha256', 'shake_256_64'], "SHAKE functions should take a digest length"
+    with pytest.raises(ValueError):
+        resolve_hash_functions(['shake_256'])
+    with pytest.raises(ValueError):
+        resolve_hash_functions(['whirlpool'])
+
+@pytest.mark.parametrize("arguments", [["--repeat", "0"], ["--warmup", "-1"], ["--block-size", "0"], ["--algorithms", "RSA"]])
+def test_main_rejects_invalid_arguments(arguments):
+    with pytest.raises(SystemExit) as error:
+        main(["run", *arguments])
+    assert error.value.code == 2, "Invalid arguments should be reported as usage errors"
+    with pytest.raises(ValueError):
+        BenchmarkSuite(repeat_count=0)
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def test_benchmark(signature_algorithm):
+    suite = BenchmarkSuite([signature_algorithm], ['sha256'], repeat_count=3, warmup_count=1, num_transactions=4)
+    result = suite.benchmark(signature_algorithm, 'sha256')
+    assert all(stats["n"] == 3 for stats in result["timings"].values()), "Every timing should have one sample per repetition"
+    assert result["sizes"]["storage_usage"] > 0, "Storage usage should be measured"
+
+def test_worker_validation():
+    cpus = available_cpus()
+    with pytest.raises(ValueError):
+        BenchmarkSuite(workers=len(cpus) + 1)
+    with pytest.raises(ValueError):
+        BenchmarkSuite(workers=0)
+    with pytest.raises(ValueError):
+        BenchmarkSuite(workers=2, cpus=[cpus[0], cpus[0]])
+    with pytest.raises(ValueError):
+        BenchmarkSuite(cpus=[max(cpus) + 1])
+    assert BenchmarkSuite(workers=len(cpus)).cpus == cpus, "Workers should default to the first available CPUs"
+
+def test_run_in_one_process():
+    cpus = available_cpus()
+    suite = BenchmarkSuite(['ECDSA-SHA256', 'Falcon-512'], ['sha256'], cpus=[cpus[-1]])
+    affinities = []
+
+    def benchmark(algorithm, hash_function):
+        affinities.append(sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else [cpus[-1]])
+        return {"algorithm": algorithm, "hash_function": hash_function}
+
+    suite.benchmark = benchmark
+    report = suite.run(log=lambda message: None)
+    assert list(report["results"]) == ['ECDSA-SHA256/sha256', 'Falcon-512/sha256'], "Results should be keyed in the selected order"
+    assert all(result["cpu"] == cpus[-1] for result in report["results"].values()), "Every result should record its CPU"
+    assert affinities == [[cpus[-1]]] * 2, "Combinations should run pinned to the selected CPU"
+    assert available_cpus() == cpus, "The process's CPU affinity should be restored afterwards"
+    assert report["metadata"]["workers"] == 1 and report["metadata"]["cpus"] == [cpus[-1]], "Workers and CPUs should be recorded"
+
+@pytest.mark.skipif(len(available_cpus()) < 2, reason="Needs two CPUs to pin two workers to")
+def test_run_in_pinned_workers():
+    cpus = available_cpus()[:2]
+    suite = BenchmarkSuite(['ECDSA-SHA256'], ['sha256', 'sha512'], repeat_count=2, warmup_count=0, num_transactions=2, workers=2)
+    report = suite.run(log=lambda message: None)
+    assert list(report["results"]) == ['ECDSA-SHA256/sha256', 'ECDSA-SHA256/sha512'], "Results should be keyed in the selected order"
+    assert all(result["cpu"] in cpus for result in report["results"].values()), "Every result should be measured on a worker's CPU"
@@ -0,0 +1,41 @@
+import pytest
+import random
+import cryptography
+from measurements.network import NetworkSimulation, build_topology, propagation_delays
+
+@pytest.mark.parametrize("node_count", [1, 2, 5, 8])
+def test_build_topology(node_count):
+    full = build_topology(node_count, 'full', 0, random.Random(0))
+    assert len(full) == node_count * (node_count - 1) // 2, "Full topology should connect every pair"
+
+    ring = build_topology(node_count, 'ring', 0, random.Random(0))
+    assert all(a < b for a, b in ring) and len(set(ring)) == len(ring), "Edges should be sorted pairs without duplicates"
+    assert len(ring) == (0 if node_count == 1 else 1 if node_count == 2 else node_count), "Ring should connect every node with its successor"
+
+    for degree in (1, 3, 10):
+        edges = build_topology(node_count, 'random', degree, random.Random(1))
+        assert set(ring) <= set(edges), "Random topology should contain the ring, so it stays connected"
+        degrees = [sum(i in edge for edge in edges) for i in range(node_count)]
+        assert min(degrees) >= min(degree, node_count - 1), "Every node should have at least the requested degree"
+        assert edges == build_topology(node_count, 'random', degree, random.Random(1)), "Topology should be reproducible from the seed"
+
+def test_propagation_delays():
+    arrivals = [{b"a": 1.0, b"b": 5.0}, {b"a": 1.5, b"b": 5.5}, {b"a": 2.0}]
+    delays, full_delays, coverage = propagation_delays(arrivals, {b"a": 1.0, b"b": 5.0}, 3)
+    assert sorted(delays) == [0.5, 0.5, 1.0], "Every reception after the origin should be a delay"
+    assert full_delays == [1.0], "Only items that reached all nodes should have a full delay"
+    assert coverage == pytest.approx(0.75), "Coverage should be the share of receptions that happened"
+    assert propagation_delays(arrivals, {}, 3) == ([], [], 1.0), "No items should mean full coverage"
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def test_simulation(signature_algorithm):
+    simulation = NetworkSimulation(
+        [signature_algorithm], node_count=3, topology='ring', latency=0.001, duration=0.5, block_interval=0.1, transaction_rate=20.0, settle_seconds=0.3
+    )
+    result = simulation.run(log=lambda message: None)["results"][signature_algorithm]
+    # Large blocks may fork into tips of equal work, which nodes do not switch between
+    assert result["equal_work"], "All nodes should reach the same amount of work"
+    assert result["block_coverage"] == 1.0, "Blocks should reach all nodes"
+    assert result["submitted_transactions"] == 10, "All transactions should be submitted"
+    assert result["rejected_messages"] == 0, "Valid messages should not be rejected"
+    assert result["transaction_coverage"] == 1.0, "Transactions should reach all nodes"
@@ -0,0 +1,40 @@
+import pytest
+import cryptography
+from blockchain import Blockchain
+from measurements.scaling import ScalingSuite, TransactionPool, fit_power_law, grow_chain, limit_size
+
+def test_fit_power_law():
+    exponent, coefficient = fit_power_law([10, 100, 1000], [20, 2000, 200000])
+    assert exponent == pytest.approx(2.0), "Exponent should be the slope on the log-log scale"
+    assert coefficient == pytest.approx(0.2), "Coefficient should be the value at size 1"
+    assert fit_power_law([10, 100, 1000], [5, 5, 5])[0] == pytest.approx(0.0, abs=1e-9), "Constant curve should have exponent 0"
+    assert fit_power_law([0, 100, 1000], [1, 0, 5]) is None, "Points with non-positive coordinates should be ignored"
+    assert fit_power_law([], []) is None, "Fit should need at least two points"
+
+def test_limit_size():
+    assert limit_size((2.0, 0.2), 20000) == pytest.approx(316.2, rel=1e-3), "Limit should be where the curve reaches the budget"
+    assert limit_size((1.0, 1.0), 50) == pytest.approx(50.0), "Linear curve should reach the budget at the budget"
+    assert limit_size((0.05, 1.0), 50) is None, "Nearly constant curve should have no limit"
+    assert limit_size(None, 50) is None, "Missing fit should have no limit"
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+def test_grow_chain(signature_algorithm):
+    provider = cryptography.CryptoProvider(signature_algorithm, 'sha256')
+    pool = TransactionPool(provider, 6, sender_count=2, workers=1)
+    blockchain = Blockchain(4, 1, provider)
+    grow_chain(blockchain, pool.transactions, pool)
+    assert len(blockchain.chain) == 3, "Transactions should be mined into full blocks"
+    assert blockchain.find_transaction(pool.transactions[5].compute_hash()) == (2, 1), "Mined transactions should be indexed"
+    assert blockchain.is_valid(full=True) and blockchain.is_ledger_consistent(), "Grown chain should be valid"
+
+@pytest.mark.parametrize("signature_algorithm", cryptography.SUPPORTED_SIGNATURE_ALGORITHMS)
+@pytest.mark.parametrize("cache_enabled", [False, True])
+def test_chain_curves_keep_signature_cache(signature_algorithm, cache_enabled):
+    provider = cryptography.CryptoProvider(signature_algorithm, 'sha256')
+    provider.signature_cache.enabled = cache_enabled
+    pool = TransactionPool(provider, 8, sender_count=2, workers=1)
+    suite = ScalingSuite([signature_algorithm], 'sha256', sizes=(4, 8), repeat_count=2, warmup_count=0, validation_repeat_count=1)
+    curves = suite.chain_curves(provider, pool, 2, 1)
+    assert curves["sizes"] == [4, 8], "Chain should grow through all sizes"
+    assert provider.signature_cache.enabled == cache_enabled, "Signature cache should be left as it was configured"
+    assert suite.block_sizes == [100] and suite.difficulties == [1], "Defaults should be copied into the suite"